@@ -1 +1,43 @@
-"""Backend module for crypto trading platform."""
+"""Backend module for crypto trading platform.
+
+Submodules are imported on first use, so `from backend import Strategy` does
+not pull in torch, xgboost or ccxt unless the class needs them.
+"""
+import importlib
+
+_EXPORTS = {
+    'Config': 'config',
+    'DataEngine': 'data_engine',
+    'CandleStore': 'candle_store',
+    'FeatureMatrix': 'features',
+    'IndicatorEngine': 'indicators',
+    'Strategy': 'strategy',
+    'RuleSet': 'rules',
+    'ExecutionEngine': 'executor',
+    'OrderPipeline': 'orders',
+    'Ledger': 'ledger',
+    'TradingScheduler': 'scheduler',
+    'Predictor': 'predictor',
+    'ModelRegistry': 'registry',
+    'ModelTrainer': 'trainer',
+    'OnlineUpdater': 'online',
+    'Backtester': 'backtest',
+    'DashboardService': 'chart_feed',
+    'ReplayExchange': 'replay',
+    'MetricsServer': 'metrics',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,245 @@
+import logging
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from .config import Config
+from .executor import ExecutionEngine
+from .indicators import INDICATOR_COLUMNS, technical_indicators
+
+logger = logging.getLogger(__name__)
+
+TRADE_COLUMNS = ['symbol', 'entry_index', 'exit_index', 'entry_time', 'exit_time', 'entry_price',
+                 'exit_price', 'amount', 'fees', 'pnl', 'return_pct', 'exit_reason']
+
+
+@dataclass
+class BacktestResult:
+    """Trades, bar-by-bar equity curve and summary statistics of one run."""
+    symbol: str
+    trades: pd.DataFrame
+    equity: pd.Series
+    stats: dict
+
+
+class _BarTicker:
+    """Exchange stand-in that quotes the price of the bar being replayed."""
+
+    def __init__(self):
+        self.price = None
+
+    def fetch_ticker(self, symbol: str):
+        return {'symbol': symbol, 'last': self.price}
+
+
+class Backtester:
+    """Replays OHLCV through a Strategy with simulated fills.
+
+    Fees, slippage, stop-loss and take-profit come from TradingConfig and are
+    applied exactly like ExecutionEngine's simulated orders. Positions are
+    long-only, one at a time per symbol, entered at the close of a buy-signal
+    bar. Stops and targets are checked intrabar (stop first) from the next
+    bar on; a sell signal exits at the close.
+    """
+
+    def __init__(self, config: Config, strategy, initial_balance: float = 10000.0):
+        self.config = config
+        self.strategy = strategy
+        self.initial_balance = initial_balance
+
+    def prepare(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Add indicators if missing and drop warm-up rows."""
+        if not set(INDICATOR_COLUMNS).issubset(df.columns):
+            df = df.copy()
+            df[INDICATOR_COLUMNS] = technical_indicators(df['close'], self.config.strategy)
+            df = df.dropna()
+        return df.reset_index(drop=True)
+
+    def run(self, df: pd.DataFrame, symbol: str = '', signals=None, vectorized: bool = True) -> BacktestResult:
+        """Backtest one symbol.
+
+        The vectorized path only loops over trades, searching for exits with
+        NumPy; vectorized=False replays bar by bar through ExecutionEngine and
+        serves as the reference for the fast path.
+        """
+        df = self.prepare(df)
+        if signals is None:
+            signals = self.strategy.generate_signals(df)['signal'].to_numpy()
+        signals = np.asarray(signals)
+        if vectorized:
+            trades = self._simulate(df, signals, symbol)
+        else:
+            trades = self._simulate_loop(df, signals, symbol)
+        equity = self._equity(df, trades)
+        return BacktestResult(symbol, trades, equity, self._stats(df, trades, equity))
+
+    def run_many(self, frames: dict, vectorized: bool = True) -> dict:
+        """Backtest several symbols, each with its own starting balance."""
+        return {symbol: self.run(df, symbol, vectorized=vectorized) for symbol, df in frames.items()}
+
+    @staticmethod
+    def summary(results: dict) -> pd.DataFrame:
+        """One row of statistics per symbol."""
+        return pd.DataFrame({symbol: r.stats for symbol, r in results.items()}).T
+
+    def _levels(self, entry: float):
+        t = self.config.trading
+        stop = entry * (1 - t.stop_loss_percent / 100) if t.stop_loss_percent > 0 else -np.inf
+        target = entry * (1 + t.take_profit_percent / 100) if t.take_profit_percent > 0 else np.inf
+        return stop, target
+
+    @staticmethod
+    def _first_touch(low, high, start: int, end: int, stop: float, target: float):
+        """First bar in [start, end) whose range reaches the stop or target."""
+        block = 64
+        while start < end:
+            block_end = min(start + block, end)
+            hit = (low[start:block_end] <= stop) | (high[start:block_end] >= target)
+            k = int(hit.argmax())
+            if hit[k]:
+                return start + k
+            start = block_end
+            block *= 2
+        return None
+
+    def _simulate(self, df: pd.DataFrame, signals, symbol: str) -> pd.DataFrame:
+        t = self.config.trading
+        slip = t.slippage_percent / 100
+        o, h, l, c = (df[k].to_numpy(dtype=float) for k in ('open', 'high', 'low', 'close'))
+        n = len(c)
+        buy_idx = np.flatnonzero(signals == 1)
+        sell_idx = np.flatnonzero(signals == -1)
+
+        cash = self.initial_balance
+        trades = []
+        start = 0
+        while True:
+            k = np.searchsorted(buy_idx, start)
+            if k >= len(buy_idx):
+                break
+            i = int(buy_idx[k])
+            entry = c[i] * (1 + slip)
+            amount = cash * t.position_size / entry
+            entry_fee = amount * entry * t.fee_rate
+            cash -= amount * entry + entry_fee
+            stop, target = self._levels(entry)
+
+            m = np.searchsorted(sell_idx, i, side='right')
+            sell_at = int(sell_idx[m]) if m < len(sell_idx) else n
+            j = self._first_touch(l, h, i + 1, min(sell_at + 1, n), stop, target)
+            if j is not None and l[j] <= stop:
+                reason, trigger = 'stop_loss', min(o[j], stop)
+            elif j is not None:
+                reason, trigger = 'take_profit', max(o[j], target)
+            elif sell_at < n:
+                j, reason, trigger = sell_at, 'signal', c[sell_at]
+            else:
+                # Still open at the end: marked to market, no exit costs
+                trades.append(self._trade(df, symbol, i, None, entry, c[-1], amount, entry_fee, 0.0, 'open'))
+                break
+
+            exit_price = trigger * (1 - slip)
+            exit_fee = amount * exit_price * t.fee_rate
+            cash += amount * exit_price - exit_fee
+            trades.append(self._trade(df, symbol, i, j, entry, exit_price, amount, entry_fee, exit_fee, reason))
+            # A stop or target fills intrabar, so the same bar's close may re-enter
+            start = j + 1 if reason == 'signal' else j
+        return pd.DataFrame(trades, columns=TRADE_COLUMNS)
+
+    def _simulate_loop(self, df: pd.DataFrame, signals, symbol: str) -> pd.DataFrame:
+        t = self.config.trading
+        o, h, l, c = (df[k].to_numpy(dtype=float) for k in ('open', 'high', 'low', 'close'))
+        ticker = _BarTicker()
+        executor = ExecutionEngine(self.config, ticker)
+        executor.paper_balance = self.initial_balance
+
+        trades = []
+        position = None
+        for bar in range(len(c)):
+            if position is not None:
+                stop, target = position['stop'], position['target']
+                if l[bar] <= stop:
+                    reason, ticker.price = 'stop_loss', min(o[bar], stop)
+                elif h[bar] >= target:
+                    reason, ticker.price = 'take_profit', max(o[bar], target)
+                elif signals[bar] == -1:
+                    reason, ticker.price = 'signal', c[bar]
+                else:
+                    reason = None
+                if reason is not None:
+                    order = executor._simulate_sell(symbol, position['amount'])
+                    trades.append(self._trade(df, symbol, position['index'], bar, position['price'], order['price'],
+                                              order['amount'], position['fee'], order['fee'], reason))
+                    position = None
+
+            if position is None and signals[bar] == 1:
+                ticker.price = c[bar]
+                fill = c[bar] * (1 + t.slippage_percent / 100)
+                order = executor._simulate_buy(symbol, executor.paper_balance * t.position_size / fill)
+                if order is not None:
+                    stop, target = self._levels(order['price'])
+                    position = {'index': bar, 'price': order['price'], 'amount': order['amount'],
+                                'fee': order['fee'], 'stop': stop, 'target': target}
+
+        if position is not None:
+            trades.append(self._trade(df, symbol, position['index'], None, position['price'], c[-1],
+                                      position['amount'], position['fee'], 0.0, 'open'))
+        return pd.DataFrame(trades, columns=TRADE_COLUMNS)
+
+    @staticmethod
+    def _trade(df, symbol, i, j, entry, exit_price, amount, entry_fee, exit_fee, reason) -> dict:
+        timestamps = df['timestamp'] if 'timestamp' in df else df.index.to_series()
+        pnl = amount * (exit_price - entry) - entry_fee - exit_fee
+        return {
+            'symbol': symbol,
+            'entry_index': i,
+            'exit_index': j,
+            'entry_time': timestamps.iloc[i],
+            'exit_time': timestamps.iloc[j] if j is not None else None,
+            'entry_price': entry,
+            'exit_price': exit_price,
+            'amount': amount,
+            'fees': entry_fee + exit_fee,
+            'pnl': pnl,
+            'return_pct': pnl / (amount * entry + entry_fee) * 100,
+            'exit_reason': reason,
+        }
+
+    def _equity(self, df: pd.DataFrame, trades: pd.DataFrame) -> pd.Series:
+        """Mark-to-market equity at each bar close, built from trade deltas."""
+        n = len(df)
+        close = df['close'].to_numpy(dtype=float)
+        position = np.zeros(n + 1)
+        cash = np.zeros(n + 1)
+        if not trades.empty:
+            fee = self.config.trading.fee_rate
+            entries = trades['entry_index'].to_numpy(dtype=int)
+            closed = trades['exit_reason'].to_numpy() != 'open'
+            exits = np.where(closed, trades['exit_index'].fillna(n).to_numpy(dtype=float), n).astype(int)
+            amount = trades['amount'].to_numpy()
+            np.add.at(position, entries, amount)
+            np.add.at(position, exits, -amount)
+            np.add.at(cash, entries, -amount * trades['entry_price'].to_numpy() * (1 + fee))
+            np.add.at(cash, exits, np.where(closed, amount * trades['exit_price'].to_numpy() * (1 - fee), 0.0))
+        equity = self.initial_balance + np.cumsum(cash)[:n] + np.cumsum(position)[:n] * close
+        index = df['timestamp'] if 'timestamp' in df else df.index
+        return pd.Series(equity, index=pd.Index(index, name='timestamp'), name='equity')
+
+    def _stats(self, df: pd.DataFrame, trades: pd.DataFrame, equity: pd.Series) -> dict:
+        closed = trades[trades['exit_reason'] != 'open']
+        returns = equity.pct_change().dropna()
+        sharpe = 0.0
+        if 'timestamp' in df and len(df) > 1 and returns.std() > 0:
+            bar_seconds = df['timestamp'].diff().median().total_seconds()
+            bars_per_year = 365 * 24 * 3600 / bar_seconds
+            sharpe = float(returns.mean() / returns.std() * np.sqrt(bars_per_year))
+        final = float(equity.iloc[-1]) if len(equity) else self.initial_balance
+        return {
+            'bars': len(df),
+            'trades': len(closed),
+            'win_rate': float((closed['pnl'] > 0).mean()) if len(closed) else 0.0,
+            'total_return_pct': (final / self.initial_balance - 1) * 100,
+            'max_drawdown_pct': float((equity / equity.cummax() - 1).min() * 100) if len(equity) else 0.0,
+            'sharpe': sharpe,
+            'fees': float(trades['fees'].sum()),
+            'final_equity': final,
+        }
@@ -0,0 +1,244 @@
+import json
+import os
+import logging
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+DTYPES = {'timestamp': np.int64, 'open': np.float64, 'high': np.float64,
+          'low': np.float64, 'close': np.float64, 'volume': np.float64}
+MANIFEST = 'CURRENT'
+
+
+@contextmanager
+def file_lock(lock_file: Path):
+    """Hold an exclusive lock on `lock_file`, across processes and threads."""
+    with open(lock_file, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class CandleStore:
+    """Persistent OHLCV store keyed by (exchange, symbol, timeframe).
+
+    Each series is kept as one flat binary file per column, sorted by
+    timestamp (ms) and read through np.memmap, so window reads only touch the
+    pages they need. New candles are appended in place; out-of-order writes
+    (gap backfills) merge the series into a new version directory and switch
+    the CURRENT manifest to it with one atomic rename, so readers see either
+    the old column set or the new one, never a mix. Writers to a series take
+    a file lock, so several processes can share the store.
+    """
+
+    def __init__(self, root: str = "data/historical"):
+        self.root = Path(root)
+
+    def _path(self, exchange: str, symbol: str, timeframe: str) -> Path:
+        return self.root / exchange / symbol.replace('/', '-').replace(':', '_') / timeframe
+
+    @staticmethod
+    def _version(path: Path):
+        """Name of the live version directory, or None for a series stored flat in `path`."""
+        try:
+            return (path / MANIFEST).read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _columns_dir(self, path: Path) -> Path:
+        version = self._version(path)
+        return path / version if version else path
+
+    def _load(self, path: Path, attempts: int = 3):
+        """Memory-map all columns, truncated to the shortest one.
+
+        Appends write one column after another, so a concurrent reader may see
+        a partially written row; it is simply ignored until complete. A rewrite
+        that retires the version being opened makes the read start over.
+        """
+        for attempt in range(attempts):
+            data = self._columns_dir(path)
+            try:
+                sizes = [os.path.getsize(data / f'{c}.bin') // np.dtype(DTYPES[c]).itemsize for c in COLUMNS]
+                n = min(sizes)
+                if n == 0:
+                    return None
+                return {c: np.memmap(data / f'{c}.bin', dtype=DTYPES[c], mode='r', shape=(n,)) for c in COLUMNS}
+            except FileNotFoundError:
+                if data == self._columns_dir(path):
+                    return None
+        return None
+
+    def count(self, exchange: str, symbol: str, timeframe: str) -> int:
+        cols = self._load(self._path(exchange, symbol, timeframe))
+        return 0 if cols is None else len(cols['timestamp'])
+
+    def first_timestamp(self, exchange: str, symbol: str, timeframe: str):
+        cols = self._load(self._path(exchange, symbol, timeframe))
+        return None if cols is None else int(cols['timestamp'][0])
+
+    def last_timestamp(self, exchange: str, symbol: str, timeframe: str):
+        """Timestamp (ms) of the newest stored candle, or None when empty."""
+        cols = self._load(self._path(exchange, symbol, timeframe))
+        return None if cols is None else int(cols['timestamp'][-1])
+
+    def read_arrays(self, exchange: str, symbol: str, timeframe: str,
+                    since: int = None, until: int = None, limit: int = None) -> dict:
+        """Column arrays for candles in [since, until), newest `limit` rows."""
+        cols = self._load(self._path(exchange, symbol, timeframe))
+        if cols is None:
+            return {c: np.empty(0, dtype=DTYPES[c]) for c in COLUMNS}
+        ts = cols['timestamp']
+        lo = 0 if since is None else int(np.searchsorted(ts, since, side='left'))
+        hi = len(ts) if until is None else int(np.searchsorted(ts, until, side='left'))
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        return {c: np.array(cols[c][lo:hi]) for c in COLUMNS}
+
+    def read(self, exchange: str, symbol: str, timeframe: str,
+             since: int = None, until: int = None, limit: int = None) -> pd.DataFrame:
+        """Read a window in the same shape DataEngine.fetch_ohlcv returns."""
+        df = pd.DataFrame(self.read_arrays(exchange, symbol, timeframe, since, until, limit))
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
+
+    def write(self, exchange: str, symbol: str, timeframe: str, ohlcv) -> int:
+        """Store raw ccxt OHLCV rows, replacing candles with equal timestamps.
+
+        Returns the number of rows written.
+        """
+        if ohlcv is None or len(ohlcv) == 0:
+            return 0
+        rows = np.asarray(ohlcv, dtype=np.float64).reshape(-1, len(COLUMNS))
+        new = {c: rows[:, i].astype(DTYPES[c]) for i, c in enumerate(COLUMNS)}
+        order = np.argsort(new['timestamp'], kind='stable')
+        new = {c: v[order] for c, v in new.items()}
+        # Keep the last occurrence of duplicate timestamps within the batch
+        ts = new['timestamp']
+        keep = np.append(ts[1:] != ts[:-1], True)
+        new = {c: v[keep] for c, v in new.items()}
+
+        path = self._path(exchange, symbol, timeframe)
+        path.mkdir(parents=True, exist_ok=True)
+        with file_lock(path / '.lock'):
+            cols = self._load(path)
+            if cols is None:
+                self._rewrite(path, new)
+                return len(new['timestamp'])
+
+            n = len(cols['timestamp'])
+            last = int(cols['timestamp'][-1])
+            first_new = int(new['timestamp'][0])
+            if first_new >= last:
+                # Fast path: pure append, possibly revising the (open) last candle
+                keep_rows = n - 1 if first_new == last else n
+                del cols
+                self._append(path, new, keep_rows)
+            else:
+                merged = {c: np.concatenate([np.asarray(cols[c]), new[c]]) for c in COLUMNS}
+                del cols
+                order = np.argsort(merged['timestamp'], kind='stable')
+                merged = {c: v[order] for c, v in merged.items()}
+                ts = merged['timestamp']
+                keep = np.append(ts[1:] != ts[:-1], True)
+                self._rewrite(path, {c: v[keep] for c, v in merged.items()})
+        return len(new['timestamp'])
+
+    def _append(self, path: Path, new: dict, keep_rows: int):
+        # Overwrite from the first replaced row instead of truncating, so
+        # readers holding a memmap of the old length never hit a shrunk file.
+        data = self._columns_dir(path)
+        for c in COLUMNS:
+            itemsize = np.dtype(DTYPES[c]).itemsize
+            payload = np.ascontiguousarray(new[c]).tobytes()
+            with open(data / f'{c}.bin', 'r+b') as f:
+                f.seek(keep_rows * itemsize)
+                f.write(payload)
+                end = f.tell()
+                if os.fstat(f.fileno()).st_size > end:
+                    # Leftover tail from an interrupted write
+                    f.truncate(end)
+
+    def _rewrite(self, path: Path, data: dict):
+        """Write every column into a new version directory, then point the manifest at it."""
+        current = self._version(path)
+        version = f"v{int(current[1:]) + 1}" if current else 'v1'
+        staging = path / f'{version}.tmp'
+        for stale in (staging, path / version):
+            shutil.rmtree(stale, ignore_errors=True)
+        staging.mkdir()
+        for c in COLUMNS:
+            with open(staging / f'{c}.bin', 'wb') as f:
+                f.write(np.ascontiguousarray(data[c], dtype=DTYPES[c]).tobytes())
+        os.replace(staging, path / version)
+        manifest = path / f'{MANIFEST}.tmp'
+        manifest.write_text(version)
+        os.replace(manifest, path / MANIFEST)
+        self._prune(path, keep={version, current})
+
+    @staticmethod
+    def _prune(path: Path, keep: set):
+        """Delete versions older than the previous one; a reader may still be opening that."""
+        for entry in path.iterdir():
+            if entry.is_dir() and entry.name[:1] == 'v' and entry.name[1:].isdigit() and entry.name not in keep:
+                shutil.rmtree(entry, ignore_errors=True)
+            elif None not in keep and entry.suffix == '.bin':
+                # Columns of the flat layout older stores used
+                entry.unlink()
+
+    def find_gaps(self, exchange: str, symbol: str, timeframe: str, timeframe_ms: int,
+                  since: int = None, skip_checked: bool = True) -> list:
+        """Missing ranges between stored candles as [start, end) ms pairs."""
+        ts = self.read_arrays(exchange, symbol, timeframe, since=since)['timestamp']
+        if len(ts) < 2:
+            return []
+        idx = np.flatnonzero(np.diff(ts) > timeframe_ms)
+        gaps = [(int(ts[i]) + timeframe_ms, int(ts[i + 1])) for i in idx]
+        if skip_checked:
+            checked = {tuple(g) for g in self._meta(exchange, symbol, timeframe).get('checked_gaps', [])}
+            gaps = [g for g in gaps if g not in checked]
+        return gaps
+
+    def mark_gap_checked(self, exchange: str, symbol: str, timeframe: str, gap):
+        """Remember a gap the exchange has no data for, so it isn't refetched."""
+        path = self._path(exchange, symbol, timeframe)
+        path.mkdir(parents=True, exist_ok=True)
+        with file_lock(path / '.lock'):
+            meta = self._meta(exchange, symbol, timeframe)
+            meta.setdefault('checked_gaps', []).append(list(gap))
+            tmp = path / 'meta.json.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(meta, f)
+            os.replace(tmp, path / 'meta.json')
+
+    def _meta(self, exchange: str, symbol: str, timeframe: str) -> dict:
+        meta_file = self._path(exchange, symbol, timeframe) / 'meta.json'
+        if not meta_file.exists():
+            return {}
+        try:
+            with open(meta_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable candle store metadata {meta_file}: {e}")
+            return {}
@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+import pandas as pd
+from .resample import Resampler
+
+logger = logging.getLogger(__name__)
+
+
+class CandleFeed:
+    """Indicator-enriched candles for one symbol/timeframe.
+
+    The exchange is asked at most once every `refresh_seconds`, however many
+    readers there are, and indicators are only computed for new candles.
+    """
+
+    def __init__(self, data_engine, symbol: str, timeframe: str, limit: int = 500,
+                 refresh_seconds: float = 10.0, resampler: Resampler = None):
+        self.data_engine = data_engine
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.limit = limit
+        self.refresh_seconds = refresh_seconds
+        self.resampler = resampler
+        self.frame = None
+        self.version = 0
+        self.fetched_at = None
+        self._lock = threading.Lock()
+
+    def get(self) -> pd.DataFrame:
+        """Current candles, refreshed first if the last fetch is older than refresh_seconds."""
+        with self._lock:
+            if self.fetched_at is None or time.monotonic() - self.fetched_at >= self.refresh_seconds:
+                self._refresh()
+            return self.frame
+
+    def _candles(self):
+        df = self.data_engine.fetch_ohlcv(self.symbol, self.timeframe, self.limit)
+        if self.resampler is not None and df is not None and not df.empty:
+            self.resampler.ingest(self.symbol, df)
+        return df
+
+    def _refresh(self):
+        # Stamp before fetching so a failing exchange is not retried by every reader
+        self.fetched_at = time.monotonic()
+        df = self._candles()
+        if df is None or df.empty:
+            return
+        new = self.data_engine.update_technical_indicators(df, self.symbol, self.timeframe)
+        if new is None or new.empty:
+            return
+        if self.frame is None:
+            frame = new
+        else:
+            # A revised latest candle replaces the stored one
+            kept = self.frame[self.frame['timestamp'] < new['timestamp'].iloc[0]]
+            frame = pd.concat([kept, new], ignore_index=True)
+        self.frame = frame.tail(self.limit).reset_index(drop=True)
+        self.version += 1
+
+
+class ResampledFeed(CandleFeed):
+    """A CandleFeed whose candles are derived from the symbol's base-timeframe feed.
+
+    Refreshing asks the exchange for base candles only (shared with every
+    other timeframe of the symbol); the one exception is a single backfill of
+    this timeframe's history the first time it is opened.
+    """
+
+    def __init__(self, base: CandleFeed, timeframe: str, resampler: Resampler):
+        super().__init__(base.data_engine, base.symbol, timeframe, base.limit, base.refresh_seconds, resampler)
+        self.base = base
+        self._source_version = None
+
+    def _candles(self):
+        self.base.get()
+        resampler = self.resampler
+        if not resampler.seeded(self.symbol, self.timeframe):
+            history = self.data_engine.fetch_ohlcv(self.symbol, self.timeframe, self.limit)
+            if history is not None:
+                resampler.seed(self.symbol, self.timeframe, history)
+        version = resampler.version(self.symbol, self.timeframe)
+        if version == self._source_version:
+            return None
+        self._source_version = version
+        return resampler.candles(self.symbol, self.timeframe, self.limit)
+
+
+class DashboardService:
+    """Long-lived data source shared by every dashboard session.
+
+    Candles are served from one CandleFeed per (symbol, timeframe) and prices
+    from the DataEngine's market-data hub, so concurrent viewers share the
+    same exchange requests. Only `base_timeframe` candles are polled; higher
+    timeframes are resampled from them, so watching more timeframes of a
+    symbol adds no market-data traffic.
+    """
+
+    def __init__(self, data_engine, refresh_seconds: float = 10.0, limit: int = 500,
+                 base_timeframe: str = '1m'):
+        self.data_engine = data_engine
+        self.refresh_seconds = refresh_seconds
+        self.limit = limit
+        self.resampler = Resampler(base_timeframe, limit=limit) if base_timeframe else None
+        self._feeds = {}
+        self._guard = threading.Lock()
+
+    def feed(self, symbol: str, timeframe: str) -> CandleFeed:
+        with self._guard:
+            return self._feed(symbol, timeframe)
+
+    def _feed(self, symbol: str, timeframe: str) -> CandleFeed:
+        key = (symbol, timeframe)
+        if key not in self._feeds:
+            resampler = self.resampler
+            if resampler is not None and resampler.can_derive(timeframe):
+                base = self._feed(symbol, resampler.base_timeframe)
+                self._feeds[key] = ResampledFeed(base, timeframe, resampler)
+            else:
+                base = resampler is not None and timeframe == resampler.base_timeframe
+                self._feeds[key] = CandleFeed(self.data_engine, symbol, timeframe, self.limit,
+                                              self.refresh_seconds, resampler if base else None)
+        return self._feeds[key]
+
+    def candles(self, symbol: str, timeframe: str) -> pd.DataFrame:
+        return self.feed(symbol, timeframe).get()
+
+    def price(self, symbol: str):
+        return self.data_engine.get_realtime_price(symbol)
@@ -30,11 +30,25 @@ class ModelConfig:
     use_lstm: bool = False
     lstm_units: int = 64
     lstm_lookback: int = 60
+    inference_threads: int = 2
+    epochs: int = 10
+    batch_size: int = 256
+    early_stopping_patience: int = 3
+    training_workers: int = 0  # 0: one per core, capped at the number of symbols
+    training_threads: int = 0  # 0: split cores evenly between workers
+    checkpoint_dir: str = "data/checkpoints"
+    update_rounds: int = 10
+    update_epochs: int = 2
+    update_learning_rate: float = 0.0001
+    replay_window: int = 2000
+    drift_threshold: float = 0.5  # shift of the recent feature mean, in training standard deviations
+    drift_error_ratio: float = 2.0  # recent error over validation error that forces a full retrain
 
 
 @dataclass
 class TradingConfig:
     """Trading parameters."""
+    exchange_id: str = "binance"
     paper_trading: bool = True
     position_size: float = 0.1
     max_daily_loss: float = 0.05
@@ -42,6 +56,45 @@ class TradingConfig:
     take_profit_percent: float = 5.0
     min_volatility: float = 0.5
     max_volatility: float = 5.0
+    fee_rate: float = 0.001
+    slippage_percent: float = 0.05
+    ledger_url: str = "sqlite:///data/ledger.db"
+
+
+@dataclass
+class RiskConfig:
+    """Portfolio risk limits enforced by RiskEngine.
+
+    Daily loss, stop-loss/take-profit and volatility bounds come from
+    TradingConfig; these add sizing and exposure limits on top.
+    """
+    enabled: bool = True
+    max_risk_per_trade: float = 0.01  # fraction of equity lost if the stop-loss is hit
+    max_position_exposure: float = 0.2  # notional per symbol, fraction of equity
+    max_gross_exposure: float = 1.0  # notional across all symbols, fraction of equity
+    max_open_positions: int = 10
+    volatility_window: int = 20  # candles in the EWMA of returns checked against min/max_volatility
+    volatility_horizon: str = "1d"  # min/max_volatility are percent over this span; candle volatility is scaled to it
+
+
+@dataclass
+class StrategyConfig:
+    """Signal thresholds and indicator windows.
+
+    Indicator column names (sma_20, sma_50, ...) are kept for the default
+    windows even when the windows are tuned.
+    """
+    rsi_oversold: float = 30.0
+    rsi_overbought: float = 70.0
+    rsi_period: int = 14
+    sma_fast: int = 20
+    sma_slow: int = 50
+    macd_fast: int = 12
+    macd_slow: int = 26
+    macd_signal: int = 9
+    bb_std: float = 2.0
+    xgb_min_probability: float = 0.5  # buys need the XGBoost up-probability above this, when a model is loaded
+    shadow_variants: dict = None  # {name: {threshold: value}} evaluated alongside the live strategy, never traded
 
 
 @dataclass
@@ -52,6 +105,13 @@ class DataConfig:
     lookback_days: int = 90
     update_interval_minutes: int = 60
     cache_enabled: bool = True
+    ticker_ttl_seconds: float = 2.0
+    stream_tickers: bool = True
+    dashboard_refresh_seconds: float = 10.0
+    base_timeframe: str = "1m"  # the only timeframe the dashboard polls; higher ones are resampled from it
+    markets_cache_hours: float = 24.0  # 0 disables the on-disk exchange markets cache
+    download_concurrency: int = 8  # history pages in flight at once, still bound by the rate limit
+    download_page_size: int = 1000
     
     def __post_init__(self):
         if self.pairs is None:
@@ -68,6 +128,10 @@ class LoggingConfig:
     log_dir: str = "data/logs"
     max_file_size: int = 10 * 1024 * 1024
     backup_count: int = 5
+    metrics_enabled: bool = False  # serves /metrics on metrics_host:metrics_port when on
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 9108
+    profiler_enabled: bool = False
 
 
 class Config:
@@ -85,6 +149,8 @@ class Config:
         )
         self.model = ModelConfig()
         self.trading = TradingConfig()
+        self.risk = RiskConfig()
+        self.strategy = StrategyConfig()
         self.data = DataConfig()
         self.logging = LoggingConfig()
         
@@ -106,6 +172,10 @@ class Config:
                 self.model = ModelConfig(**config_data['model'])
             if 'trading' in config_data:
                 self.trading = TradingConfig(**config_data['trading'])
+            if 'risk' in config_data:
+                self.risk = RiskConfig(**config_data['risk'])
+            if 'strategy' in config_data:
+                self.strategy = StrategyConfig(**config_data['strategy'])
             if 'data' in config_data:
                 self.data = DataConfig(**config_data['data'])
             if 'logging' in config_data:
@@ -119,6 +189,8 @@ class Config:
             'binance': asdict(self.binance),
             'model': asdict(self.model),
             'trading': asdict(self.trading),
+            'risk': asdict(self.risk),
+            'strategy': asdict(self.strategy),
             'data': asdict(self.data),
             'logging': asdict(self.logging),
         }
@@ -137,6 +209,12 @@ class Config:
         elif section == 'trading':
             for k, v in kwargs.items():
                 setattr(self.trading, k, v)
+        elif section == 'risk':
+            for k, v in kwargs.items():
+                setattr(self.risk, k, v)
+        elif section == 'strategy':
+            for k, v in kwargs.items():
+                setattr(self.strategy, k, v)
         elif section == 'data':
             for k, v in kwargs.items():
                 setattr(self.data, k, v)
@@ -151,9 +229,8 @@ class Config:
             'binance': asdict(self.binance),
             'model': asdict(self.model),
             'trading': asdict(self.trading),
+            'risk': asdict(self.risk),
+            'strategy': asdict(self.strategy),
             'data': asdict(self.data),
             'logging': asdict(self.logging),
         }
-
-
-config = Config()
@@ -1,40 +1,153 @@
+import json
+import os
 import pandas as pd
 import numpy as np
-import ccxt
 import time
 from datetime import datetime
+from pathlib import Path
 import logging
 from .config import Config
+from .candle_store import CandleStore
+from .features import FeatureMatrix
+from .indicators import IndicatorEngine, technical_indicators
+from .market_data import MarketDataHub
+from .metrics import API_CALLS, timed
 
 logger = logging.getLogger(__name__)
 
+QUOTE_ASSETS = ('USDT', 'BUSD', 'USDC', 'FDUSD', 'TUSD', 'BTC', 'ETH', 'BNB', 'EUR')
+MARKETS_CACHE_DIR = "data/markets"
+
+
+def create_exchange(config: Config, module=None, **overrides):
+    """Build a CCXT exchange from config; pass ccxt.async_support for the async API."""
+    if module is None:
+        # Importing ccxt loads every exchange class, so only pay for it here
+        import ccxt as module
+    exchange_class = getattr(module, config.trading.exchange_id)
+    params = {
+        'apiKey': config.binance.api_key,
+        'secret': config.binance.api_secret,
+        'enableRateLimit': True,
+    }
+    if config.binance.testnet:
+        params['options'] = {'defaultType': 'future'}
+    params.update(overrides)
+
+    exchange = exchange_class(params)
+    if config.binance.testnet and hasattr(exchange, 'set_sandbox_mode'):
+        exchange.set_sandbox_mode(True)
+    return exchange
+
+
+def _markets_path(exchange, cache_dir: str) -> Path:
+    sandbox = '-sandbox' if getattr(exchange, 'isSandboxModeEnabled', False) else ''
+    return Path(cache_dir) / f"{exchange.id}{sandbox}.json"
+
+
+def _read_markets(exchange, cache_dir: str, ttl: float) -> bool:
+    """Install cached markets on `exchange`; False when missing, stale or unreadable."""
+    path = _markets_path(exchange, cache_dir)
+    try:
+        if ttl <= 0 or time.time() - path.stat().st_mtime > ttl:
+            return False
+        with open(path, 'r') as f:
+            cached = json.load(f)
+        exchange.set_markets(cached['markets'], cached.get('currencies'))
+        return True
+    except (OSError, ValueError, KeyError) as e:
+        if not isinstance(e, FileNotFoundError):
+            logger.warning(f"Ignoring markets cache {path}: {e}")
+        return False
+
+
+def _write_markets(exchange, cache_dir: str, ttl: float):
+    if ttl <= 0:
+        return
+    path = _markets_path(exchange, cache_dir)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'markets': exchange.markets, 'currencies': exchange.currencies}, f)
+        os.replace(tmp, path)
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning(f"Could not cache markets to {path}: {e}")
+
+
+def load_markets(exchange, ttl: float = 86400.0, cache_dir: str = MARKETS_CACHE_DIR) -> dict:
+    """exchange.load_markets() backed by an on-disk copy refreshed every `ttl` seconds."""
+    if not _read_markets(exchange, cache_dir, ttl):
+        API_CALLS.inc(method='load_markets')
+        exchange.load_markets()
+        _write_markets(exchange, cache_dir, ttl)
+    return exchange.markets
+
+
+async def load_markets_async(exchange, limiter=None, ttl: float = 86400.0,
+                             cache_dir: str = MARKETS_CACHE_DIR) -> dict:
+    """load_markets() for ccxt.async_support exchanges, drawing from `limiter` on a cache miss."""
+    if not _read_markets(exchange, cache_dir, ttl):
+        if limiter is not None:
+            await limiter.acquire()
+        API_CALLS.inc(method='load_markets')
+        await exchange.load_markets()
+        _write_markets(exchange, cache_dir, ttl)
+    return exchange.markets
+
+
+def normalize_symbol(pair: str, exchange=None) -> str:
+    """Map exchange-style pair ids like 'BTCUSDT' to unified 'BTC/USDT' symbols."""
+    if '/' in pair:
+        return pair
+    markets_by_id = getattr(exchange, 'markets_by_id', None) or {}
+    market = markets_by_id.get(pair)
+    if market:
+        # ccxt>=4 maps each id to a list of markets
+        market = market[0] if isinstance(market, list) else market
+        return market['symbol']
+    for quote in QUOTE_ASSETS:
+        if pair.endswith(quote) and len(pair) > len(quote):
+            return f"{pair[:-len(quote)]}/{quote}"
+    return pair
+
+
 class DataEngine:
     """Engine for fetching and preprocessing market data."""
     
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, exchange=None):
         self.config = config
-        self.exchange = self._init_exchange()
+        # An injected exchange (e.g. a ReplayExchange) replaces the configured one
+        self.exchange = exchange if exchange is not None else self._init_exchange()
+        self.indicators = IndicatorEngine(self.config.strategy)
+        self.store = CandleStore() if self.config.data.cache_enabled else None
+        self.market_data = MarketDataHub(self.exchange, ttl=self.config.data.ticker_ttl_seconds,
+                                         sandbox=self.config.binance.testnet)
         
     def _init_exchange(self):
         """Initialize the CCXT exchange based on config."""
-        exchange_class = getattr(ccxt, self.config.trading.exchange_id)
-        params = {
-            'apiKey': self.config.trading.api_key,
-            'secret': self.config.trading.api_secret,
-            'enableRateLimit': True,
-        }
-        if self.config.trading.testnet:
-            params['options'] = {'defaultType': 'future'} 
-            
-        exchange = exchange_class(params)
-        if self.config.trading.testnet and hasattr(exchange, 'set_sandbox_mode'):
-            exchange.set_sandbox_mode(True)
-        return exchange
+        return create_exchange(self.config)
+
+    def load_markets(self) -> dict:
+        """Exchange markets, from the on-disk cache when it is fresh."""
+        try:
+            return load_markets(self.exchange, ttl=self.config.data.markets_cache_hours * 3600)
+        except Exception as e:
+            logger.error(f"Error loading markets: {e}")
+            return None
 
+    @timed('fetch_ohlcv')
     def fetch_ohlcv(self, symbol: str, timeframe: str = '1h', limit: int = 1000):
-        """Fetch historical OHLCV data."""
+        """Fetch historical OHLCV data.
+
+        With DataConfig.cache_enabled, only candles newer than the local store
+        (plus any detected gaps) are requested and the window is served from disk.
+        """
+        if self.store is not None:
+            return self._fetch_cached(symbol, timeframe, limit)
         try:
             logger.info(f"Fetching {limit} candles for {symbol} on {timeframe}")
+            API_CALLS.inc(method='fetch_ohlcv')
             ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
             df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
             df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
@@ -43,40 +156,113 @@ class DataEngine:
             logger.error(f"Error fetching data: {e}")
             return None
 
+    def _fetch_cached(self, symbol: str, timeframe: str, limit: int):
+        """Delta-sync the candle store, then read the window from it."""
+        try:
+            self.sync_candles(symbol, timeframe, limit)
+        except Exception as e:
+            logger.error(f"Error syncing candles for {symbol}: {e}")
+        df = self.store.read(self.exchange.id, symbol, timeframe, limit=limit)
+        return df if not df.empty else None
+
+    def sync_candles(self, symbol: str, timeframe: str = '1h', limit: int = 1000, page_size: int = 1000):
+        """Fetch candles missing from the local store and return how many were written."""
+        exchange_id = self.exchange.id
+        tf_ms = self.exchange.parse_timeframe(timeframe) * 1000
+        now = self.exchange.milliseconds()
+        horizon = now - self.config.data.lookback_days * 24 * 60 * 60 * 1000
+
+        last = self.store.last_timestamp(exchange_id, symbol, timeframe)
+        if last is None:
+            since = now - limit * tf_ms
+        else:
+            # Refetch the newest stored candle: it may have been stored while open
+            since = max(last, horizon)
+        written = self._fetch_range(symbol, timeframe, since, now, page_size)
+
+        for start, end in self.store.find_gaps(exchange_id, symbol, timeframe, tf_ms, since=horizon):
+            logger.info(f"Backfilling {symbol} {timeframe} gap {start}-{end}")
+            filled = self._fetch_range(symbol, timeframe, start, end, page_size)
+            if filled == 0:
+                self.store.mark_gap_checked(exchange_id, symbol, timeframe, (start, end))
+            written += filled
+        return written
+
+    def download_history(self, symbols: list = None, timeframe: str = None, days: int = None) -> dict:
+        """Bulk-download the last `days` (default DataConfig.lookback_days) into the candle store.
+
+        Pages are fetched concurrently on the async exchange; see HistoryDownloader.
+        Returns {symbol: candles written}.
+        """
+        import asyncio
+        from .downloader import HistoryDownloader
+        timeframe = timeframe or self.config.data.timeframe
+        until = self.exchange.milliseconds()
+        since = until - (days or self.config.data.lookback_days) * 24 * 60 * 60 * 1000
+        downloader = HistoryDownloader(self.config, store=self.store or CandleStore())
+        return asyncio.run(downloader.download(symbols, timeframe, since, until))
+
+    def _fetch_range(self, symbol: str, timeframe: str, since: int, until: int, page_size: int):
+        """Page through [since, until) into the store."""
+        written = 0
+        while since < until:
+            logger.info(f"Fetching {symbol} {timeframe} candles since {since}")
+            API_CALLS.inc(method='fetch_ohlcv')
+            page = self.exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=page_size)
+            ohlcv = [row for row in page if since <= row[0] < until]
+            if ohlcv:
+                written += self.store.write(self.exchange.id, symbol, timeframe, ohlcv)
+            if not ohlcv or len(page) < page_size:
+                break
+            since = ohlcv[-1][0] + 1
+        return written
+
+    @timed('indicators')
     def add_technical_indicators(self, df: pd.DataFrame):
         """Add basic technical indicators to the dataframe."""
         if df is None or df.empty:
             return df
             
-        # Simple Moving Averages
-        df['sma_20'] = df['close'].rolling(window=20).mean()
-        df['sma_50'] = df['close'].rolling(window=50).mean()
-        
-        # RSI
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        df['rsi'] = 100 - (100 / (1 + rs))
-        
-        # MACD
-        exp1 = df['close'].ewm(span=12, adjust=False).mean()
-        exp2 = df['close'].ewm(span=26, adjust=False).mean()
-        df['macd'] = exp1 - exp2
-        df['signal_line'] = df['macd'].ewm(span=9, adjust=False).mean()
-        
-        # Volatility (Bollinger Bands)
-        df['std'] = df['close'].rolling(window=20).std()
-        df['bb_upper'] = df['sma_20'] + (df['std'] * 2)
-        df['bb_lower'] = df['sma_20'] - (df['std'] * 2)
+        indicators = technical_indicators(df['close'], self.config.strategy)
+        df[indicators.columns] = indicators
         
         return df.dropna()
 
+    @timed('indicators_incremental')
+    def update_technical_indicators(self, df: pd.DataFrame, symbol: str, timeframe: str):
+        """Incrementally add indicators, computing only candles not seen before.
+
+        Keeps streaming state per (symbol, timeframe) and returns just the newly
+        ingested (or revised) rows; add_technical_indicators is the reference.
+        """
+        if df is None or df.empty:
+            return df
+        return self.indicators.update(symbol, timeframe, df)
+
+    def build_feature_matrix(self, symbols: list, timeframe: str = '1h', limit: int = 1000,
+                             base: str = None) -> FeatureMatrix:
+        """Fetch several pairs into one aligned FeatureMatrix with indicators.
+
+        With `base` (e.g. 'BTC/USDT'), cross-asset features against it are added too.
+        """
+        frames = {}
+        for symbol in symbols:
+            df = self.fetch_ohlcv(symbol, timeframe, limit)
+            if df is None or df.empty:
+                logger.warning(f"No candles for {symbol}, leaving it out of the feature matrix")
+                continue
+            frames[symbol] = df
+        if not frames:
+            return None
+        matrix = FeatureMatrix.from_frames(frames).compute_indicators(self.config.strategy)
+        if base is not None and base in matrix.symbols:
+            matrix.add_cross_asset(base)
+        return matrix
+
     def get_realtime_price(self, symbol: str):
-        """Fetch current ticker price."""
+        """Current price from the shared market-data hub."""
         try:
-            ticker = self.exchange.fetch_ticker(symbol)
-            return ticker['last']
+            return self.market_data.get_price(symbol)
         except Exception as e:
             logger.error(f"Error fetching realtime price: {e}")
             return None
@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import time
+from .config import Config
+from .candle_store import CandleStore
+from .data_engine import create_exchange, load_markets_async, normalize_symbol
+from .metrics import API_CALLS, REGISTRY, timed
+from .scheduler import Clock, RateLimiter
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_ROWS = REGISTRY.counter('trader_download_rows_total', 'Historical candles downloaded', ['symbol'])
+DOWNLOAD_RETRIES = REGISTRY.counter('trader_download_retries_total', 'Historical page fetches retried')
+
+
+class HistoryDownloader:
+    """Bulk OHLCV history into the CandleStore.
+
+    The requested range minus what the store already holds is split into
+    chunks of `page_size` candles, and chunks of every symbol are fetched
+    concurrently (at most `concurrency` requests in flight, all drawing from
+    one RateLimiter) with exponential backoff on network errors. Results are
+    consumed in chronological order, trimmed to their chunk so overlapping
+    pages dedupe, and flushed to the store every `flush_rows` candles, which
+    keeps writes on the store's append path and memory bounded.
+    """
+
+    def __init__(self, config: Config, exchange=None, store: CandleStore = None, limiter: RateLimiter = None,
+                 clock: Clock = None, page_size: int = None, concurrency: int = None, max_retries: int = 5,
+                 retry_delay: float = 1.0, flush_rows: int = 100_000):
+        self.config = config
+        self.exchange = exchange
+        self.store = store or CandleStore()
+        self.limiter = limiter
+        self.clock = clock or Clock()
+        self.page_size = page_size or config.data.download_page_size
+        self.concurrency = concurrency or config.data.download_concurrency
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.flush_rows = flush_rows
+        self._semaphore = None
+
+    async def download(self, symbols: list = None, timeframe: str = None, since: int = None,
+                       until: int = None) -> dict:
+        """Fill [since, until) (ms; default the last DataConfig.lookback_days) for every symbol.
+
+        Returns {symbol: candles written}.
+        """
+        owns_exchange = self.exchange is None
+        if owns_exchange:
+            import ccxt.async_support as ccxt_async
+            self.exchange = create_exchange(self.config, ccxt_async, enableRateLimit=False)
+        try:
+            if self.limiter is None:
+                self.limiter = RateLimiter.for_exchange(self.exchange, clock=self.clock)
+            await load_markets_async(self.exchange, limiter=self.limiter,
+                                     ttl=self.config.data.markets_cache_hours * 3600)
+            timeframe = timeframe or self.config.data.timeframe
+            until = until or self.exchange.milliseconds()
+            since = since or until - self.config.data.lookback_days * 24 * 60 * 60 * 1000
+            symbols = [normalize_symbol(p, self.exchange) for p in (symbols or self.config.data.pairs)]
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            started = time.perf_counter()
+            results = await asyncio.gather(*(self._download_symbol(s, timeframe, since, until) for s in symbols))
+            written = dict(zip(symbols, results))
+            logger.info(f"Downloaded {sum(written.values())} {timeframe} candles for {len(symbols)} symbols "
+                        f"in {time.perf_counter() - started:.1f}s")
+            return written
+        finally:
+            if owns_exchange:
+                await self.exchange.close()
+                self.exchange = None
+
+    def missing_ranges(self, symbol: str, timeframe: str, since: int, until: int) -> list:
+        """[start, end) ranges of [since, until) the store does not hold yet.
+
+        Each item is (start, end, gap) where `gap` is the store gap it came
+        from, or None for ranges before or after the stored series.
+        """
+        tf_ms = self.exchange.parse_timeframe(timeframe) * 1000
+        exchange_id = self.exchange.id
+        first = self.store.first_timestamp(exchange_id, symbol, timeframe)
+        if first is None:
+            return [(since, until, None)]
+        last = self.store.last_timestamp(exchange_id, symbol, timeframe)
+        ranges = []
+        if since < first:
+            ranges.append((since, min(first, until), None))
+        ranges += [(max(s, since), min(e, until), (s, e))
+                   for s, e in self.store.find_gaps(exchange_id, symbol, timeframe, tf_ms, since=since)
+                   if e > since and s < until]
+        # The newest stored candle may have been stored while still open
+        if last < until:
+            ranges.append((max(last, since), until, None))
+        return ranges
+
+    async def _download_symbol(self, symbol: str, timeframe: str, since: int, until: int) -> int:
+        tf_ms = self.exchange.parse_timeframe(timeframe) * 1000
+        written = 0
+        try:
+            for start, end, gap in self.missing_ranges(symbol, timeframe, since, until):
+                rows = await self._download_range(symbol, timeframe, start, end, tf_ms)
+                if rows == 0 and gap is not None:
+                    # A hole the exchange has no data for: do not ask again
+                    self.store.mark_gap_checked(self.exchange.id, symbol, timeframe, gap)
+                written += rows
+        except Exception as e:
+            logger.error(f"Downloading {symbol} {timeframe} failed after {written} candles: {e}")
+        DOWNLOAD_ROWS.inc(written, symbol=symbol)
+        return written
+
+    async def _download_range(self, symbol: str, timeframe: str, start: int, end: int, tf_ms: int) -> int:
+        # One probe finds where the exchange's history actually begins, so a
+        # range reaching back before the listing date is not walked page by page.
+        first_page = await self._fetch_chunk(symbol, timeframe, start, end, tf_ms, single_page=True)
+        if not first_page:
+            return 0
+        chunk = self.page_size * tf_ms
+        resume = first_page[-1][0] + tf_ms
+        tasks = [asyncio.ensure_future(self._fetch_chunk(symbol, timeframe, s, min(s + chunk, end), tf_ms))
+                 for s in range(resume, end, chunk)]
+        buffer, written = list(first_page), 0
+        try:
+            # Await in order: later chunks keep downloading while earlier ones are written
+            for task in tasks:
+                buffer.extend(await task)
+                if len(buffer) >= self.flush_rows:
+                    written += self.store.write(self.exchange.id, symbol, timeframe, buffer)
+                    buffer = []
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # Everything before a failed chunk is contiguous and worth keeping
+            if buffer:
+                written += self.store.write(self.exchange.id, symbol, timeframe, buffer)
+        logger.info(f"{symbol} {timeframe}: {written} candles for {start}-{end}")
+        return written
+
+    async def _fetch_chunk(self, symbol: str, timeframe: str, start: int, end: int, tf_ms: int,
+                           single_page: bool = False) -> list:
+        """Candles in [start, end), paging further if the exchange caps pages below page_size."""
+        rows = []
+        while start < end:
+            page = await self._fetch_page(symbol, timeframe, start)
+            page = [row for row in page if start <= row[0] < end]
+            if not page:
+                break
+            rows.extend(page)
+            if single_page:
+                break
+            start = page[-1][0] + tf_ms
+        return rows
+
+    async def _fetch_page(self, symbol: str, timeframe: str, since: int) -> list:
+        import ccxt
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                await self.limiter.acquire()
+                API_CALLS.inc(method='fetch_ohlcv')
+                try:
+                    with timed('download_page'):
+                        return await self.exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=self.page_size)
+                except ccxt.NetworkError as e:
+                    # Includes RateLimitExceeded, DDoSProtection and timeouts
+                    attempt += 1
+                    if attempt > self.max_retries:
+                        raise
+                    error = e
+            DOWNLOAD_RETRIES.inc()
+            delay = min(self.retry_delay * 2 ** (attempt - 1), 60.0)
+            logger.warning(f"{symbol} page {since} failed ({error}); retry {attempt} in {delay:.1f}s")
+            await self.clock.sleep(delay)
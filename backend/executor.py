@@ -1,44 +1,64 @@
-import ccxt
 import logging
+from typing import TYPE_CHECKING
 from .config import Config
+from .metrics import API_CALLS, timed
+
+if TYPE_CHECKING:
+    import ccxt
 
 logger = logging.getLogger(__name__)
 
 class ExecutionEngine:
     """Engine for executing trades (simulation or real)."""
     
-    def __init__(self, config: Config, exchange: ccxt.Exchange):
+    def __init__(self, config: Config, exchange: 'ccxt.Exchange', market_data=None, ledger=None):
         self.config = config
         self.exchange = exchange
+        self.market_data = market_data
+        self.ledger = ledger
         self.paper_balance = 10000.0 # Initial $10k for simulation
         self.positions = {} # symbol: amount
+        if ledger is not None:
+            # Resume the paper account where the last run left it
+            self.paper_balance = ledger.balance('paper_balance', self.paper_balance)
+            self.positions = {s: p.amount for s, p in ledger.open_positions('paper').items()}
         
+    @timed('execute_trade')
     def execute_trade(self, symbol: str, signal: int, amount: float):
         """Execute a trade based on signal."""
         if signal == 1: # Buy
-            if self.config.trading.mode == 'live':
+            if not self.config.trading.paper_trading:
                 return self._live_buy(symbol, amount)
             else:
                 return self._simulate_buy(symbol, amount)
         elif signal == -1: # Sell
-            if self.config.trading.mode == 'live':
+            if not self.config.trading.paper_trading:
                 return self._live_sell(symbol, amount)
             else:
                 return self._simulate_sell(symbol, amount)
         return None
 
+    def _market_price(self, symbol: str) -> float:
+        """Last price, from the shared market-data hub when one is attached."""
+        if self.market_data is not None:
+            return self.market_data.get_price(symbol)
+        API_CALLS.inc(method='fetch_ticker')
+        return self.exchange.fetch_ticker(symbol)['last']
+
     def _simulate_buy(self, symbol: str, amount: float):
         """Simulate a buy order."""
-        price = self.exchange.fetch_ticker(symbol)['last']
+        price = self._market_price(symbol) * (1 + self.config.trading.slippage_percent / 100)
         cost = amount * price
-        if cost > self.paper_balance:
+        fee = cost * self.config.trading.fee_rate
+        if cost + fee > self.paper_balance:
             logger.warning("Insufficient paper balance")
             return None
             
-        self.paper_balance -= cost
+        self.paper_balance -= cost + fee
         self.positions[symbol] = self.positions.get(symbol, 0) + amount
+        self._record(symbol, 'buy', amount, price, fee)
         logger.info(f"SIM BUY: {amount} {symbol} @ {price}. Balance: {self.paper_balance}")
-        return {"id": "sim_buy", "symbol": symbol, "amount": amount, "price": price}
+        return {"id": "sim_buy", "symbol": symbol, "amount": amount, "price": price, "fee": fee}
 
     def _simulate_sell(self, symbol: str, amount: float):
         """Simulate a sell order."""
@@ -46,18 +66,33 @@ class ExecutionEngine:
             logger.warning("Insufficient position to sell")
             return None
             
-        price = self.exchange.fetch_ticker(symbol)['last']
+        price = self._market_price(symbol) * (1 - self.config.trading.slippage_percent / 100)
         gain = amount * price
-        self.paper_balance += gain
+        fee = gain * self.config.trading.fee_rate
+        self.paper_balance += gain - fee
         self.positions[symbol] -= amount
+        self._record(symbol, 'sell', amount, price, fee)
         logger.info(f"SIM SELL: {amount} {symbol} @ {price}. Balance: {self.paper_balance}")
-        return {"id": "sim_sell", "symbol": symbol, "amount": amount, "price": price}
+        return {"id": "sim_sell", "symbol": symbol, "amount": amount, "price": price, "fee": fee}
+
+    def _record(self, symbol: str, side: str, amount: float, price: float, fee: float):
+        if self.ledger is not None:
+            self.ledger.record_trade(symbol, side, amount, price, fee)
+            self.ledger.set_balance(self.paper_balance)
+
+    def _record_live(self, symbol: str, side: str, order: dict):
+        if self.ledger is not None and order.get('filled') and order.get('average'):
+            fee = (order.get('fee') or {}).get('cost') or 0.0
+            self.ledger.record_trade(symbol, side, order['filled'], order['average'], fee,
+                                     order.get('clientOrderId') or order.get('id'), mode='live')
 
     def _live_buy(self, symbol: str, amount: float):
         """Place a live market buy order."""
         try:
+            API_CALLS.inc(method='create_order')
             order = self.exchange.create_market_buy_order(symbol, amount)
             logger.info(f"LIVE BUY ORDER: {order['id']}")
+            self._record_live(symbol, 'buy', order)
             return order
         except Exception as e:
             logger.error(f"Live buy failed: {e}")
@@ -66,8 +101,10 @@ class ExecutionEngine:
     def _live_sell(self, symbol: str, amount: float):
         """Place a live market sell order."""
         try:
+            API_CALLS.inc(method='create_order')
             order = self.exchange.create_market_sell_order(symbol, amount)
             logger.info(f"LIVE SELL ORDER: {order['id']}")
+            self._record_live(symbol, 'sell', order)
             return order
         except Exception as e:
             logger.error(f"Live sell failed: {e}")
@@ -0,0 +1,210 @@
+import logging
+import numpy as np
+import pandas as pd
+from .config import StrategyConfig
+from .indicators import INDICATOR_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+PRICE_FIELDS = ['open', 'high', 'low', 'close', 'volume']
+
+
+def _ffill(x: np.ndarray) -> np.ndarray:
+    """Forward-fill NaNs along the last axis; leading NaNs stay NaN."""
+    idx = np.where(np.isfinite(x), np.arange(x.shape[-1]), 0)
+    np.maximum.accumulate(idx, axis=-1, out=idx)
+    return np.take_along_axis(x, idx, axis=-1)
+
+
+def _rolling_sum(x: np.ndarray, window: int) -> np.ndarray:
+    """Rolling sum along the last axis in float64; NaN until `window` finite values."""
+    finite = np.isfinite(x)
+    csum = np.cumsum(np.where(finite, x, 0.0), axis=-1, dtype=np.float64)
+    out = csum.copy()
+    out[:, window:] -= csum[:, :-window]
+    if finite.all():
+        out[:, :window - 1] = np.nan
+        return out
+    count = np.cumsum(finite, axis=-1)
+    n = count.copy()
+    n[:, window:] -= count[:, :-window]
+    out[n < window] = np.nan
+    return out
+
+
+def _rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    return _rolling_sum(x, window) / window
+
+
+def _rolling_std(x: np.ndarray, window: int) -> np.ndarray:
+    """Sample standard deviation; rows are demeaned first to limit cancellation."""
+    x = x - np.nanmean(x, axis=-1, keepdims=True)
+    s = _rolling_sum(x, window)
+    sq = _rolling_sum(x * x, window)
+    var = (sq - s * s / window) / (window - 1)
+    return np.sqrt(np.clip(var, 0.0, None))
+
+
+def _ewm(x: np.ndarray, span: int) -> np.ndarray:
+    """pandas ewm(span, adjust=False).mean() along the last axis in one lfilter call."""
+    from scipy.signal import lfilter
+    alpha = 2.0 / (span + 1)
+    valid = np.isfinite(x)
+    first = valid.argmax(axis=-1)
+    # Seed every row with its first value so leading NaNs don't poison the filter
+    x0 = x[np.arange(len(x)), first]
+    y = lfilter([alpha], [1.0, alpha - 1.0], np.where(valid, x, x0[:, None]), axis=-1,
+                zi=((1 - alpha) * x0)[:, None])[0]
+    y[np.arange(x.shape[-1]) < first[:, None]] = np.nan
+    return y
+
+
+class FeatureMatrix:
+    """All pairs aligned on one time axis as (time x symbol) float32 arrays.
+
+    Every indicator is computed for all symbols in one vectorized pass down
+    the time axis. Nothing is dropped: warm-up periods and candles before a
+    symbol's listing are NaN, so rows stay aligned across symbols. Arrays are
+    column-major so each symbol's series is contiguous in memory.
+    """
+
+    def __init__(self, timestamps: np.ndarray, symbols: list, fields: dict):
+        self.timestamps = timestamps
+        self.symbols = list(symbols)
+        self.fields = {name: np.asarray(values).astype(np.float32, order='F', copy=False)
+                       for name, values in fields.items()}
+
+    @classmethod
+    def from_frames(cls, frames: dict) -> 'FeatureMatrix':
+        """Align {symbol: OHLCV DataFrame} on the union of their timestamps.
+
+        Interior gaps carry the last close forward with zero volume.
+        """
+        symbols = list(frames)
+        stamps = [frames[s]['timestamp'].to_numpy() for s in symbols]
+        timestamps = stamps[0]
+        for ts in stamps[1:]:
+            # Pairs usually share one calendar; only merge when they differ
+            if not np.array_equal(ts, timestamps):
+                timestamps = np.union1d(timestamps, ts)
+        # Built as (symbol, time) rows and handed over transposed
+        fields = {f: np.full((len(symbols), len(timestamps)), np.nan) for f in PRICE_FIELDS}
+        for j, (symbol, ts) in enumerate(zip(symbols, stamps)):
+            cols = slice(None) if len(ts) == len(timestamps) else np.searchsorted(timestamps, ts)
+            for f in PRICE_FIELDS:
+                fields[f][j, cols] = frames[symbol][f].to_numpy(dtype=np.float64)
+
+        missing = ~np.isfinite(fields['close'])
+        fields['close'] = _ffill(fields['close'])
+        for f in ('open', 'high', 'low'):
+            fields[f] = np.where(missing, fields['close'], fields[f])
+        fields['volume'] = np.where(missing & np.isfinite(fields['close']), 0.0, fields['volume'])
+        return cls(timestamps, symbols, {f: values.T for f, values in fields.items()})
+
+    @classmethod
+    def from_store(cls, store, exchange: str, symbols: list, timeframe: str,
+                   since: int = None, until: int = None) -> 'FeatureMatrix':
+        """Build straight from a CandleStore without going through the network."""
+        return cls.from_frames({s: store.read(exchange, s, timeframe, since=since, until=until) for s in symbols})
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.fields[name]
+
+    @property
+    def shape(self):
+        return len(self.timestamps), len(self.symbols)
+
+    def _rows(self, name: str) -> np.ndarray:
+        """A field as contiguous float64 (symbol, time) rows for computation."""
+        return np.ascontiguousarray(self.fields[name].T, dtype=np.float64)
+
+    def _set(self, name: str, rows: np.ndarray):
+        self.fields[name] = rows.T.astype(np.float32)
+
+    def compute_indicators(self, params: StrategyConfig = None) -> 'FeatureMatrix':
+        """Add the DataEngine indicator set for every symbol at once."""
+        p = params or StrategyConfig()
+        close = self._rows('close')
+        seen = np.cumsum(np.isfinite(close), axis=-1)
+
+        sma_fast = _rolling_mean(close, p.sma_fast)
+        std = _rolling_std(close, p.sma_fast)
+
+        delta = np.diff(close, axis=-1, prepend=np.nan)
+        # Mirror pandas: NaN deltas count as zero gain/loss
+        gain = _rolling_mean(np.where(delta > 0, delta, 0.0), p.rsi_period)
+        loss = _rolling_mean(np.where(delta < 0, -delta, 0.0), p.rsi_period)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = 100 - (100 / (1 + gain / loss))
+        rsi[seen < p.rsi_period] = np.nan
+
+        macd = _ewm(close, p.macd_fast) - _ewm(close, p.macd_slow)
+        computed = {
+            'sma_20': sma_fast,
+            'sma_50': _rolling_mean(close, p.sma_slow),
+            'rsi': rsi,
+            'macd': macd,
+            'signal_line': _ewm(macd, p.macd_signal),
+            'std': std,
+            'bb_upper': sma_fast + std * p.bb_std,
+            'bb_lower': sma_fast - std * p.bb_std,
+        }
+        for name, values in computed.items():
+            self._set(name, values)
+        return self
+
+    def add_cross_asset(self, base: str = 'BTC/USDT', window: int = 50) -> 'FeatureMatrix':
+        """Relative strength and rolling return correlation against `base`."""
+        if base not in self.symbols:
+            raise ValueError(f"{base} is not part of the matrix")
+        close = self._rows('close')
+        b = self.symbols.index(base)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            growth = np.full_like(close, np.nan)
+            growth[:, window:] = close[:, window:] / close[:, :-window]
+            self._set('rel_strength', growth / growth[b])
+
+            returns = np.diff(np.log(close), axis=-1, prepend=np.nan)
+            base_returns = np.broadcast_to(returns[b], returns.shape)
+            mx = _rolling_mean(returns, window)
+            my = _rolling_mean(base_returns, window)
+            cov = _rolling_mean(returns * base_returns, window) - mx * my
+            vx = _rolling_mean(returns * returns, window) - mx * mx
+            vy = _rolling_mean(base_returns * base_returns, window) - my * my
+            self._set('corr_base', cov / np.sqrt(vx * vy))
+        return self
+
+    def tensor(self, features: list = None) -> np.ndarray:
+        """(time, symbol, feature) float32 tensor."""
+        features = features or list(self.fields)
+        return np.stack([self.fields[f] for f in features], axis=-1)
+
+    def frame(self, symbol: str, features: list = None) -> pd.DataFrame:
+        """One symbol's columns as a DataFrame for ModelTrainer, from its first complete row."""
+        j = self.symbols.index(symbol)
+        features = features or list(self.fields)
+        df = pd.DataFrame({f: self.fields[f][:, j] for f in features})
+        df.insert(0, 'timestamp', self.timestamps)
+        complete = np.isfinite(df[features].to_numpy()).all(axis=1)
+        if not complete.any():
+            return df.iloc[0:0]
+        return df.iloc[complete.argmax():].reset_index(drop=True)
+
+    def xgb_dataset(self, features: list = None, horizon: int = 1, since: int = None):
+        """Rows from every symbol with a next-`horizon` up/down label.
+
+        Returns (X, y) with X float32 of shape (n_rows, n_features); rows with
+        any NaN feature or no future close are skipped, as are rows at or
+        before `since` (epoch ms) when given.
+        """
+        features = features or INDICATOR_COLUMNS
+        start = 0
+        if since is not None:
+            bound = np.datetime64(int(since), 'ms') if np.issubdtype(self.timestamps.dtype, np.datetime64) else since
+            start = int(np.searchsorted(self.timestamps, bound, side='right'))
+        X = self.tensor(features)[start:-horizon].reshape(-1, len(features))
+        close = self.fields['close']
+        future = close[start + horizon:]
+        y = (future > close[start:-horizon]).astype(np.int8).reshape(-1)
+        keep = np.isfinite(X).all(axis=1) & np.isfinite(future).reshape(-1)
+        return X[keep], y[keep]
@@ -0,0 +1,289 @@
+import math
+import logging
+from collections import deque
+import pandas as pd
+from .config import StrategyConfig
+
+logger = logging.getLogger(__name__)
+
+INDICATOR_COLUMNS = ['sma_20', 'sma_50', 'rsi', 'macd', 'signal_line', 'std', 'bb_upper', 'bb_lower']
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+class _RollingWindow:
+    """Fixed-size window keeping a running sum and Welford mean/variance."""
+
+    # Re-anchor the running statistics from the window contents this often
+    # so floating-point drift stays bounded on long-running streams.
+    RESYNC_EVERY = 4096
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values = deque()
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.nonzero = 0
+        self.pushes = 0
+        self._saved = None
+
+    def push(self, x: float):
+        """Add a value, evicting the oldest one once the window is full."""
+        evicted = self.values.popleft() if len(self.values) == self.size else None
+        self._saved = (self.total, self.mean, self.m2, self.nonzero, self.pushes, evicted)
+        self.values.append(x)
+        self.pushes += 1
+
+        if evicted is None:
+            n = len(self.values)
+            self.total += x
+            d = x - self.mean
+            self.mean += d / n
+            self.m2 += d * (x - self.mean)
+        else:
+            self.total += x - evicted
+            new_mean = self.mean + (x - evicted) / self.size
+            self.m2 += (x - evicted) * (x - new_mean + evicted - self.mean)
+            self.mean = new_mean
+            if evicted != 0:
+                self.nonzero -= 1
+        if x != 0:
+            self.nonzero += 1
+
+        if self.pushes % self.RESYNC_EVERY == 0:
+            self._resync()
+
+    def undo(self):
+        """Revert the most recent push."""
+        if self._saved is None:
+            raise RuntimeError("Nothing to undo")
+        self.total, self.mean, self.m2, self.nonzero, self.pushes, evicted = self._saved
+        self.values.pop()
+        if evicted is not None:
+            self.values.appendleft(evicted)
+        self._saved = None
+
+    def _resync(self):
+        n = len(self.values)
+        self.total = math.fsum(self.values)
+        self.mean = self.total / n
+        self.m2 = math.fsum((v - self.mean) ** 2 for v in self.values)
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.size
+
+    def sum(self) -> float:
+        # Exact zero when the window holds only zeros, like pandas' rolling sums.
+        return self.total if self.nonzero else 0.0
+
+    def var(self) -> float:
+        """Sample variance (ddof=1)."""
+        return max(self.m2, 0.0) / (len(self.values) - 1)
+
+
+def technical_indicators(close: pd.Series, params: StrategyConfig = None) -> pd.DataFrame:
+    """Vectorized indicator columns for a close series (no warm-up rows dropped)."""
+    p = params or StrategyConfig()
+    out = pd.DataFrame(index=close.index)
+    out['sma_20'] = close.rolling(window=p.sma_fast).mean()
+    out['sma_50'] = close.rolling(window=p.sma_slow).mean()
+
+    delta = close.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=p.rsi_period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=p.rsi_period).mean()
+    rs = gain / loss
+    out['rsi'] = 100 - (100 / (1 + rs))
+
+    exp1 = close.ewm(span=p.macd_fast, adjust=False).mean()
+    exp2 = close.ewm(span=p.macd_slow, adjust=False).mean()
+    out['macd'] = exp1 - exp2
+    out['signal_line'] = out['macd'].ewm(span=p.macd_signal, adjust=False).mean()
+
+    out['std'] = close.rolling(window=p.sma_fast).std()
+    out['bb_upper'] = out['sma_20'] + (out['std'] * p.bb_std)
+    out['bb_lower'] = out['sma_20'] - (out['std'] * p.bb_std)
+    return out
+
+
+class StreamingIndicators:
+    """O(1)-per-candle indicator state for a single (symbol, timeframe) stream.
+
+    Mirrors DataEngine.add_technical_indicators, which remains the reference
+    implementation. Re-sending the latest candle (same timestamp) revises it in
+    place, so the still-open candle returned by exchanges can be streamed too.
+    """
+
+    def __init__(self, params: StrategyConfig = None):
+        self.params = params or StrategyConfig()
+        self.sma_20 = _RollingWindow(self.params.sma_fast)
+        self.sma_50 = _RollingWindow(self.params.sma_slow)
+        self.gain = _RollingWindow(self.params.rsi_period)
+        self.loss = _RollingWindow(self.params.rsi_period)
+        self.ema_12 = None
+        self.ema_26 = None
+        self.signal = None
+        self.prev_close = None
+        self.last_timestamp = None
+        self.count = 0
+        self._saved = None
+
+    @staticmethod
+    def _ewm(prev, x, span):
+        if prev is None:
+            return x
+        alpha = 2.0 / (span + 1)
+        return prev + alpha * (x - prev)
+
+    def seed(self, timestamps, closes):
+        """Initialise state from a history in one vectorized pass.
+
+        Equivalent to calling update() for every candle, but the EWM recursions
+        run through pandas so long histories bootstrap in milliseconds.
+        """
+        closes = pd.Series(closes, dtype='float64')
+        p = self.params
+        ema_12 = closes.ewm(span=p.macd_fast, adjust=False).mean()
+        ema_26 = closes.ewm(span=p.macd_slow, adjust=False).mean()
+        signal = (ema_12 - ema_26).ewm(span=p.macd_signal, adjust=False).mean()
+        deltas = closes.diff().fillna(0.0).to_numpy()
+        values = closes.to_numpy()
+
+        for window, data in ((self.sma_20, values), (self.sma_50, values),
+                             (self.gain, deltas.clip(min=0.0)), (self.loss, (-deltas).clip(min=0.0))):
+            for x in data[-window.size:]:
+                window.push(float(x))
+            window._saved = None
+
+        self.ema_12 = float(ema_12.iloc[-1])
+        self.ema_26 = float(ema_26.iloc[-1])
+        self.signal = float(signal.iloc[-1])
+        self.prev_close = float(values[-1])
+        self.last_timestamp = timestamps[-1]
+        self.count = len(values)
+        self._saved = None
+
+    def _undo(self):
+        (self.ema_12, self.ema_26, self.signal, self.prev_close,
+         self.last_timestamp, self.count) = self._saved
+        for window in (self.sma_20, self.sma_50, self.gain, self.loss):
+            window.undo()
+        self._saved = None
+
+    def update(self, timestamp, close: float) -> dict:
+        """Feed one candle close and return the indicator values for it."""
+        if self.last_timestamp is not None:
+            if timestamp == self.last_timestamp and self._saved is not None:
+                self._undo()
+            elif timestamp < self.last_timestamp:
+                raise ValueError(f"Out-of-order candle {timestamp} < {self.last_timestamp}")
+
+        self._saved = (self.ema_12, self.ema_26, self.signal, self.prev_close,
+                       self.last_timestamp, self.count)
+
+        close = float(close)
+        # The first diff is NaN, which the pandas path maps to a zero gain/loss.
+        delta = close - self.prev_close if self.prev_close is not None else 0.0
+        self.gain.push(delta if delta > 0 else 0.0)
+        self.loss.push(-delta if delta < 0 else 0.0)
+        self.sma_20.push(close)
+        self.sma_50.push(close)
+
+        p = self.params
+        self.ema_12 = self._ewm(self.ema_12, close, p.macd_fast)
+        self.ema_26 = self._ewm(self.ema_26, close, p.macd_slow)
+        macd = self.ema_12 - self.ema_26
+        self.signal = self._ewm(self.signal, macd, p.macd_signal)
+
+        self.prev_close = close
+        self.last_timestamp = timestamp
+        self.count += 1
+        return self.values()
+
+    def values(self) -> dict:
+        """Indicator values for the latest candle (NaN while warming up)."""
+        nan = float('nan')
+        sma_20 = self.sma_20.sum() / self.sma_20.size if self.sma_20.full else nan
+        sma_50 = self.sma_50.sum() / self.sma_50.size if self.sma_50.full else nan
+
+        rsi = nan
+        if self.gain.full:
+            gain, loss = self.gain.sum(), self.loss.sum()
+            if loss > 0:
+                rsi = 100 - (100 / (1 + gain / loss))
+            elif gain > 0:
+                rsi = 100.0
+
+        std = math.sqrt(self.sma_20.var()) if self.sma_20.full else nan
+        macd = self.ema_12 - self.ema_26 if self.ema_12 is not None else nan
+        return {
+            'sma_20': sma_20,
+            'sma_50': sma_50,
+            'rsi': rsi,
+            'macd': macd,
+            'signal_line': self.signal if self.signal is not None else nan,
+            'std': std,
+            'bb_upper': sma_20 + std * self.params.bb_std,
+            'bb_lower': sma_20 - std * self.params.bb_std,
+        }
+
+
+class IndicatorEngine:
+    """Keeps streaming indicator state per (symbol, timeframe)."""
+
+    # Fresh streams with a longer history are seeded through the pandas
+    # reference path instead of being replayed candle by candle.
+    SEED_THRESHOLD = 256
+
+    def __init__(self, params: StrategyConfig = None):
+        self.params = params
+        self.streams = {}
+
+    def get_stream(self, symbol: str, timeframe: str) -> StreamingIndicators:
+        key = (symbol, timeframe)
+        if key not in self.streams:
+            self.streams[key] = StreamingIndicators(self.params)
+        return self.streams[key]
+
+    def reset(self, symbol: str = None, timeframe: str = None):
+        """Drop state for one stream, or for all streams when called without arguments."""
+        if symbol is None:
+            self.streams.clear()
+        else:
+            self.streams.pop((symbol, timeframe), None)
+
+    def update(self, symbol: str, timeframe: str, df: pd.DataFrame) -> pd.DataFrame:
+        """Ingest candles not yet seen for this stream.
+
+        Returns the OHLCV rows that were ingested (including a revised latest
+        candle) with indicator columns appended, dropping warm-up rows exactly
+        like add_technical_indicators does.
+        """
+        if df is None or df.empty:
+            return df
+
+        stream = self.get_stream(symbol, timeframe)
+        timestamps = df['timestamp'].to_numpy()
+        start = 0
+        if stream.last_timestamp is not None:
+            start = int(timestamps.searchsorted(stream.last_timestamp, side='left'))
+        if start >= len(df):
+            return df.iloc[0:0].reindex(columns=list(df.columns) + INDICATOR_COLUMNS)
+
+        closes = df['close'].to_numpy()
+        seeded = None
+        if stream.count == 0 and len(df) > self.SEED_THRESHOLD:
+            # Seed on everything but the latest candle so it stays revisable.
+            stream.seed(timestamps[:-1], closes[:-1])
+            seeded = df.iloc[:-1].copy()
+            seeded[INDICATOR_COLUMNS] = technical_indicators(seeded['close'], self.params)
+            start = len(df) - 1
+
+        rows = [stream.update(timestamps[i], closes[i]) for i in range(start, len(df))]
+        data = {col: df[col].to_numpy()[start:] for col in df.columns}
+        for col in INDICATOR_COLUMNS:
+            data[col] = [row[col] for row in rows]
+        new = pd.DataFrame(data, index=df.index[start:])
+        if seeded is not None:
+            new = pd.concat([seeded, new])
+        return new.dropna()
@@ -0,0 +1,344 @@
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+import pandas as pd
+from sqlalchemy import (Column, Float, Index, Integer, MetaData, String, Table, and_, create_engine, event, func,
+                        inspect, select)
+
+logger = logging.getLogger(__name__)
+
+metadata = MetaData()
+
+trades = Table(
+    'trades', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('ts', Float, nullable=False),
+    Column('symbol', String(32), nullable=False),
+    Column('side', String(4), nullable=False),
+    Column('amount', Float, nullable=False),
+    Column('price', Float, nullable=False),
+    Column('fee', Float, nullable=False, default=0.0),
+    Column('realized_pnl', Float, nullable=False, default=0.0),
+    Column('order_id', String(64)),
+    Column('mode', String(8), nullable=False),
+    Index('ix_trades_symbol_ts', 'symbol', 'ts'),
+)
+
+positions = Table(
+    'positions', metadata,
+    # Paper and live books are kept apart, so a paper run never restores live positions
+    Column('mode', String(8), primary_key=True),
+    Column('symbol', String(32), primary_key=True),
+    Column('amount', Float, nullable=False),
+    Column('avg_price', Float, nullable=False),
+    Column('realized_pnl', Float, nullable=False),
+    Column('updated_at', Float, nullable=False),
+)
+
+account = Table(
+    'account', metadata,
+    Column('name', String(32), primary_key=True),
+    Column('value', Float, nullable=False),
+)
+
+_EPSILON = 1e-12
+
+
+@dataclass
+class Position:
+    symbol: str
+    amount: float = 0.0
+    avg_price: float = 0.0
+    realized_pnl: float = 0.0
+    updated_at: float = 0.0
+    mode: str = 'paper'
+
+    def apply(self, signed_amount: float, price: float, fee: float = 0.0) -> float:
+        """Fold a fill into the position; returns the PnL it realised (net of fee)."""
+        realized = -fee
+        if abs(self.amount) < _EPSILON or (self.amount > 0) == (signed_amount > 0):
+            total = abs(self.amount) + abs(signed_amount)
+            self.avg_price = (abs(self.amount) * self.avg_price + abs(signed_amount) * price) / total
+            self.amount += signed_amount
+        else:
+            closing = min(abs(signed_amount), abs(self.amount))
+            direction = 1 if self.amount > 0 else -1
+            realized += closing * (price - self.avg_price) * direction
+            self.amount += signed_amount
+            if abs(self.amount) < _EPSILON:
+                self.amount, self.avg_price = 0.0, 0.0
+            elif (self.amount > 0) != (direction > 0):
+                # Flipped through flat: the remainder opened at this price
+                self.avg_price = price
+        self.realized_pnl += realized
+        return realized
+
+
+class Ledger:
+    """Trades, positions and paper balance persisted through SQLAlchemy.
+
+    Reads come from an in-memory index loaded at start-up, so current
+    positions are dict lookups. Writes are queued and flushed in batches by a
+    background thread, so recording a trade never waits on the database. A
+    failed write is retried `retries` times with exponential backoff; after
+    that its records go out again ahead of the next batch, and close() logs
+    any still unwritten (left in `failed`). Any SQLAlchemy URL works; SQLite
+    runs in WAL mode so the dashboard can read while the bot writes.
+
+    Positions are booked per mode ('paper' or 'live') and symbol.
+    """
+
+    def __init__(self, url: str = "sqlite:///data/ledger.db", batch_size: int = 500,
+                 flush_interval: float = 0.5, retries: int = 3, retry_delay: float = 0.5):
+        if url.startswith('sqlite:///') and not url.startswith('sqlite:///:memory:'):
+            Path(url[len('sqlite:///'):]).parent.mkdir(parents=True, exist_ok=True)
+        self.engine = create_engine(url)
+        if self.engine.dialect.name == 'sqlite':
+            event.listen(self.engine, 'connect', _sqlite_pragmas)
+        self._migrate()
+        metadata.create_all(self.engine)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.failed = []
+        self.positions = {}  # (mode, symbol) -> Position
+        self.balances = {}
+        self._order_fills = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._writer = None
+        self._load()
+
+    def _migrate(self):
+        """Re-key a positions table from before modes by the mode of each symbol's last trade."""
+        schema = inspect(self.engine)
+        if not schema.has_table('positions'):
+            return
+        if 'mode' in {c['name'] for c in schema.get_columns('positions')}:
+            return
+        with self.engine.begin() as conn:
+            old = conn.exec_driver_sql("SELECT symbol, amount, avg_price, realized_pnl, updated_at "
+                                       "FROM positions").mappings().all()
+            modes = {}
+            if schema.has_table('trades'):
+                for row in conn.execute(select(trades.c.symbol, trades.c.mode).order_by(trades.c.ts)):
+                    modes[row.symbol] = row.mode
+            conn.exec_driver_sql("DROP TABLE positions")
+            positions.create(conn)
+            if old:
+                conn.execute(positions.insert(), [dict(row, mode=modes.get(row['symbol'], 'paper')) for row in old])
+        logger.info(f"Migrated {len(old)} ledger positions to per-mode keys")
+
+    def _load(self):
+        with self.engine.connect() as conn:
+            for row in conn.execute(select(positions)):
+                self.positions[(row.mode, row.symbol)] = Position(row.symbol, row.amount, row.avg_price,
+                                                                  row.realized_pnl, row.updated_at, row.mode)
+            for row in conn.execute(select(account)):
+                self.balances[row.name] = row.value
+
+    # -- reads --------------------------------------------------------------------
+
+    def position(self, symbol: str, mode: str = 'paper') -> Position:
+        return self.positions.get((mode, symbol)) or Position(symbol, mode=mode)
+
+    def open_positions(self, mode: str = 'paper') -> dict:
+        """{symbol: Position} of the `mode` book with a non-zero amount."""
+        return {s: p for (m, s), p in self.positions.items() if m == mode and abs(p.amount) >= _EPSILON}
+
+    def balance(self, name: str = 'paper_balance', default: float = None):
+        return self.balances.get(name, default)
+
+    # -- writes -------------------------------------------------------------------
+
+    def record_trade(self, symbol: str, side: str, amount: float, price: float, fee: float = 0.0,
+                     order_id: str = None, mode: str = 'paper', ts: float = None) -> dict:
+        """Apply a fill to the in-memory book and queue it for persistence."""
+        ts = ts or time.time()
+        signed = amount if side == 'buy' else -amount
+        with self._lock:
+            position = self.positions.get((mode, symbol))
+            if position is None:
+                position = self.positions[(mode, symbol)] = Position(symbol, mode=mode)
+            realized = position.apply(signed, price, fee)
+            position.updated_at = ts
+            snapshot = dict(mode=mode, symbol=symbol, amount=position.amount, avg_price=position.avg_price,
+                            realized_pnl=position.realized_pnl, updated_at=ts)
+        trade = dict(ts=ts, symbol=symbol, side=side, amount=amount, price=price, fee=fee,
+                     realized_pnl=realized, order_id=order_id, mode=mode)
+        self._enqueue(('trade', trade))
+        self._enqueue(('position', snapshot))
+        return trade
+
+    def set_balance(self, value: float, name: str = 'paper_balance'):
+        self.balances[name] = value
+        self._enqueue(('account', {'name': name, 'value': value}))
+
+    def on_order_update(self, order):
+        """OrderPipeline callback: record newly filled quantity of a live order."""
+        recorded = self._order_fills.get(order.client_id, 0.0)
+        delta = order.filled - recorded
+        if delta <= _EPSILON or order.average is None:
+            return
+        self._order_fills[order.client_id] = order.filled
+        fee = order.fee * delta / order.filled if order.filled else 0.0
+        self.record_trade(order.symbol, order.side, delta, order.average, fee, order.client_id, mode='live')
+
+    # -- background writer ---------------------------------------------------------
+
+    def _enqueue(self, item):
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._run, name="ledger-writer", daemon=True)
+                    self._writer.start()
+        self._queue.put(item)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write_or_requeue(batch)
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write_or_requeue(self, batch: list):
+        """Write earlier failed records and `batch`, retrying; keep them in `failed` if it never succeeds."""
+        with self._lock:
+            records, self.failed = self.failed + batch, []
+        for attempt in range(self.retries + 1):
+            try:
+                self._write(records)
+                return
+            except Exception as e:
+                if attempt == self.retries:
+                    logger.error(f"Ledger write of {len(records)} records failed {attempt + 1} times, "
+                                 f"retrying with the next batch: {e}")
+                else:
+                    delay = self.retry_delay * 2 ** attempt
+                    logger.warning(f"Ledger write failed, retrying in {delay:.1f}s: {e}")
+                    time.sleep(delay)
+        with self._lock:
+            self.failed = records + self.failed
+
+    def _write(self, batch: list):
+        trade_rows = [row for kind, row in batch if kind == 'trade']
+        # Only the latest snapshot of each position/balance needs writing
+        position_rows = {(row['mode'], row['symbol']): row for kind, row in batch if kind == 'position'}
+        account_rows = {row['name']: row for kind, row in batch if kind == 'account'}
+        with self.engine.begin() as conn:
+            if trade_rows:
+                conn.execute(trades.insert(), trade_rows)
+            if position_rows:
+                self._upsert(conn, positions, list(position_rows.values()), 'mode', 'symbol')
+            if account_rows:
+                self._upsert(conn, account, list(account_rows.values()), 'name')
+
+    def _native_insert(self):
+        """The dialect's INSERT construct with ON CONFLICT DO UPDATE, if it has one."""
+        dialect = self.engine.dialect.name
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        elif dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            return None
+        return insert
+
+    def _upsert(self, conn, table: Table, rows: list, *key: str):
+        """Write `rows`, replacing any existing row with the same `key`."""
+        insert = self._native_insert()
+        if insert is not None:
+            stmt = insert(table)
+            conn.execute(stmt.on_conflict_do_update(
+                index_elements=list(key),
+                set_={c.name: stmt.excluded[c.name] for c in table.columns if c.name not in key}), rows)
+            return
+        # Other databases: update in place and insert the rows that matched nothing
+        for row in rows:
+            match = and_(*(table.c[k] == row[k] for k in key))
+            if conn.execute(table.update().where(match).values(**row)).rowcount == 0:
+                conn.execute(table.insert().values(**row))
+
+    def flush(self):
+        """Block until every queued record has been written or has failed its retries (see `failed`)."""
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self):
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+        if self.failed:
+            # One last attempt now that nothing else is queued
+            self._write_or_requeue([])
+        if self.failed:
+            logger.error(f"Ledger closed with {len(self.failed)} records not written; they remain in Ledger.failed")
+        self.engine.dispose()
+
+    # -- reporting -------------------------------------------------------------------
+
+    def pnl_summary(self, prices: dict = None) -> pd.DataFrame:
+        """Per-mode, per-symbol position, realised/unrealised PnL, fees and volume.
+
+        Reads the database rather than the in-memory book, so another process
+        (the dashboard) sees what the bot has written. Trade aggregates come
+        from one GROUP BY over the (symbol, ts) index. `prices` (a dict or a
+        symbol -> price callable) is consulted for open positions only.
+        """
+        totals = select(
+            trades.c.symbol,
+            trades.c.mode,
+            func.count().label('trades'),
+            func.sum(trades.c.fee).label('fees'),
+            func.sum(trades.c.amount * trades.c.price).label('volume'),
+            func.max(trades.c.ts).label('last_trade'),
+        ).group_by(trades.c.symbol, trades.c.mode).subquery()
+        query = select(
+            positions.c.mode, positions.c.symbol, positions.c.amount, positions.c.avg_price,
+            positions.c.realized_pnl, totals.c.trades, totals.c.fees, totals.c.volume, totals.c.last_trade,
+        ).select_from(positions.outerjoin(totals, (positions.c.symbol == totals.c.symbol)
+                                          & (positions.c.mode == totals.c.mode)))
+        columns = ['mode', 'symbol', 'amount', 'avg_price', 'realized_pnl', 'trades', 'fees', 'volume',
+                   'last_trade']
+        with self.engine.connect() as conn:
+            df = pd.DataFrame(conn.execute(query).all(), columns=columns)
+        price_of = prices if callable(prices) else (prices or {}).get
+        df['price'] = pd.to_numeric(pd.Series(
+            [price_of(s) if abs(a) >= _EPSILON else None for s, a in zip(df['symbol'], df['amount'])],
+            dtype=object), errors='coerce')
+        df['unrealized_pnl'] = (df['price'] - df['avg_price']) * df['amount']
+        return df
+
+    def recent_trades(self, limit: int = 50) -> pd.DataFrame:
+        query = select(trades).order_by(trades.c.ts.desc()).limit(limit)
+        with self.engine.connect() as conn:
+            return pd.DataFrame(conn.execute(query).mappings().all())
+
+
+def _sqlite_pragmas(dbapi_connection, _):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import threading
+import time
+from .metrics import API_CALLS
+
+logger = logging.getLogger(__name__)
+
+
+class MarketDataHub:
+    """Shared best bid/ask/last per symbol for every price consumer.
+
+    Quotes come from a WebSocket ticker subscription when streaming is
+    started (any object exposing ccxt.pro's async watch_ticker/watch_tickers,
+    so a local fake exchange can stand in for tests). Without a fresh streamed
+    quote, prices fall back to REST fetch_ticker results cached for `ttl`
+    seconds, with concurrent callers sharing one in-flight request. With
+    `sandbox` (BinanceConfig.testnet) the stream connects to the exchange's
+    testnet like the REST client.
+    """
+
+    def __init__(self, exchange, ttl: float = 2.0, stale_after: float = 10.0, sandbox: bool = False):
+        self.exchange = exchange
+        self.sandbox = sandbox
+        self.ttl = ttl
+        self.stale_after = stale_after
+        self.quotes = {}
+        self.rest_calls = 0
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._thread = None
+        self._loop = None
+        self._stream_task = None
+
+    def _lock(self, symbol: str) -> threading.Lock:
+        with self._locks_guard:
+            if symbol not in self._locks:
+                self._locks[symbol] = threading.Lock()
+            return self._locks[symbol]
+
+    def on_ticker(self, ticker: dict, source: str = 'stream'):
+        """Record a ccxt-style ticker."""
+        self.quotes[ticker['symbol']] = {
+            'symbol': ticker['symbol'],
+            'bid': ticker.get('bid'),
+            'ask': ticker.get('ask'),
+            'last': ticker.get('last'),
+            'close': ticker.get('close'),
+            'timestamp': ticker.get('timestamp'),
+            'received': time.monotonic(),
+            'source': source,
+        }
+
+    def _fresh(self, symbol: str):
+        quote = self.quotes.get(symbol)
+        if quote is None:
+            return None
+        max_age = self.stale_after if quote['source'] == 'stream' else self.ttl
+        return quote if time.monotonic() - quote['received'] <= max_age else None
+
+    def get_ticker(self, symbol: str) -> dict:
+        """Latest quote, from the stream if fresh, else a TTL-cached REST poll."""
+        quote = self._fresh(symbol)
+        if quote is not None:
+            return quote
+        with self._lock(symbol):
+            # Another thread may have refreshed it while we waited
+            quote = self._fresh(symbol)
+            if quote is None:
+                self.rest_calls += 1
+                API_CALLS.inc(method='fetch_ticker')
+                self.on_ticker(self.exchange.fetch_ticker(symbol), source='rest')
+                quote = self.quotes[symbol]
+        return quote
+
+    def get_price(self, symbol: str) -> float:
+        """Last trade price, else the close, else the bid/ask mid (or whichever side is quoted)."""
+        quote = self.get_ticker(symbol)
+        for key in ('last', 'close'):
+            if quote.get(key) is not None:
+                return quote[key]
+        sides = [quote[key] for key in ('bid', 'ask') if quote.get(key) is not None]
+        if not sides:
+            raise ValueError(f"No price in {symbol} ticker")
+        return sum(sides) / len(sides)
+
+    # -- streaming --------------------------------------------------------------
+
+    def _stream_client(self):
+        """ccxt.pro client for the REST exchange's venue, options and sandbox mode."""
+        import ccxt.pro as ccxtpro
+        client = getattr(ccxtpro, self.exchange.id)({'options': getattr(self.exchange, 'options', {})})
+        if self.sandbox:
+            client.set_sandbox_mode(True)
+        return client
+
+    def start(self, symbols: list, stream_exchange=None):
+        """Subscribe to tickers for `symbols` on a background event loop."""
+        if self._thread is not None:
+            return
+        if stream_exchange is None:
+            stream_exchange = self._stream_client()
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._stream_task = self._loop.create_task(self._stream(stream_exchange, list(symbols)))
+            ready.set()
+            try:
+                self._loop.run_until_complete(self._stream_task)
+            except asyncio.CancelledError:
+                pass
+            finally:
+                self._loop.run_until_complete(stream_exchange.close())
+                self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="market-data", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def stop(self, timeout: float = 5.0):
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._stream_task.cancel)
+        self._thread.join(timeout)
+        self._thread = None
+
+    async def _stream(self, exchange, symbols: list):
+        has = getattr(exchange, 'has', {}) or {}
+        if has.get('watchTickers'):
+            await self._watch(lambda: exchange.watch_tickers(symbols), many=True)
+        else:
+            await asyncio.gather(*(self._watch(lambda s=s: exchange.watch_ticker(s)) for s in symbols))
+
+    async def _watch(self, watch, many: bool = False):
+        backoff = 1.0
+        while True:
+            try:
+                result = await watch()
+                tickers = result.values() if many else [result]
+                for ticker in tickers:
+                    self.on_ticker(ticker)
+                backoff = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Ticker stream error: {e}; retrying in {backoff:.0f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
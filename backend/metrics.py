@@ -0,0 +1,300 @@
+import asyncio
+import functools
+import logging
+import sys
+import threading
+import time
+from collections import Counter as _Tally, deque
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def _label_str(labelnames, key, extra: str = '') -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(labelnames, key)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic count per label set."""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> list:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_str(self.labelnames, key)} {value}")
+        return lines
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {','.join(key): value for key, value in self._values.items()}
+
+
+class Summary(_Metric):
+    """Count, sum and quantiles over the most recent `window` observations."""
+
+    kind = 'summary'
+
+    def __init__(self, name: str, help: str, labelnames=(), window: int = 1024):
+        super().__init__(name, help, labelnames)
+        self.window = window
+        self._series = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'count': 0, 'sum': 0.0, 'recent': deque(maxlen=self.window)}
+            series['count'] += 1
+            series['sum'] += value
+            series['recent'].append(value)
+
+    def quantile(self, q: float, **labels):
+        series = self._series.get(self._key(labels))
+        if series is None:
+            return None
+        with self._lock:
+            values = sorted(series['recent'])
+        return values[min(int(q * len(values)), len(values) - 1)]
+
+    def time(self, **labels) -> '_Timer':
+        """Context manager / decorator observing elapsed seconds."""
+        return _Timer(self, labels)
+
+    def render(self) -> list:
+        lines = super().render()
+        with self._lock:
+            items = [(key, s['count'], s['sum'], sorted(s['recent'])) for key, s in sorted(self._series.items())]
+        for key, count, total, values in items:
+            for q in QUANTILES:
+                value = values[min(int(q * len(values)), len(values) - 1)]
+                labels = _label_str(self.labelnames, key, 'quantile="%s"' % q)
+                lines.append(f"{self.name}{labels} {value:.6g}")
+            lines.append(f"{self.name}_sum{_label_str(self.labelnames, key)} {total:.6g}")
+            lines.append(f"{self.name}_count{_label_str(self.labelnames, key)} {count}")
+        return lines
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            keys = list(self._series)
+        out = {}
+        for key in keys:
+            labels = dict(zip(self.labelnames, key))
+            out[','.join(key)] = {
+                'count': self._series[key]['count'],
+                **{f'p{int(q * 100)}': self.quantile(q, **labels) for q in QUANTILES},
+            }
+        return out
+
+
+class _Timer:
+    def __init__(self, summary: Summary, labels: dict):
+        self.summary = summary
+        self.labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.summary.observe(time.perf_counter() - self._start, **self.labels)
+        return False
+
+    def __call__(self, func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with _Timer(self.summary, self.labels):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Timer(self.summary, self.labels):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+class MetricsRegistry:
+    """Named metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help: str, labelnames=()) -> Counter:
+        return self._get(Counter, name, help, labelnames)
+
+    def summary(self, name: str, help: str, labelnames=(), window: int = 1024) -> Summary:
+        return self._get(Summary, name, help, labelnames, window=window)
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> dict:
+        return {name: metric.snapshot() for name, metric in list(self._metrics.items())}
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.summary('trader_stage_seconds', 'Time spent per pipeline stage', ['stage'])
+API_CALLS = REGISTRY.counter('trader_exchange_api_calls_total', 'Exchange API requests', ['method'])
+RATE_LIMIT_WAITS = REGISTRY.counter('trader_rate_limit_waits_total', 'Requests that waited for a rate-limit token')
+RATE_LIMIT_WAIT_SECONDS = REGISTRY.counter('trader_rate_limit_wait_seconds_total', 'Time spent waiting for tokens')
+TICK_TO_ORDER_SECONDS = REGISTRY.summary('trader_tick_to_order_seconds', 'Candle close to order result', ['symbol'])
+
+
+def timed(stage: str) -> _Timer:
+    """Time a block or function under trader_stage_seconds{stage=...}."""
+    return STAGE_SECONDS.time(stage=stage)
+
+
+class SamplingProfiler:
+    """Periodically samples every thread's stack into folded-stack counts.
+
+    Output is one 'frame;frame;frame count' line per distinct stack, the input
+    format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = _Tally()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> str:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        return self.folded()
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        return '\n'.join(f"{stack} {count}" for stack, count in self.samples.most_common()) + '\n'
+
+
+class MetricsServer:
+    """Serves /metrics (Prometheus text) and /metrics.json from a background thread.
+
+    With `profiler=True`, GET /debug/profile?seconds=N samples all threads for
+    N seconds and returns folded stacks.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9108, registry: MetricsRegistry = None,
+                 profiler: bool = False):
+        self.host = host
+        self.port = port
+        self.registry = registry or REGISTRY
+        self.profiler = profiler
+        self._server = None
+        self._thread = None
+
+    def app(self):
+        from fastapi import FastAPI, HTTPException
+        from fastapi.responses import PlainTextResponse
+
+        app = FastAPI(title="Trader metrics")
+
+        @app.get("/metrics", response_class=PlainTextResponse)
+        def metrics():
+            return PlainTextResponse(self.registry.render(), media_type="text/plain; version=0.0.4")
+
+        @app.get("/metrics.json")
+        def metrics_json():
+            return self.registry.snapshot()
+
+        @app.get("/debug/profile", response_class=PlainTextResponse)
+        def profile(seconds: float = 5.0, interval_ms: float = 5.0):
+            if not self.profiler:
+                raise HTTPException(status_code=404, detail="Profiler disabled")
+            profiler = SamplingProfiler(interval_ms / 1000)
+            profiler.start()
+            time.sleep(min(seconds, 60.0))
+            return profiler.stop()
+
+        return app
+
+    def start(self):
+        if self._thread is not None:
+            return
+        import uvicorn
+        self._server = uvicorn.Server(uvicorn.Config(self.app(), host=self.host, port=self.port, log_level="warning"))
+        # Server.run skips signal handlers outside the main thread
+        self._thread = threading.Thread(target=self._server.run, name="metrics-server", daemon=True)
+        self._thread.start()
+        logger.info(f"Metrics on http://{self.host}:{self.port}/metrics")
+
+    def stop(self, timeout: float = 5.0):
+        if self._thread is None:
+            return
+        self._server.should_exit = True
+        self._thread.join(timeout)
+        self._thread = None
@@ -1,6 +1,5 @@
 import torch
 import torch.nn as nn
-import xgboost as xgb
 import numpy as np
 import logging
 
@@ -36,12 +35,19 @@ class XGBoostModel:
         self.model = None
 
     def train(self, X_train, y_train):
+        import xgboost as xgb
         dtrain = xgb.DMatrix(X_train, label=y_train)
         self.model = xgb.train(self.params, dtrain, num_boost_round=100)
 
+    def update(self, X_new, y_new, num_boost_round: int = 10):
+        """Continue boosting the existing booster on new rows only."""
+        import xgboost as xgb
+        dtrain = xgb.DMatrix(X_new, label=y_new)
+        self.model = xgb.train(self.params, dtrain, num_boost_round=num_boost_round, xgb_model=self.model)
+
     def predict(self, X):
-        dtest = xgb.DMatrix(X)
-        return self.model.predict(dtest)
+        # inplace_predict skips building a DMatrix on every call
+        return self.model.inplace_predict(X)
 
 class ModelFactory:
     """Factory for creating models."""
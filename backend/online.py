@@ -0,0 +1,203 @@
+import logging
+import numpy as np
+import pandas as pd
+from .config import Config
+from .features import FeatureMatrix, INDICATOR_COLUMNS
+from .models import LSTMModel, XGBoostModel
+from .registry import WEIGHTS_FILE, ModelRegistry, load_tensors
+from .trainer import ModelTrainer, reference_stats, to_millis
+
+logger = logging.getLogger(__name__)
+
+
+class DriftDetector:
+    """Flags recent data that no longer looks like a model's training data.
+
+    Feature drift: some feature's recent mean has moved more than `threshold`
+    training standard deviations away from the reference window (the last
+    candles the model was fully trained on), or its spread has halved or
+    doubled. Recent data must not overlap the reference window, and the
+    feature check waits for `min_samples` recent rows. Error drift: the
+    model's error on recent candles exceeds `error_ratio` times the
+    validation error it was registered with.
+    """
+
+    def __init__(self, threshold: float = 0.5, error_ratio: float = 2.0, min_samples: int = 30):
+        self.threshold = threshold
+        self.error_ratio = error_ratio
+        self.min_samples = min_samples
+
+    def check(self, values: np.ndarray, mean, std, feature_cols: list = None, recent_error: float = None,
+              baseline_error: float = None, scale=None) -> dict:
+        """Compare recent `values` with reference `mean`/`std` (shifts in units of `scale`, default `std`).
+
+        Returns {'drift': bool, 'reason': str or None, 'shift': float, 'error_ratio': float or None}.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        mean = np.asarray(mean, dtype=np.float64)
+        std = np.where(np.asarray(std, dtype=np.float64) > 0, std, 1.0)
+        scale = std if scale is None else np.where(np.asarray(scale, dtype=np.float64) > 0, scale, 1.0)
+        names = feature_cols or [str(i) for i in range(values.shape[1])]
+        values = values[np.isfinite(values).all(axis=1)]
+        result = {'drift': False, 'reason': None, 'shift': 0.0, 'error_ratio': None}
+        if len(values) >= max(self.min_samples, 2):
+            shift = np.abs(values.mean(axis=0) - mean) / scale
+            spread = values.std(axis=0) / std
+            worst = int(np.argmax(shift))
+            result['shift'] = float(shift[worst])
+            if shift[worst] > self.threshold:
+                result.update(drift=True, reason=f"{names[worst]} mean moved {shift[worst]:.2f} std")
+            else:
+                off = np.flatnonzero((spread < 0.5) | (spread > 2.0))
+                if len(off):
+                    result.update(drift=True, reason=f"{names[off[0]]} spread changed {spread[off[0]]:.2f}x")
+        if recent_error is not None and baseline_error:
+            ratio = recent_error / baseline_error
+            result['error_ratio'] = float(ratio)
+            if not result['drift'] and ratio > self.error_ratio:
+                result.update(drift=True, reason=f"error {ratio:.2f}x validation loss")
+        return result
+
+
+class OnlineUpdater:
+    """Hourly refresh of registered models from the candles since they were trained.
+
+    LSTMs are fine-tuned from their registered weights on a replay buffer of
+    recent candles; XGBoost boosters gain `update_rounds` trees fitted on the
+    new rows only. A full retrain runs only when DriftDetector flags the
+    candles after the model's reference window, and uses the full training
+    history from the caller's `history` callable when given. Each refresh is
+    registered as a new version whose metrics carry 'trained_until' (epoch
+    ms), so the next run picks up from there.
+    """
+
+    def __init__(self, config: Config, registry: ModelRegistry = None, trainer: ModelTrainer = None,
+                 detector: DriftDetector = None):
+        self.config = config
+        self.registry = registry or ModelRegistry()
+        self.trainer = trainer or ModelTrainer(config)
+        self.detector = detector or DriftDetector(config.model.drift_threshold, config.model.drift_error_ratio)
+
+    def update_lstm(self, name: str, df: pd.DataFrame, history=None) -> dict:
+        """Refresh the latest version of LSTM `name` with candles from `df`.
+
+        `history()` returns the full training lookback (e.g. DataConfig.lookback_days
+        of candles) for a drift-triggered retrain; without it `df` is used.
+        Returns {'action': 'skipped'|'updated'|'rejected'|'retrained', ...}.
+        """
+        cfg = self.config.model
+        loaded = self.registry.load(name)
+        manifest = loaded.manifest
+        metrics = manifest.get('metrics') or {}
+        feature_cols = manifest['feature_cols']
+        target_col = manifest.get('target_col', 'close')
+        trained_until = metrics.get('trained_until')
+        last = to_millis(df['timestamp'].iloc[-1])
+        new_rows = len(df)
+        if trained_until is not None:
+            new_rows = int((df['timestamp'] > self._bound(df, trained_until)).sum())
+        if new_rows == 0:
+            logger.info(f"{name}: no candles since {trained_until}, skipping")
+            return {'action': 'skipped', 'version': manifest['version']}
+
+        # Copy the weights out of the mapped file so training cannot touch the artifact
+        model = LSTMModel(**manifest['architecture'])
+        model.load_state_dict(load_tensors(loaded.path / WEIGHTS_FILE))
+        mean, std = manifest['scaler']['mean'], manifest['scaler']['std']
+
+        # Recent candles start after the reference window, so the two never overlap
+        reference_until = metrics.get('reference_until', trained_until)
+        recent = df if reference_until is None else df[df['timestamp'] > self._bound(df, reference_until)]
+        recent = recent.tail(cfg.replay_window)
+        # Earlier candles only provide the first window's inputs; every target is a recent candle
+        context = df.iloc[max(0, len(df) - len(recent) - cfg.lstm_lookback):]
+        recent_error = self.trainer.evaluate_lstm(model, context, feature_cols, mean, std, target_col)
+        drift = self.detector.check(recent[feature_cols].to_numpy(), metrics.get('reference_mean', mean),
+                                    metrics.get('reference_std', std), feature_cols, recent_error,
+                                    metrics.get('val_loss'), scale=std)
+        if drift['drift']:
+            logger.warning(f"{name}: drift detected ({drift['reason']}), retraining from scratch")
+            full = self._history(name, history, df)
+            model = self.trainer.train_lstm(full, feature_cols)
+            registered = self.trainer.register_model(model, name, self.registry, metrics={
+                'val_loss': self.trainer.best_loss, 'trained_until': to_millis(full['timestamp'].iloc[-1]),
+                'update': 'full', 'drift': drift['reason'], **reference_stats(full, feature_cols, cfg.replay_window)})
+            return {'action': 'retrained', 'version': registered['version'], 'drift': drift}
+
+        model = self.trainer.fine_tune_lstm(model, df, feature_cols, mean, std, target_col)
+        before, after = self.trainer.update_loss
+        if before is not None and after is not None and after > before:
+            logger.warning(f"{name}: fine-tuning raised recent loss {before:.6f} -> {after:.6f}, keeping "
+                           f"v{manifest['version']}")
+            return {'action': 'rejected', 'version': manifest['version'], 'loss': (before, after)}
+        # val_loss stays the full-train baseline so error drift is measured against it
+        registered = self.registry.register_lstm(
+            name, model.cpu(), feature_cols, mean, std, target_col, model_config=cfg,
+            metrics={**metrics, 'recent_loss': after, 'trained_until': last, 'update': 'incremental',
+                     'updates_since_full': metrics.get('updates_since_full', 0) + 1})
+        logger.info(f"{name}: fine-tuned on {new_rows} new candles, v{registered['version']}")
+        return {'action': 'updated', 'version': registered['version'], 'loss': (before, after)}
+
+    @staticmethod
+    def _bound(df: pd.DataFrame, millis: int):
+        """`millis` in the dtype of df['timestamp'], for comparisons."""
+        if pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+            return pd.to_datetime(millis, unit='ms')
+        return millis
+
+    @staticmethod
+    def _history(name: str, history, recent):
+        """Training data for a full retrain: `history()`, or `recent` when there is none."""
+        full = history() if history is not None else None
+        if full is None:
+            logger.warning(f"{name}: no training history available, retraining on the recent candles only")
+            return recent
+        return full
+
+    def retrain_xgboost(self, name: str, matrix: FeatureMatrix, feature_cols: list = None,
+                        horizon: int = 1) -> dict:
+        """Full XGBoost train on `matrix`, registered with its drift reference stats."""
+        feature_cols = list(feature_cols or INDICATOR_COLUMNS)
+        model = self.trainer.train_xgboost(matrix, feature_cols, horizon)
+        # Drift reference: the last replay_window candles of every symbol
+        start = len(matrix.timestamps) - 1 - horizon - self.config.model.replay_window
+        X, _ = matrix.xgb_dataset(feature_cols, horizon,
+                                  since=to_millis(matrix.timestamps[start]) if start >= 0 else None)
+        return self.registry.register_xgboost(name, model, feature_cols, model_config=self.config.model, metrics={
+            'trained_until': to_millis(matrix.timestamps[-1 - horizon]), 'horizon': horizon, 'update': 'full',
+            'feature_std': self.trainer.xgb_std.tolist(),
+            'reference_mean': X.mean(axis=0).tolist(), 'reference_std': X.std(axis=0).tolist()})
+
+    def update_xgboost(self, name: str, matrix: FeatureMatrix, history=None) -> dict:
+        """Continue boosting the latest version of `name` on rows of `matrix` it has not seen.
+
+        `history()` returns the FeatureMatrix for a drift-triggered retrain, as in update_lstm.
+        """
+        cfg = self.config.model
+        loaded = self.registry.load(name)
+        manifest = loaded.manifest
+        metrics = manifest.get('metrics') or {}
+        feature_cols = manifest['feature_cols']
+        horizon = metrics.get('horizon', 1)
+        X, y = matrix.xgb_dataset(feature_cols, horizon, since=metrics.get('trained_until'))
+        if len(X) == 0:
+            logger.info(f"{name}: no new labelled rows, skipping")
+            return {'action': 'skipped', 'version': manifest['version']}
+
+        if 'reference_mean' in metrics:
+            drift = self.detector.check(X, metrics['reference_mean'], metrics['reference_std'], feature_cols,
+                                        scale=metrics['feature_std'])
+            if drift['drift']:
+                logger.warning(f"{name}: drift detected ({drift['reason']}), retraining from scratch")
+                registered = self.retrain_xgboost(name, self._history(name, history, matrix), feature_cols,
+                                                  horizon)
+                return {'action': 'retrained', 'version': registered['version'], 'drift': drift}
+
+        model = XGBoostModel()
+        model.model = loaded.model
+        model.update(X, y, num_boost_round=cfg.update_rounds)
+        registered = self.registry.register_xgboost(name, model, feature_cols, model_config=cfg, metrics={
+            **metrics, 'trained_until': to_millis(matrix.timestamps[-1 - horizon]), 'update': 'incremental',
+            'updates_since_full': metrics.get('updates_since_full', 0) + 1})
+        logger.info(f"{name}: boosted {cfg.update_rounds} rounds on {len(X)} new rows, v{registered['version']}")
+        return {'action': 'updated', 'version': registered['version'], 'rows': len(X)}
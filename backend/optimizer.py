@@ -0,0 +1,299 @@
+import copy
+import itertools
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import shared_memory
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from .backtest import Backtester
+from .config import Config
+from .strategy import Strategy
+
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+WINDOW_FIELDS = ['rsi_period', 'sma_fast', 'sma_slow', 'macd_fast', 'macd_slow', 'macd_signal', 'bb_std']
+METRICS = ['sharpe', 'total_return_pct', 'max_drawdown_pct', 'win_rate', 'trades']
+
+# Per-worker state, set once by _init_worker so tasks only carry parameters
+_worker = {}
+
+
+def _init_worker(shm_name: str, shape: tuple, offsets: dict, config: Config, strategy_cls):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker['shm'] = shm
+    _worker['data'] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    _worker['offsets'] = offsets
+    _worker['config'] = config
+    _worker['strategy_cls'] = strategy_cls
+    _worker['indicators'] = {}
+
+
+def _frame(symbol: str, lo: int, hi: int) -> pd.DataFrame:
+    """DataFrame over a slice of one symbol's rows in shared memory."""
+    start, _ = _worker['offsets'][symbol]
+    block = _worker['data'][:, start + lo:start + hi]
+    df = pd.DataFrame({c: block[i] for i, c in enumerate(OHLCV_COLUMNS)})
+    df['timestamp'] = pd.to_datetime(df['timestamp'].astype(np.int64), unit='ms')
+    return df
+
+
+def _millis(timestamps) -> np.ndarray:
+    """Epoch milliseconds of a timestamp column (datetimes or integer ms)."""
+    if pd.api.types.is_datetime64_any_dtype(timestamps):
+        timestamps = timestamps.astype('datetime64[ms]').astype(np.int64)
+    return np.asarray(timestamps, dtype=np.int64)
+
+
+def _evaluate(params: dict, segments: list) -> dict:
+    """Backtest one parameter set over (symbol, lo, hi) segments; mean metrics."""
+    config = apply_params(_worker['config'], params)
+    backtester = Backtester(config, _worker['strategy_cls'](config))
+    cache = _worker['indicators']
+    window_key = tuple(getattr(config.strategy, f) for f in WINDOW_FIELDS)
+
+    stats = []
+    for symbol, lo, hi in segments:
+        # Threshold-only variations reuse indicator frames computed earlier
+        key = (symbol, lo, hi, window_key)
+        if key not in cache:
+            if len(cache) > 64:
+                cache.clear()
+            cache[key] = backtester.prepare(_frame(symbol, lo, hi))
+        stats.append(backtester.run(cache[key], symbol).stats)
+    result = {m: float(np.mean([s[m] for s in stats])) for m in METRICS}
+    result['trades'] = int(sum(s['trades'] for s in stats))
+    result['max_drawdown_pct'] = float(min(s['max_drawdown_pct'] for s in stats))
+    return result
+
+
+def apply_params(config: Config, params: dict) -> Config:
+    """Copy of config with 'section.field' (or bare strategy/trading field) overrides."""
+    config = copy.deepcopy(config)
+    for name, value in params.items():
+        if '.' in name:
+            section, field = name.split('.', 1)
+        else:
+            section = 'strategy' if hasattr(config.strategy, name) else 'trading'
+            field = name
+        target = getattr(config, section)
+        if not hasattr(target, field):
+            raise ValueError(f"Unknown parameter: {name}")
+        setattr(target, field, value)
+    return config
+
+
+class ParameterSweep:
+    """Grid, random or Bayesian parameter search over the backtester.
+
+    `space` maps parameter names (e.g. 'rsi_oversold' or
+    'trading.stop_loss_percent') to a list of candidate values or a
+    (low, high) range. Candle arrays are placed in shared memory once and
+    attached by every worker process, so tasks only ship parameter dicts.
+    """
+
+    def __init__(self, config: Config, space: dict, strategy_cls=Strategy, metric: str = 'sharpe',
+                 workers: int = None, results_dir: str = "data/backtest_results"):
+        self.config = config
+        self.space = space
+        self.strategy_cls = strategy_cls
+        self.metric = metric
+        self.workers = workers or os.cpu_count()
+        self.results_dir = Path(results_dir)
+
+    # -- parameter generation -------------------------------------------------
+
+    def grid(self) -> list:
+        """Every combination; ranges must be given as value lists."""
+        for name, values in self.space.items():
+            if isinstance(values, tuple):
+                raise ValueError(f"Grid search needs explicit values for {name}")
+        names = list(self.space)
+        return [dict(zip(names, combo)) for combo in itertools.product(*self.space.values())]
+
+    def _from_unit(self, u) -> dict:
+        """Map a point in [0, 1]^d onto the search space."""
+        params = {}
+        for x, (name, values) in zip(u, self.space.items()):
+            if isinstance(values, tuple):
+                low, high = values
+                value = low + x * (high - low)
+                if isinstance(low, int) and isinstance(high, int):
+                    value = int(round(value))
+            else:
+                value = values[min(int(x * len(values)), len(values) - 1)]
+            params[name] = value
+        return params
+
+    def sample(self, n: int, seed: int = None) -> list:
+        rng = np.random.default_rng(seed)
+        return [self._from_unit(u) for u in rng.random((n, len(self.space)))]
+
+    # -- execution ------------------------------------------------------------
+
+    def _share(self, frames: dict):
+        offsets, total = {}, 0
+        for symbol, df in frames.items():
+            offsets[symbol] = (total, len(df))
+            total += len(df)
+        shm = shared_memory.SharedMemory(create=True, size=max(total, 1) * len(OHLCV_COLUMNS) * 8)
+        data = np.ndarray((len(OHLCV_COLUMNS), total), dtype=np.float64, buffer=shm.buf)
+        for symbol, df in frames.items():
+            start, n = offsets[symbol]
+            data[0, start:start + n] = _millis(df['timestamp'])
+            for i, c in enumerate(OHLCV_COLUMNS[1:], start=1):
+                data[i, start:start + n] = df[c].to_numpy(dtype=np.float64)
+        return shm, data.shape, offsets
+
+    def _pool(self, frames: dict):
+        shm, shape, offsets = self._share(frames)
+        pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                   initargs=(shm.name, shape, offsets, self.config, self.strategy_cls))
+        return shm, pool, offsets
+
+    def _run_batch(self, pool, param_sets: list, segments: list) -> list:
+        futures = [pool.submit(_evaluate, params, segments) for params in param_sets]
+        rows = []
+        for params, future in zip(param_sets, futures):
+            rows.append({**params, **future.result()})
+        return rows
+
+    def _search(self, pool, segments: list, method: str, n_iter: int, seed: int) -> list:
+        if method == 'grid':
+            return self._run_batch(pool, self.grid(), segments)
+        if method == 'random':
+            return self._run_batch(pool, self.sample(n_iter, seed), segments)
+        if method == 'bayesian':
+            return self._bayesian(pool, segments, n_iter, seed)
+        raise ValueError(f"Unknown search method: {method}")
+
+    def _bayesian(self, pool, segments: list, n_iter: int, seed: int) -> list:
+        """Gaussian-process search with expected improvement, in parallel batches."""
+        rng = np.random.default_rng(seed)
+        d = len(self.space)
+        batch = max(1, min(self.workers, n_iter))
+        n_init = min(n_iter, max(batch, 2 * d))
+        units = list(rng.random((n_init, d)))
+        rows = self._run_batch(pool, [self._from_unit(u) for u in units], segments)
+
+        while len(rows) < n_iter:
+            X = np.array(units)
+            y = np.array([r[self.metric] for r in rows], dtype=float)
+            y = (y - y.mean()) / (y.std() or 1.0)
+            candidates = rng.random((2048, d))
+            ei = _expected_improvement(X, y, candidates)
+            take = candidates[np.argsort(-ei)[:min(batch, n_iter - len(rows))]]
+            units.extend(take)
+            rows.extend(self._run_batch(pool, [self._from_unit(u) for u in take], segments))
+        return rows
+
+    def _rank(self, rows: list) -> pd.DataFrame:
+        table = pd.DataFrame(rows).sort_values(self.metric, ascending=False).reset_index(drop=True)
+        table.insert(0, 'rank', np.arange(1, len(table) + 1))
+        return table
+
+    def _save(self, table: pd.DataFrame, prefix: str):
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        path = self.results_dir / f"{prefix}_{datetime.now():%Y%m%d_%H%M%S}.csv"
+        table.to_csv(path, index=False)
+        logger.info(f"Results written to {path}")
+
+    def run(self, frames: dict, method: str = 'grid', n_iter: int = 50, seed: int = None,
+            save: bool = True) -> pd.DataFrame:
+        """Evaluate parameter sets on the full history of every symbol; ranked table."""
+        shm, pool, offsets = self._pool(frames)
+        try:
+            segments = [(symbol, 0, n) for symbol, (_, n) in offsets.items()]
+            table = self._rank(self._search(pool, segments, method, n_iter, seed))
+        finally:
+            pool.shutdown()
+            shm.close()
+            shm.unlink()
+        if save:
+            self._save(table, f"sweep_{method}")
+        return table
+
+    @staticmethod
+    def folds(frames: dict, train_bars: int, test_bars: int) -> list:
+        """Walk-forward (train, test) windows cut at timestamps, not row numbers.
+
+        Bars are counted on the timeline every symbol covers (the union of
+        their timestamps between the latest first candle and the earliest last
+        one), so each fold spans the same period for every symbol even when
+        histories start at different times or have gaps. Returns
+        [{'train': [(symbol, lo, hi)], 'test': [...], 'train_start', 'test_start', 'test_end'}]
+        with row ranges per symbol and window bounds in epoch ms.
+        """
+        stamps = {symbol: _millis(df['timestamp']) for symbol, df in frames.items()}
+        first = max(ts[0] for ts in stamps.values())
+        last = min(ts[-1] for ts in stamps.values())
+        timeline = np.unique(np.concatenate(list(stamps.values())))
+        timeline = timeline[(timeline >= first) & (timeline <= last)]
+
+        def segments(lo: int, hi: int) -> list:
+            # Rows of each symbol from bar `lo` through bar `hi - 1` of the timeline
+            bounds = [(s, int(np.searchsorted(ts, timeline[lo], side='left')),
+                       int(np.searchsorted(ts, timeline[hi - 1], side='right'))) for s, ts in stamps.items()]
+            return [b for b in bounds if b[2] > b[1]]
+
+        folds = []
+        start = 0
+        while start + train_bars + test_bars <= len(timeline):
+            split, end = start + train_bars, start + train_bars + test_bars
+            folds.append({'train': segments(start, split), 'test': segments(split, end),
+                          'train_start': int(timeline[start]), 'test_start': int(timeline[split]),
+                          'test_end': int(timeline[end - 1])})
+            start += test_bars
+        return folds
+
+    def walk_forward(self, frames: dict, train_bars: int, test_bars: int, method: str = 'grid',
+                     n_iter: int = 50, seed: int = None, save: bool = True) -> pd.DataFrame:
+        """Optimise on each train window, then score the winner on the following test window.
+
+        Windows are cut on shared timestamps (see folds()), so no symbol's test
+        window overlaps another symbol's training period.
+        """
+        shm, pool, _ = self._pool(frames)
+        folds = []
+        try:
+            for fold in self.folds(frames, train_bars, test_bars):
+                ranked = self._rank(self._search(pool, fold['train'], method, n_iter, seed))
+                best = {name: ranked.loc[0, name] for name in self.space}
+                scored = pool.submit(_evaluate, best, fold['test']).result()
+                folds.append({
+                    'fold': len(folds) + 1,
+                    **{k: pd.to_datetime(fold[k], unit='ms') for k in ('train_start', 'test_start', 'test_end')},
+                    **best,
+                    **{f'train_{m}': ranked.loc[0, m] for m in METRICS},
+                    **{f'test_{m}': scored[m] for m in METRICS},
+                })
+        finally:
+            pool.shutdown()
+            shm.close()
+            shm.unlink()
+        table = pd.DataFrame(folds)
+        if save and not table.empty:
+            self._save(table, f"walk_forward_{method}")
+        return table
+
+
+def _expected_improvement(X, y, candidates, length_scale: float = 0.2, noise: float = 1e-6):
+    """EI of candidate points under an RBF-kernel Gaussian process fit to (X, y)."""
+    from scipy.stats import norm
+
+    def kernel(a, b):
+        sq = ((a[:, None, :] - b[None, :, :]) ** 2).sum(-1)
+        return np.exp(-0.5 * sq / length_scale ** 2)
+
+    K = kernel(X, X) + noise * np.eye(len(X))
+    L = np.linalg.cholesky(K + 1e-9 * np.eye(len(X)))
+    alpha = np.linalg.solve(L.T, np.linalg.solve(L, y))
+    Ks = kernel(candidates, X)
+    mu = Ks @ alpha
+    v = np.linalg.solve(L, Ks.T)
+    sigma = np.sqrt(np.clip(1.0 - (v ** 2).sum(0), 1e-12, None))
+    z = (mu - y.max()) / sigma
+    return (mu - y.max()) * norm.cdf(z) + sigma * norm.pdf(z)
@@ -0,0 +1,344 @@
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+import ccxt
+from .metrics import API_CALLS, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+ORDER_UPDATES = REGISTRY.counter('trader_order_updates_total', 'Order state transitions', ['state'])
+ORDER_FILL_SECONDS = REGISTRY.summary('trader_order_fill_seconds', 'Submission to final fill', ['symbol'])
+
+
+class OrderState:
+    PENDING = 'pending'            # queued, not yet sent
+    SUBMITTED = 'submitted'        # sent, no acknowledgement yet
+    OPEN = 'open'
+    PARTIALLY_FILLED = 'partially_filled'
+    FILLED = 'filled'
+    CANCELED = 'canceled'
+    REJECTED = 'rejected'
+    FAILED = 'failed'              # gave up after retries
+
+    TERMINAL = frozenset({FILLED, CANCELED, REJECTED, FAILED})
+
+
+# ccxt order status -> OrderState (partial fills are derived from `filled`)
+_CCXT_STATUS = {
+    'open': OrderState.OPEN,
+    'closed': OrderState.FILLED,
+    'canceled': OrderState.CANCELED,
+    'cancelled': OrderState.CANCELED,
+    'expired': OrderState.CANCELED,
+    'rejected': OrderState.REJECTED,
+}
+
+
+def client_order_id(symbol: str, side: str, key=None, prefix: str = 'ai') -> str:
+    """Exchange-safe client order id; deterministic when `key` is given.
+
+    Keying on the decision (e.g. the candle close time) makes re-submitting the
+    same decision after a crash or timeout a no-op on the exchange.
+    """
+    if key is None:
+        return f"{prefix}-{uuid.uuid4().hex[:24]}"
+    digest = hashlib.sha1(f"{symbol}|{side}|{key}".encode()).hexdigest()[:24]
+    return f"{prefix}-{digest}"
+
+
+@dataclass
+class Order:
+    client_id: str
+    symbol: str
+    side: str
+    amount: float
+    state: str = OrderState.PENDING
+    exchange_id: str = None
+    filled: float = 0.0
+    average: float = None
+    fee: float = 0.0
+    attempts: int = 0
+    error: str = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = None
+    raw: dict = None
+
+    @property
+    def done(self) -> bool:
+        return self.state in OrderState.TERMINAL
+
+
+class OrderPipeline:
+    """Non-blocking order submission and fill tracking on an async exchange.
+
+    submit() only enqueues and returns the Order, so the decision loop never
+    waits on the exchange. Orders for different symbols are placed
+    concurrently; orders for one symbol go out one at a time. Every order
+    carries a client order id, so a submission retried after a timeout is
+    matched to the order the exchange may already hold instead of opening a
+    second position. Fills come from the exchange's watch_orders stream when
+    it has one, with fetch_order polling as the fallback. `exchange` is any
+    object with ccxt's async create_order/fetch_order API.
+    """
+
+    def __init__(self, exchange, limiter=None, clock=None, max_retries: int = 3, retry_delay: float = 0.5,
+                 poll_interval: float = 1.0, order_timeout: float = 120.0, on_update=None):
+        self.exchange = exchange
+        self.limiter = limiter
+        self.clock = clock
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self.order_timeout = order_timeout
+        self.on_update = on_update
+        self.orders = {}
+        self.positions = {}
+        self._by_exchange_id = {}
+        self._queue = None
+        self._symbol_locks = {}
+        self._tasks = set()
+        self._worker = None
+        self._stream = None
+        self._events = {}
+
+    # -- lifecycle ----------------------------------------------------------------
+
+    async def start(self):
+        if self._worker is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._dispatch())
+        has = getattr(self.exchange, 'has', {}) or {}
+        if has.get('watchOrders'):
+            self._stream = asyncio.create_task(self._watch_orders())
+
+    async def stop(self, drain: bool = True, timeout: float = 30.0):
+        """Stop accepting work; with `drain`, let in-flight orders settle first."""
+        if self._worker is None:
+            return
+        if drain:
+            await self._queue.join()
+            if self._tasks:
+                await asyncio.wait(list(self._tasks), timeout=timeout)
+        for task in [self._worker, self._stream, *self._tasks]:
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(*[t for t in [self._worker, self._stream, *self._tasks] if t is not None],
+                             return_exceptions=True)
+        self._worker = self._stream = None
+        self._tasks.clear()
+
+    # -- public API -----------------------------------------------------------------
+
+    def submit(self, symbol: str, side: str, amount: float, key=None, client_id: str = None) -> Order:
+        """Queue a market order; returns immediately.
+
+        Re-submitting an id that is already known returns the existing order.
+        """
+        if self._queue is None:
+            raise RuntimeError("OrderPipeline.start() has not been awaited")
+        client_id = client_id or client_order_id(symbol, side, key)
+        existing = self.orders.get(client_id)
+        if existing is not None:
+            return existing
+        order = Order(client_id, symbol, side, amount, created_at=self._now())
+        self.orders[client_id] = order
+        self._events[client_id] = asyncio.Event()
+        self._queue.put_nowait(order)
+        self._record(order)
+        return order
+
+    def busy(self, symbol: str) -> bool:
+        """True while an order for `symbol` is queued or working."""
+        return any(o.symbol == symbol and not o.done for o in self.orders.values())
+
+    def open_orders(self, symbol: str = None) -> list:
+        return [o for o in self.orders.values() if not o.done and (symbol is None or o.symbol == symbol)]
+
+    async def wait(self, client_id: str, timeout: float = None) -> Order:
+        """Wait until an order reaches a terminal state."""
+        await asyncio.wait_for(self._events[client_id].wait(), timeout)
+        return self.orders[client_id]
+
+    # -- internals ------------------------------------------------------------------
+
+    def _now(self) -> float:
+        return self.clock.time() if self.clock is not None else time.time()
+
+    async def _sleep(self, seconds: float):
+        if self.clock is not None:
+            await self.clock.sleep(seconds)
+        else:
+            await asyncio.sleep(seconds)
+
+    def _record(self, order: Order, state: str = None):
+        if state is not None:
+            if order.done:
+                # Late updates cannot reopen a finished order
+                return
+            order.state = state
+        order.updated_at = self._now()
+        ORDER_UPDATES.inc(state=order.state)
+        if order.done:
+            if order.state == OrderState.FILLED:
+                ORDER_FILL_SECONDS.observe(order.updated_at - order.created_at, symbol=order.symbol)
+            self._events[order.client_id].set()
+        if self.on_update is not None:
+            try:
+                self.on_update(order)
+            except Exception as e:
+                logger.error(f"Order update callback failed for {order.client_id}: {e}")
+
+    async def _dispatch(self):
+        while True:
+            order = await self._queue.get()
+            task = asyncio.create_task(self._handle(order))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            self._queue.task_done()
+
+    async def _handle(self, order: Order):
+        lock = self._symbol_locks.setdefault(order.symbol, asyncio.Lock())
+        async with lock:
+            try:
+                if await self._place(order):
+                    await self._track(order)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                order.error = str(e)
+                logger.error(f"Order {order.client_id} ({order.symbol}) failed: {e}")
+                self._record(order, OrderState.FAILED)
+
+    async def _call(self, method: str, *args, **kwargs):
+        if self.limiter is not None:
+            await self.limiter.acquire()
+        API_CALLS.inc(method=method)
+        return await getattr(self.exchange, method)(*args, **kwargs)
+
+    async def _place(self, order: Order) -> bool:
+        """Submit with retries; True once the exchange holds the order."""
+        while True:
+            order.attempts += 1
+            self._record(order, OrderState.SUBMITTED)
+            try:
+                raw = await self._call('create_order', order.symbol, 'market', order.side, order.amount,
+                                       None, {'clientOrderId': order.client_id})
+                self._apply(order, raw)
+                return True
+            except ccxt.DuplicateOrderId:
+                # An earlier attempt got through after all
+                raw = await self._lookup(order)
+                if raw is None:
+                    raise
+                self._apply(order, raw)
+                return True
+            except (ccxt.InsufficientFunds, ccxt.InvalidOrder, ccxt.BadSymbol, ccxt.PermissionDenied) as e:
+                order.error = str(e)
+                logger.warning(f"Order {order.client_id} rejected: {e}")
+                self._record(order, OrderState.REJECTED)
+                return False
+            except ccxt.NetworkError as e:
+                # The request may or may not have reached the exchange
+                raw = await self._lookup(order)
+                if raw is not None:
+                    self._apply(order, raw)
+                    return True
+                if order.attempts > self.max_retries:
+                    raise
+                logger.warning(f"Retrying order {order.client_id} after {e}")
+                await self._sleep(self.retry_delay * 2 ** (order.attempts - 1))
+
+    async def _lookup(self, order: Order):
+        """The exchange's copy of an order by client id, or None if it never arrived."""
+        try:
+            return await self._call('fetch_order', order.exchange_id, order.symbol,
+                                    {'clientOrderId': order.client_id})
+        except ccxt.OrderNotFound:
+            return None
+        except ccxt.BaseError as e:
+            logger.warning(f"Could not look up order {order.client_id}: {e}")
+            return None
+
+    def _apply(self, order: Order, raw: dict):
+        """Fold an exchange order snapshot into our Order and the position book."""
+        if not raw:
+            return
+        order.raw = raw
+        if raw.get('id') is not None:
+            order.exchange_id = str(raw['id'])
+            self._by_exchange_id[order.exchange_id] = order
+        changed = False
+        filled = raw.get('filled')
+        if filled is not None and filled > order.filled:
+            changed = True
+            delta = filled - order.filled
+            sign = 1 if order.side == 'buy' else -1
+            self.positions[order.symbol] = self.positions.get(order.symbol, 0.0) + sign * delta
+            order.filled = filled
+        if raw.get('average') is not None:
+            order.average = raw['average']
+        fee = raw.get('fee') or {}
+        if fee.get('cost') is not None:
+            order.fee = fee['cost']
+        state = _CCXT_STATUS.get(raw.get('status'), OrderState.OPEN)
+        if state == OrderState.OPEN and order.filled > 0:
+            state = OrderState.PARTIALLY_FILLED
+        if changed or state != order.state:
+            self._record(order, state)
+
+    async def _track(self, order: Order):
+        deadline = self._now() + self.order_timeout
+        while not order.done:
+            # A live order stream makes polling a slow backstop only
+            interval = self.poll_interval * (5 if self._stream is not None and not self._stream.done() else 1)
+            try:
+                await asyncio.wait_for(self._events[order.client_id].wait(), interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                self._apply(order, await self._call('fetch_order', order.exchange_id, order.symbol))
+            except ccxt.NetworkError as e:
+                # The order is still working on the exchange: poll again, by client id
+                logger.warning(f"Polling order {order.client_id} failed: {e}")
+                self._apply(order, await self._lookup(order))
+            if not order.done and self._now() > deadline:
+                await self._cancel(order)
+
+    async def _cancel(self, order: Order):
+        logger.warning(f"Order {order.client_id} not filled after {self.order_timeout}s, cancelling")
+        try:
+            self._apply(order, await self._call('cancel_order', order.exchange_id, order.symbol))
+        except ccxt.OrderNotFound:
+            self._apply(order, await self._lookup(order))
+        except ccxt.NetworkError as e:
+            # The cancel may not have arrived: reconcile now and cancel again on the next poll
+            logger.warning(f"Cancelling order {order.client_id} failed: {e}")
+            self._apply(order, await self._lookup(order))
+            return
+        if not order.done:
+            self._record(order, OrderState.CANCELED)
+
+    def on_exchange_order(self, raw: dict):
+        """Apply a streamed (or otherwise pushed) ccxt order update."""
+        order = self.orders.get(raw.get('clientOrderId')) or self._by_exchange_id.get(str(raw.get('id')))
+        if order is not None:
+            self._apply(order, raw)
+
+    async def _watch_orders(self):
+        backoff = 1.0
+        while True:
+            try:
+                for raw in await self.exchange.watch_orders():
+                    self.on_exchange_order(raw)
+                backoff = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Order stream error: {e}; retrying in {backoff:.0f}s")
+                await self._sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
@@ -0,0 +1,212 @@
+import asyncio
+import logging
+from collections import deque
+import numpy as np
+import pandas as pd
+from .config import Config
+from .metrics import timed
+
+logger = logging.getLogger(__name__)
+
+
+class Predictor:
+    """Batched, cached inference for the live loop.
+
+    Models are loaded once. Each symbol keeps a rolling window of normalised
+    feature rows keyed by candle timestamp, so only new candles are
+    transformed, and predict_batch() runs every symbol with fresh data through
+    one LSTM forward pass per model and a single XGBoost inplace_predict.
+    Symbols may have their own LSTM (as ModelTrainer.train_many registers
+    them) or share one installed without a symbol.
+    """
+
+    def __init__(self, config: Config, num_threads: int = None):
+        self.config = config
+        self.seq_length = config.model.lstm_lookback
+        self.lstms = {}  # symbol (None: every other symbol) -> model, features and scaler stats
+        self.xgb = None
+        self.xgb_features = None
+        self.num_threads = num_threads or config.model.inference_threads
+        self._windows = {}
+        self._rows = {}
+        self._predictions = {}
+
+    def set_lstm(self, model, feature_cols: list, mean, std, target_col: str = 'close', symbol: str = None):
+        """Install an LSTM together with the scaler stats it was trained with, for `symbol` or all."""
+        if self.num_threads:
+            import torch
+            torch.set_num_threads(self.num_threads)
+        feature_cols = list(feature_cols)
+        self.lstms[symbol] = {
+            'model': model.eval(), 'features': feature_cols, 'target': feature_cols.index(target_col),
+            'mean': np.asarray(mean, dtype=np.float32), 'std': np.asarray(std, dtype=np.float32),
+        }
+        self.reset(symbol)
+
+    @property
+    def has_lstm(self) -> bool:
+        return bool(self.lstms)
+
+    def _lstm(self, symbol: str):
+        spec = self.lstms.get(symbol)
+        return spec if spec is not None else self.lstms.get(None)
+
+    def set_xgboost(self, model, feature_cols: list):
+        """Install an XGBoostModel (or raw Booster) fed with the latest row of `feature_cols`."""
+        booster = getattr(model, 'model', model)
+        if self.num_threads:
+            booster.set_param({'nthread': self.num_threads})
+        self.xgb = booster
+        self.xgb_features = list(feature_cols)
+        self.reset()
+
+    def reset(self, symbol: str = None):
+        """Drop cached features and predictions."""
+        for cache in (self._windows, self._rows, self._predictions):
+            if symbol is None:
+                cache.clear()
+            else:
+                cache.pop(symbol, None)
+
+    def update(self, symbol: str, df: pd.DataFrame) -> bool:
+        """Ingest candles for a symbol; returns True if anything new arrived.
+
+        Rows at or before the last seen timestamp are skipped, except a revised
+        latest candle, which replaces the cached one.
+        """
+        if df is None or df.empty:
+            return False
+        changed = False
+        timestamps = df['timestamp'].to_numpy()
+        spec = self._lstm(symbol)
+        if spec is not None:
+            window = self._windows.get(symbol)
+            if window is None:
+                window = self._windows[symbol] = {'timestamp': None, 'rows': deque(maxlen=self.seq_length)}
+            # Column-wise extraction avoids building an intermediate DataFrame
+            values = np.column_stack([df[c].to_numpy(dtype=np.float32) for c in spec['features']])
+            values = (values - spec['mean']) / spec['std']
+            for ts, row in zip(timestamps, values):
+                if window['timestamp'] is not None and ts < window['timestamp']:
+                    continue
+                if ts == window['timestamp']:
+                    window['rows'].pop()
+                window['rows'].append(row)
+                window['timestamp'] = ts
+                changed = True
+        if self.xgb is not None:
+            cached = self._rows.get(symbol)
+            if cached is None or timestamps[-1] >= cached[0]:
+                row = np.array([df[c].to_numpy()[-1] for c in self.xgb_features], dtype=np.float32)
+                self._rows[symbol] = (timestamps[-1], row)
+                changed = True
+        if changed:
+            self._predictions.pop(symbol, None)
+        return changed
+
+    def predict_batch(self, symbols: list) -> dict:
+        """Predictions for `symbols`, computing only those without a cached result.
+
+        Returns {symbol: {'lstm': next close, 'xgb': probability}} with keys
+        present for whichever models are installed and warmed up.
+        """
+        stale = [s for s in symbols if s not in self._predictions]
+        if stale:
+            for symbol in stale:
+                self._predictions[symbol] = {}
+            self._predict_lstm(stale)
+            self._predict_xgb(stale)
+        return {s: self._predictions[s] for s in symbols}
+
+    @timed('predict_lstm')
+    def _predict_lstm(self, symbols: list):
+        if not self.lstms:
+            return
+        groups = {}
+        for s in symbols:
+            if s in self._windows and len(self._windows[s]['rows']) == self.seq_length:
+                spec = self._lstm(s)
+                groups.setdefault(id(spec), (spec, []))[1].append(s)
+        if not groups:
+            return
+        import torch
+        # Symbols sharing a model share its forward pass
+        for spec, ready in groups.values():
+            batch = torch.from_numpy(np.stack([np.stack(self._windows[s]['rows']) for s in ready]))
+            with torch.inference_mode():
+                out = spec['model'](batch).numpy()[:, 0]
+            t = spec['target']
+            prices = out * spec['std'][t] + spec['mean'][t]
+            for symbol, price in zip(ready, prices):
+                self._predictions[symbol]['lstm'] = float(price)
+
+    @timed('predict_xgb')
+    def _predict_xgb(self, symbols: list):
+        if self.xgb is None:
+            return
+        ready = [s for s in symbols if s in self._rows]
+        if not ready:
+            return
+        X = np.stack([self._rows[s][1] for s in ready])
+        for symbol, p in zip(ready, self.xgb.inplace_predict(X)):
+            self._predictions[symbol]['xgb'] = float(p)
+
+    def predict(self, frames: dict) -> dict:
+        """Update from {symbol: new candles} and predict all of them in one batch."""
+        for symbol, df in frames.items():
+            self.update(symbol, df)
+        return self.predict_batch(list(frames))
+
+    @staticmethod
+    def as_series(df: pd.DataFrame, prediction: dict, key: str = 'lstm'):
+        """Align a prediction with df's last row for Strategy: 'lstm' price or 'xgb' up-probability."""
+        if key not in prediction:
+            return None
+        series = pd.Series(np.nan, index=df.index)
+        series.iloc[-1] = prediction[key]
+        return series
+
+
+class BatchingPredictor:
+    """Collects concurrent per-symbol requests into one Predictor batch.
+
+    Requests arriving within `max_delay` seconds of the first pending one (or
+    until `max_batch` are pending) share a single forward pass.
+    """
+
+    def __init__(self, predictor: Predictor, max_delay: float = 0.002, max_batch: int = 256):
+        self.predictor = predictor
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self._pending = {}
+        self._flush_handle = None
+
+    async def predict(self, symbol: str, df: pd.DataFrame) -> dict:
+        self.predictor.update(symbol, df)
+        loop = asyncio.get_running_loop()
+        future = self._pending.get(symbol)
+        if future is None:
+            future = self._pending[symbol] = loop.create_future()
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_delay, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            results = self.predictor.predict_batch(list(pending))
+        except Exception as e:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for symbol, future in pending.items():
+            if not future.done():
+                future.set_result(results[symbol])
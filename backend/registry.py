@@ -0,0 +1,228 @@
+import hashlib
+import json
+import os
+import logging
+import shutil
+import tempfile
+from dataclasses import asdict
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+from .candle_store import file_lock
+
+logger = logging.getLogger(__name__)
+
+WEIGHTS_FILE = 'weights.bin'
+XGB_FILE = 'model.ubj'
+MANIFEST_FILE = 'manifest.json'
+
+
+def slug(symbol: str) -> str:
+    """Filesystem-safe form of a symbol, e.g. 'BTC/USDT:USDT' -> 'BTC-USDT_USDT'."""
+    return symbol.replace('/', '-').replace(':', '_')
+
+
+def lstm_model_name(symbol: str) -> str:
+    """Registry name of a symbol's LSTM, e.g. 'lstm-BTC-USDT'."""
+    return f"lstm-{slug(symbol)}"
+
+
+def save_tensors(tensors: dict, path: Path):
+    """Write tensors as an 8-byte header length, a JSON header, then raw data.
+
+    The layout follows safetensors: every tensor is a contiguous byte range, so
+    a reader can memory-map the file and view tensors without copying.
+    """
+    header, offset, blobs = {}, 0, []
+    for name, tensor in tensors.items():
+        array = tensor.detach().cpu().contiguous().numpy()
+        data = array.tobytes()
+        header[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offsets': [offset, offset + len(data)]}
+        blobs.append(data)
+        offset += len(data)
+    encoded = json.dumps(header).encode()
+    # Pad so the data section starts 8-byte aligned
+    encoded += b' ' * (-(8 + len(encoded)) % 8)
+    with open(path, 'wb') as f:
+        f.write(len(encoded).to_bytes(8, 'little'))
+        f.write(encoded)
+        for data in blobs:
+            f.write(data)
+
+
+def load_tensors(path: Path) -> dict:
+    """Memory-map a file written by save_tensors; pages load on first touch."""
+    import torch
+    with open(path, 'rb') as f:
+        size = int.from_bytes(f.read(8), 'little')
+        header = json.loads(f.read(size))
+    # Copy-on-write mapping: tensors are writable without touching the file
+    buffer = np.memmap(path, dtype=np.uint8, mode='c', offset=8 + size)
+    tensors = {}
+    for name, info in header.items():
+        start, end = info['offsets']
+        array = buffer[start:end].view(np.dtype(info['dtype'])).reshape(info['shape'])
+        tensors[name] = torch.from_numpy(array)
+    return tensors
+
+
+class LoadedModel:
+    """A registry entry whose model is only materialised on first access."""
+
+    def __init__(self, path: Path, manifest: dict):
+        self.path = path
+        self.manifest = manifest
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            if self.manifest['kind'] == 'lstm':
+                self._model = self._load_lstm()
+            else:
+                self._model = self._load_xgboost()
+        return self._model
+
+    def _load_lstm(self):
+        import torch
+        from .models import LSTMModel
+        # Build on the meta device and adopt the mapped tensors as parameters
+        with torch.device('meta'):
+            model = LSTMModel(**self.manifest['architecture'])
+        model.load_state_dict(load_tensors(self.path / WEIGHTS_FILE), assign=True)
+        return model.eval()
+
+    def _load_xgboost(self):
+        import xgboost as xgb
+        booster = xgb.Booster()
+        booster.load_model(str(self.path / XGB_FILE))
+        return booster
+
+    def install(self, predictor, symbol: str = None):
+        """Hot-swap this model into a Predictor (an LSTM for `symbol` only, if given)."""
+        if self.manifest['kind'] == 'lstm':
+            scaler = self.manifest['scaler']
+            predictor.set_lstm(self.model, self.manifest['feature_cols'], scaler['mean'], scaler['std'],
+                               self.manifest.get('target_col', 'close'), symbol=symbol)
+        else:
+            predictor.set_xgboost(self.model, self.manifest['feature_cols'])
+
+
+class ModelRegistry:
+    """Versioned, content-addressed model artifacts.
+
+    Each entry lives in <root>/<name>/<hash>/ with the weights (a mappable
+    tensor file for LSTMs, UBJSON for XGBoost) and a manifest carrying the
+    scaler stats, feature schema and ModelConfig it was trained with.
+    """
+
+    def __init__(self, root: str = "data/models"):
+        self.root = Path(root)
+
+    def _index_file(self, name: str) -> Path:
+        return self.root / name / 'versions.json'
+
+    def versions(self, name: str) -> list:
+        index = self._index_file(name)
+        if not index.exists():
+            return []
+        with open(index, 'r') as f:
+            return json.load(f)
+
+    def _commit(self, name: str, tmp_dir: Path, manifest: dict, artifact: str) -> dict:
+        digest = hashlib.sha256()
+        with open(tmp_dir / artifact, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        digest.update(json.dumps({k: v for k, v in manifest.items() if k != 'created_at'},
+                                 sort_keys=True).encode())
+        model_hash = digest.hexdigest()[:16]
+
+        # Registrations from other processes would otherwise race on versions.json
+        with file_lock(self.root / name / '.lock'):
+            versions = self.versions(name)
+            existing = next((v for v in versions if v['hash'] == model_hash), None)
+            target = self.root / name / model_hash
+            if existing is not None and target.exists():
+                shutil.rmtree(tmp_dir)
+                logger.info(f"Model {name} unchanged, keeping version {existing['version']}")
+                return self.manifest(name, existing['version'])
+
+            manifest['hash'] = model_hash
+            manifest['version'] = existing['version'] if existing is not None else (
+                versions[-1]['version'] + 1 if versions else 1)
+            with open(tmp_dir / MANIFEST_FILE, 'w') as f:
+                json.dump(manifest, f, indent=2)
+            if target.exists():
+                # Left behind by a registration that died before updating the index
+                shutil.rmtree(target)
+            os.replace(tmp_dir, target)
+
+            if existing is None:
+                versions.append({'version': manifest['version'], 'hash': model_hash,
+                                 'created_at': manifest['created_at']})
+                tmp_index = self._index_file(name).with_suffix('.tmp')
+                with open(tmp_index, 'w') as f:
+                    json.dump(versions, f, indent=2)
+                os.replace(tmp_index, self._index_file(name))
+        logger.info(f"Registered {name} v{manifest['version']} ({model_hash})")
+        return manifest
+
+    def _staging(self, name: str) -> Path:
+        (self.root / name).mkdir(parents=True, exist_ok=True)
+        return Path(tempfile.mkdtemp(prefix='.staging-', dir=self.root / name))
+
+    def _manifest(self, kind: str, feature_cols, model_config, metrics) -> dict:
+        return {
+            'kind': kind,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'feature_cols': list(feature_cols),
+            'model_config': asdict(model_config) if model_config is not None else None,
+            'metrics': metrics or {},
+        }
+
+    def register_lstm(self, name: str, model, feature_cols, mean, std, target_col: str = 'close',
+                      model_config=None, metrics: dict = None) -> dict:
+        """Store an LSTMModel with the normalisation it expects."""
+        manifest = self._manifest('lstm', feature_cols, model_config, metrics)
+        manifest['target_col'] = target_col
+        manifest['scaler'] = {'mean': np.atleast_1d(mean).tolist(), 'std': np.atleast_1d(std).tolist()}
+        manifest['architecture'] = {
+            'input_dim': model.lstm.input_size,
+            'hidden_dim': model.hidden_dim,
+            'num_layers': model.num_layers,
+            'output_dim': model.fc.out_features,
+        }
+        tmp_dir = self._staging(name)
+        save_tensors(model.state_dict(), tmp_dir / WEIGHTS_FILE)
+        return self._commit(name, tmp_dir, manifest, WEIGHTS_FILE)
+
+    def register_xgboost(self, name: str, model, feature_cols, model_config=None, metrics: dict = None) -> dict:
+        """Store an XGBoostModel (or raw Booster) as UBJSON."""
+        manifest = self._manifest('xgboost', feature_cols, model_config, metrics)
+        booster = getattr(model, 'model', model)
+        tmp_dir = self._staging(name)
+        booster.save_model(str(tmp_dir / XGB_FILE))
+        return self._commit(name, tmp_dir, manifest, XGB_FILE)
+
+    def _resolve(self, name: str, version=None) -> dict:
+        versions = self.versions(name)
+        if not versions:
+            raise KeyError(f"No registered versions of {name}")
+        if version is None:
+            return versions[-1]
+        for entry in versions:
+            if entry['version'] == version or (isinstance(version, str) and entry['hash'].startswith(version)):
+                return entry
+        raise KeyError(f"{name} has no version {version}")
+
+    def manifest(self, name: str, version=None) -> dict:
+        """Manifest for a version number or hash prefix (latest by default)."""
+        entry = self._resolve(name, version)
+        with open(self.root / name / entry['hash'] / MANIFEST_FILE, 'r') as f:
+            return json.load(f)
+
+    def load(self, name: str, version=None) -> LoadedModel:
+        """Lazily load a version number or hash prefix (latest by default)."""
+        entry = self._resolve(name, version)
+        return LoadedModel(self.root / name / entry['hash'], self.manifest(name, entry['version']))
@@ -0,0 +1,507 @@
+import asyncio
+import itertools
+import logging
+import threading
+import time
+import numpy as np
+import pandas as pd
+from .resample import _to_rows, resample_ohlcv, timeframe_ms
+from .scheduler import Clock
+
+logger = logging.getLogger(__name__)
+
+_EPSILON = 1e-12
+
+
+class ReplayClock(Clock):
+    """Clock that starts at `start` (epoch seconds) and runs `speed` times faster than real time.
+
+    Shared by the replay exchange and everything that schedules against it
+    (TradingScheduler, RateLimiter, OrderPipeline, RiskEngine).
+    """
+
+    def __init__(self, start: float, speed: float = 1000.0):
+        self.speed = speed
+        self.reset(start)
+
+    def reset(self, start: float):
+        self.start = start
+        self._origin = time.monotonic()
+
+    def time(self) -> float:
+        return self.start + (time.monotonic() - self._origin) * self.speed
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(max(seconds, 0) / self.speed)
+
+
+class ImmediateFill:
+    """Market orders fill completely at the touch, moved against the taker by `slippage_bps`."""
+
+    def __init__(self, slippage_bps: float = 0.0):
+        self.slippage_bps = slippage_bps
+
+    def fill(self, side: str, remaining: float, price: float, volume: float):
+        """(amount, price) filled now; `volume` is base volume traded since the last fill check."""
+        slip = self.slippage_bps / 10_000
+        return remaining, price * (1 + slip if side == 'buy' else 1 - slip)
+
+
+class VolumeFill(ImmediateFill):
+    """Fills at most `participation` of the volume traded since the order's last fill.
+
+    Nothing fills at submission; large orders stay open across candles and
+    partially filled, like a participation-capped order on a thin book.
+    """
+
+    def __init__(self, participation: float = 0.1, slippage_bps: float = 0.0):
+        super().__init__(slippage_bps)
+        self.participation = participation
+
+    def fill(self, side: str, remaining: float, price: float, volume: float):
+        amount, price = super().fill(side, remaining, price, volume)
+        return min(amount, self.participation * volume), price
+
+
+FILL_MODELS = {'immediate': ImmediateFill, 'volume': VolumeFill}
+
+
+class ReplayExchange:
+    """Offline exchange serving recorded or synthetic candles on a ReplayClock.
+
+    Implements the synchronous ccxt methods the bot uses (fetch_ohlcv,
+    fetch_ticker, fetch_balance, create_market_buy/sell_order, create_order,
+    fetch_order, cancel_order, load_markets); async_view() gives the ccxt.async_support
+    flavour, plus watch_ticker(s), over the same market and order book.
+
+    Candles are one `timeframe` (the finest needed) per symbol; coarser
+    timeframes are resampled on request. Series not starting on a candle
+    boundary are shifted onto one. At any clock time only closed
+    candles are visible, plus the forming one with nothing but its open, so
+    the bot cannot see the future. Every call waits `latency` (+ exponential
+    `jitter`) replay seconds; calls made while trading (not load_markets)
+    fail with ccxt.RequestTimeout at `error_rate`, and half the failed order
+    submissions still reach the book, as lost responses do.
+
+    The market is the same on every run and faults come from a seeded
+    generator. Fills price off the forming candle's open, so wall-clock
+    jitter in the bot only changes results when it moves an order into
+    another candle.
+    """
+
+    id = 'replay'
+    has = {'fetchOHLCV': True, 'fetchTicker': True, 'fetchBalance': True, 'createOrder': True, 'fetchOrder': True,
+           'cancelOrder': True, 'watchTicker': True, 'watchTickers': True, 'watchOrders': False}
+
+    def __init__(self, candles: dict, timeframe: str = '1m', clock: ReplayClock = None, speed: float = 1000.0,
+                 fill_model=None, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 spread_bps: float = 2.0, fee_rate: float = 0.001, page_limit: int = 1000, warmup: int = 200,
+                 rate_limit: int = 50, seed: int = 0, balance: dict = None):
+        self.timeframe = timeframe
+        self.base_ms = timeframe_ms(timeframe)
+        self.candles = {}
+        for symbol, rows in candles.items():
+            rows = _to_rows(rows)
+            offset = rows[0, 0] % self.base_ms if len(rows) else 0
+            if offset:
+                # Exchange candles open on timeframe boundaries, and the scheduler relies on it
+                logger.info(f"Shifting {symbol} candles by -{offset / 1000:g}s onto {timeframe} boundaries")
+                rows = rows.copy()
+                rows[:, 0] -= offset
+            self.candles[symbol] = rows
+        self._timestamps = {symbol: rows[:, 0] for symbol, rows in self.candles.items()}
+        first = min(rows[0, 0] for rows in self.candles.values())
+        self.clock = clock or ReplayClock(first / 1000 + warmup * self.base_ms / 1000, speed)
+        self.fill_model = fill_model or ImmediateFill()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.spread_bps = spread_bps
+        self.fee_rate = fee_rate
+        self.page_limit = page_limit
+        self.rateLimit = rate_limit
+        self.markets = {}
+        self.markets_by_id = {}
+        self.currencies = {}
+        # Reported by fetch_balance as the account's starting funds; fills do not move it
+        self.balance = dict(balance) if balance is not None else {'USDT': 10000.0}
+        self.orders = {}
+        self._by_client_id = {}
+        self._fill_checked = {}
+        self._ids = itertools.count(1)
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self._async = None
+
+    @classmethod
+    def from_store(cls, store, exchange: str, symbols: list, timeframe: str = '1m', since: int = None,
+                   until: int = None, **kwargs) -> 'ReplayExchange':
+        """Replay candles recorded in a CandleStore (e.g. by HistoryDownloader)."""
+        candles = {}
+        for symbol in symbols:
+            cols = store.read_arrays(exchange, symbol, timeframe, since=since, until=until)
+            if len(cols['timestamp']):
+                candles[symbol] = np.column_stack([cols[c] for c in ('timestamp', 'open', 'high', 'low',
+                                                                     'close', 'volume')]).astype(np.float64)
+            else:
+                logger.warning(f"No recorded {timeframe} candles for {symbol}, leaving it out of the replay")
+        return cls(candles, timeframe, **kwargs)
+
+    @classmethod
+    def from_csv(cls, paths: dict, timeframe: str = '1m', **kwargs) -> 'ReplayExchange':
+        """Replay {symbol: CSV path} files with timestamp (epoch ms or date), open, high, low, close, volume."""
+        frames = {}
+        for symbol, path in paths.items():
+            df = pd.read_csv(path)
+            if not pd.api.types.is_numeric_dtype(df['timestamp']):
+                df['timestamp'] = pd.to_datetime(df['timestamp'])
+            frames[symbol] = df
+        return cls(frames, timeframe, **kwargs)
+
+    @property
+    def end_time(self) -> float:
+        """Clock time (epoch seconds) at which the last candle has closed."""
+        return max(rows[-1, 0] for rows in self.candles.values()) / 1000 + self.base_ms / 1000
+
+    def async_view(self) -> 'AsyncReplayExchange':
+        if self._async is None:
+            self._async = AsyncReplayExchange(self)
+        return self._async
+
+    # -- ccxt helpers ---------------------------------------------------------------
+
+    def milliseconds(self) -> int:
+        return int(self.clock.time() * 1000)
+
+    def parse_timeframe(self, timeframe: str) -> int:
+        return timeframe_ms(timeframe) // 1000
+
+    def set_markets(self, markets: dict, currencies: dict = None):
+        self.markets = markets
+        self.markets_by_id = {}
+        for market in markets.values():
+            self.markets_by_id.setdefault(market['id'], []).append(market)
+        self.currencies = currencies or {}
+
+    def load_markets(self, reload: bool = False) -> dict:
+        self._network('load_markets', fail=False)
+        return self._load_markets(reload)
+
+    def _load_markets(self, reload: bool = False) -> dict:
+        if self.markets and not reload:
+            return self.markets
+        markets, currencies = {}, {}
+        for symbol in self.candles:
+            base, quote = symbol.split('/')
+            markets[symbol] = {
+                'id': base + quote, 'symbol': symbol, 'base': base, 'quote': quote, 'type': 'spot',
+                'spot': True, 'active': True, 'precision': {'amount': 1e-8, 'price': 1e-8},
+                'limits': {'amount': {'min': 0.0, 'max': None}, 'cost': {'min': 0.0, 'max': None}},
+            }
+            for code in (base, quote):
+                currencies[code] = {'id': code, 'code': code}
+        self.set_markets(markets, currencies)
+        return self.markets
+
+    async def close(self):
+        pass
+
+    # -- network simulation -------------------------------------------------------
+
+    def _delay(self) -> float:
+        with self._lock:
+            extra = self._rng.exponential(self.jitter) if self.jitter > 0 else 0.0
+        return self.latency + extra
+
+    def _fails(self) -> bool:
+        if self.error_rate <= 0:
+            return False
+        with self._lock:
+            return bool(self._rng.random() < self.error_rate)
+
+    @staticmethod
+    def _timeout(method: str):
+        import ccxt
+        return ccxt.RequestTimeout(f"replay: injected timeout in {method}")
+
+    def _network(self, method: str = 'request', fail: bool = True):
+        delay = self._delay()
+        if delay > 0:
+            time.sleep(delay / self.clock.speed)
+        if fail and self._fails():
+            raise self._timeout(method)
+
+    # -- market data ----------------------------------------------------------------
+
+    def _visible(self, symbol: str, now_ms: float):
+        """Closed base candles and the forming one (open only) at `now_ms`."""
+        rows = self.candles.get(symbol)
+        if rows is None:
+            import ccxt
+            raise ccxt.BadSymbol(f"replay has no candles for {symbol}")
+        ts = self._timestamps[symbol]
+        closed = int(np.searchsorted(ts, now_ms - self.base_ms, side='right'))
+        forming = None
+        if closed < len(rows) and ts[closed] <= now_ms:
+            forming = rows[closed].copy()
+            forming[2:5] = forming[1]
+            forming[5] = 0.0
+        return rows, closed, forming
+
+    def _fetch_ohlcv(self, symbol: str, timeframe: str = None, since: int = None, limit: int = None) -> list:
+        timeframe = timeframe or self.timeframe
+        tf_ms = timeframe_ms(timeframe)
+        if tf_ms % self.base_ms:
+            raise ValueError(f"replay cannot serve {timeframe} from {self.timeframe} candles")
+        limit = min(limit or self.page_limit, self.page_limit)
+        rows, closed, forming = self._visible(symbol, self.clock.time() * 1000)
+        ts = self._timestamps[symbol]
+        step = tf_ms // self.base_ms
+        if since is not None:
+            lo = int(np.searchsorted(ts, since // tf_ms * tf_ms, side='left'))
+        else:
+            # Enough base candles for `limit` candles of `timeframe`, from a bucket boundary
+            lo = max(closed - limit * step, 0)
+            lo = int(np.searchsorted(ts, ts[lo] // tf_ms * tf_ms, side='left')) if lo < len(ts) else lo
+        window = rows[lo:closed]
+        if forming is not None:
+            window = np.vstack([window, forming])
+        if step > 1:
+            window = resample_ohlcv(window, tf_ms)
+        if since is not None:
+            window = window[window[:, 0] >= since][:limit]
+        else:
+            window = window[-limit:]
+        return [[int(r[0]), r[1], r[2], r[3], r[4], r[5]] for r in window.tolist()]
+
+    def _ticker(self, symbol: str) -> dict:
+        now_ms = self.clock.time() * 1000
+        rows, closed, forming = self._visible(symbol, now_ms)
+        if forming is not None:
+            last = float(forming[1])
+        elif closed:
+            last = float(rows[closed - 1, 4])
+        else:
+            import ccxt
+            raise ccxt.BadSymbol(f"{symbol} has no candles yet at {int(now_ms)}")
+        half = last * self.spread_bps / 20_000
+        return {'symbol': symbol, 'timestamp': int(now_ms), 'last': last, 'close': last,
+                'bid': last - half, 'ask': last + half}
+
+    def fetch_ohlcv(self, symbol: str, timeframe: str = '1m', since: int = None, limit: int = None,
+                    params: dict = None) -> list:
+        self._network('fetch_ohlcv')
+        return self._fetch_ohlcv(symbol, timeframe, since, limit)
+
+    def fetch_ticker(self, symbol: str, params: dict = None) -> dict:
+        self._network('fetch_ticker')
+        return self._ticker(symbol)
+
+    def fetch_tickers(self, symbols: list = None, params: dict = None) -> dict:
+        self._network('fetch_tickers')
+        return {s: self._ticker(s) for s in (symbols or self.candles)}
+
+    def _balance(self) -> dict:
+        balance = {'free': dict(self.balance), 'used': {c: 0.0 for c in self.balance}, 'total': dict(self.balance)}
+        for code, total in self.balance.items():
+            balance[code] = {'free': total, 'used': 0.0, 'total': total}
+        return balance
+
+    def fetch_balance(self, params: dict = None) -> dict:
+        self._network('fetch_balance')
+        return self._balance()
+
+    # -- orders ---------------------------------------------------------------------
+
+    def _volume_since(self, symbol: str, since_ms: float, now_ms: float) -> float:
+        """Base volume of candles that closed in (since_ms, now_ms]."""
+        rows, ts = self.candles[symbol], self._timestamps[symbol]
+        lo = int(np.searchsorted(ts, since_ms - self.base_ms, side='right'))
+        hi = int(np.searchsorted(ts, now_ms - self.base_ms, side='right'))
+        return float(rows[lo:hi, 5].sum()) if hi > lo else 0.0
+
+    def _fill(self, order: dict):
+        """Advance an open order's fills to the current clock time."""
+        if order['status'] != 'open':
+            return
+        now_ms = self.clock.time() * 1000
+        volume = self._volume_since(order['symbol'], self._fill_checked[order['id']], now_ms)
+        self._fill_checked[order['id']] = now_ms
+        ticker = self._ticker(order['symbol'])
+        touch = ticker['ask'] if order['side'] == 'buy' else ticker['bid']
+        amount, price = self.fill_model.fill(order['side'], order['remaining'], touch, volume)
+        if amount > _EPSILON:
+            cost = amount * price
+            order['filled'] += amount
+            order['remaining'] = max(order['amount'] - order['filled'], 0.0)
+            order['cost'] += cost
+            order['average'] = order['cost'] / order['filled']
+            order['fee']['cost'] += cost * self.fee_rate
+            order['lastTradeTimestamp'] = int(now_ms)
+        if order['remaining'] <= _EPSILON * max(order['amount'], 1.0):
+            order['remaining'] = 0.0
+            order['status'] = 'closed'
+
+    def _create_order(self, symbol: str, type: str, side: str, amount: float, price: float = None,
+                      params: dict = None) -> dict:
+        import ccxt
+        if type != 'market':
+            raise ccxt.InvalidOrder(f"replay only supports market orders, got {type}")
+        if symbol not in self.candles:
+            raise ccxt.BadSymbol(f"replay has no candles for {symbol}")
+        if not amount or amount <= 0:
+            raise ccxt.InvalidOrder(f"invalid amount {amount}")
+        client_id = (params or {}).get('clientOrderId')
+        now_ms = self.clock.time() * 1000
+        with self._lock:
+            if client_id is not None and client_id in self._by_client_id:
+                raise ccxt.DuplicateOrderId(f"clientOrderId {client_id} already exists")
+            order = {
+                'id': str(next(self._ids)), 'clientOrderId': client_id, 'symbol': symbol, 'type': 'market',
+                'side': side, 'amount': float(amount), 'filled': 0.0, 'remaining': float(amount),
+                'cost': 0.0, 'average': None, 'price': None, 'status': 'open', 'timestamp': int(now_ms),
+                'lastTradeTimestamp': None, 'fee': {'cost': 0.0, 'currency': symbol.split('/')[1]},
+            }
+            self.orders[order['id']] = order
+            if client_id is not None:
+                self._by_client_id[client_id] = order
+            self._fill_checked[order['id']] = now_ms
+            self._fill(order)
+            return dict(order, fee=dict(order['fee']))
+
+    def _find(self, id: str, params: dict = None) -> dict:
+        client_id = (params or {}).get('clientOrderId')
+        order = self.orders.get(str(id)) if id is not None else None
+        if order is None and client_id is not None:
+            order = self._by_client_id.get(client_id)
+        if order is None:
+            import ccxt
+            raise ccxt.OrderNotFound(f"replay order {id or client_id} not found")
+        return order
+
+    def _fetch_order(self, id: str, symbol: str = None, params: dict = None) -> dict:
+        with self._lock:
+            order = self._find(id, params)
+            self._fill(order)
+            return dict(order, fee=dict(order['fee']))
+
+    def _cancel_order(self, id: str, symbol: str = None, params: dict = None) -> dict:
+        with self._lock:
+            order = self._find(id, params)
+            self._fill(order)
+            if order['status'] != 'open':
+                import ccxt
+                raise ccxt.OrderNotFound(f"replay order {id} is already {order['status']}")
+            order['status'] = 'canceled'
+            return dict(order, fee=dict(order['fee']))
+
+    def _deliver(self, method: str, *args) -> dict:
+        """Create an order unless the call fails; half the failed submissions still reach the book."""
+        if self._fails():
+            with self._lock:
+                reached = bool(self._rng.random() < 0.5)
+            if reached:
+                self._create_order(*args)
+            raise self._timeout(method)
+        return self._create_order(*args)
+
+    def _submit(self, method: str, *args) -> dict:
+        """Create an order behind simulated network latency and failures."""
+        delay = self._delay()
+        if delay > 0:
+            time.sleep(delay / self.clock.speed)
+        return self._deliver(method, *args)
+
+    def create_order(self, symbol: str, type: str, side: str, amount: float, price: float = None,
+                     params: dict = None) -> dict:
+        return self._submit('create_order', symbol, type, side, amount, price, params)
+
+    def create_market_buy_order(self, symbol: str, amount: float, params: dict = None) -> dict:
+        return self.create_order(symbol, 'market', 'buy', amount, None, params)
+
+    def create_market_sell_order(self, symbol: str, amount: float, params: dict = None) -> dict:
+        return self.create_order(symbol, 'market', 'sell', amount, None, params)
+
+    def fetch_order(self, id: str, symbol: str = None, params: dict = None) -> dict:
+        self._network('fetch_order')
+        return self._fetch_order(id, symbol, params)
+
+    def cancel_order(self, id: str, symbol: str = None, params: dict = None) -> dict:
+        self._network('cancel_order')
+        return self._cancel_order(id, symbol, params)
+
+    # -- streaming ------------------------------------------------------------------
+
+    async def _next_candle(self):
+        now = self.clock.time()
+        base = self.base_ms / 1000
+        await self.clock.sleep((int(now // base) + 1) * base - now)
+
+    async def watch_ticker(self, symbol: str, params: dict = None) -> dict:
+        await self._next_candle()
+        return self._ticker(symbol)
+
+    async def watch_tickers(self, symbols: list = None, params: dict = None) -> dict:
+        await self._next_candle()
+        return {s: self._ticker(s) for s in (symbols or self.candles)}
+
+
+class AsyncReplayExchange:
+    """ccxt.async_support flavour of a ReplayExchange; latency is awaited on the replay clock."""
+
+    def __init__(self, replay: ReplayExchange):
+        self.replay = replay
+
+    def __getattr__(self, name: str):
+        # id, has, markets, clock, parse_timeframe, milliseconds, set_markets, watch_*, ...
+        return getattr(self.replay, name)
+
+    async def _network(self, method: str, fail: bool = True):
+        replay = self.replay
+        delay = replay._delay()
+        if delay > 0:
+            await replay.clock.sleep(delay)
+        if fail and replay._fails():
+            raise replay._timeout(method)
+
+    async def load_markets(self, reload: bool = False) -> dict:
+        await self._network('load_markets', fail=False)
+        return self.replay._load_markets(reload)
+
+    async def fetch_ohlcv(self, symbol: str, timeframe: str = '1m', since: int = None, limit: int = None,
+                          params: dict = None) -> list:
+        await self._network('fetch_ohlcv')
+        return self.replay._fetch_ohlcv(symbol, timeframe, since, limit)
+
+    async def fetch_ticker(self, symbol: str, params: dict = None) -> dict:
+        await self._network('fetch_ticker')
+        return self.replay._ticker(symbol)
+
+    async def fetch_balance(self, params: dict = None) -> dict:
+        await self._network('fetch_balance')
+        return self.replay._balance()
+
+    async def create_order(self, symbol: str, type: str, side: str, amount: float, price: float = None,
+                           params: dict = None) -> dict:
+        replay = self.replay
+        delay = replay._delay()
+        if delay > 0:
+            await replay.clock.sleep(delay)
+        return replay._deliver('create_order', symbol, type, side, amount, price, params)
+
+    async def create_market_buy_order(self, symbol: str, amount: float, params: dict = None) -> dict:
+        return await self.create_order(symbol, 'market', 'buy', amount, None, params)
+
+    async def create_market_sell_order(self, symbol: str, amount: float, params: dict = None) -> dict:
+        return await self.create_order(symbol, 'market', 'sell', amount, None, params)
+
+    async def fetch_order(self, id: str, symbol: str = None, params: dict = None) -> dict:
+        await self._network('fetch_order')
+        return self.replay._fetch_order(id, symbol, params)
+
+    async def cancel_order(self, id: str, symbol: str = None, params: dict = None) -> dict:
+        await self._network('cancel_order')
+        return self.replay._cancel_order(id, symbol, params)
+
+    async def close(self):
+        pass
@@ -0,0 +1,269 @@
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from .indicators import OHLCV_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+_UNITS = {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+# Exchanges start weeks on Monday; the epoch was a Thursday
+_WEEK_OFFSET = 4 * 86_400_000
+
+
+def timeframe_ms(timeframe: str) -> int:
+    """Length of a fixed-size timeframe ('1m', '4h', '1d', '1w') in milliseconds."""
+    unit = _UNITS.get(timeframe[-1:])
+    if unit is None or not timeframe[:-1].isdigit():
+        raise ValueError(f"Cannot resample to timeframe {timeframe!r}")
+    return int(timeframe[:-1]) * unit
+
+
+def bucket_starts(timestamps: np.ndarray, tf_ms: int) -> np.ndarray:
+    """Open time (ms) of the `tf_ms` candle each timestamp falls into."""
+    offset = _WEEK_OFFSET if tf_ms % _UNITS['w'] == 0 else 0
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    return (timestamps - offset) // tf_ms * tf_ms + offset
+
+
+def _bucket(timestamp: float, tf_ms: int) -> float:
+    offset = _WEEK_OFFSET if tf_ms % _UNITS['w'] == 0 else 0
+    return float((int(timestamp) - offset) // tf_ms * tf_ms + offset)
+
+
+def _fold(agg, row: np.ndarray, bucket: float) -> np.ndarray:
+    """`row` added to the running candle `agg` (None starts a new one at `bucket`)."""
+    candle = row.copy()
+    candle[0] = bucket
+    if agg is not None:
+        candle[1] = agg[1]
+        candle[2] = max(candle[2], agg[2])
+        candle[3] = min(candle[3], agg[3])
+        candle[5] += agg[5]
+    return candle
+
+
+def resample_ohlcv(rows: np.ndarray, tf_ms: int) -> np.ndarray:
+    """Aggregate time-ordered OHLCV rows (n x 6, ms timestamps) into `tf_ms` candles.
+
+    One segment reduction per column: first open, max high, min low, last
+    close, summed volume. Rows may themselves be partial aggregates of
+    their bucket, so a stored candle can be folded together with new rows.
+    """
+    rows = np.asarray(rows, dtype=np.float64).reshape(-1, 6)
+    if not len(rows):
+        return rows
+    buckets = bucket_starts(rows[:, 0], tf_ms)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(rows)] - 1
+    out = np.empty((len(starts), 6))
+    out[:, 0] = buckets[starts]
+    out[:, 1] = rows[starts, 1]
+    out[:, 2] = np.maximum.reduceat(rows[:, 2], starts)
+    out[:, 3] = np.minimum.reduceat(rows[:, 3], starts)
+    out[:, 4] = rows[ends, 4]
+    out[:, 5] = np.add.reduceat(rows[:, 5], starts)
+    return out
+
+
+def _to_rows(candles) -> np.ndarray:
+    """DataFrame (datetime or ms timestamps) or ccxt rows to an n x 6 float array."""
+    if isinstance(candles, pd.DataFrame):
+        ts = candles['timestamp']
+        if pd.api.types.is_datetime64_any_dtype(ts):
+            ts = ts.to_numpy(dtype='datetime64[ms]').astype(np.int64)
+        rows = np.empty((len(candles), 6))
+        rows[:, 0] = ts
+        # Column by column: selecting a column list costs more than a tick's whole update
+        for i, column in enumerate(OHLCV_COLUMNS[1:], 1):
+            rows[:, i] = candles[column].to_numpy()
+        return rows
+    return np.asarray(candles, dtype=np.float64).reshape(-1, 6)
+
+
+class _Series:
+    """One derived timeframe of one symbol."""
+
+    def __init__(self, tf_ms: int):
+        self.tf_ms = tf_ms
+        self.candles = np.empty((0, 6))  # completed candles
+        self.settled = None  # aggregate of the current bucket's closed base candles
+        self.partial = None  # settled + the latest base candle
+        self.complete_from = None  # earlier buckets were only partly covered by base candles
+        self.seeded = False
+        self.version = 0
+
+    def append(self, done: np.ndarray, limit: int):
+        if self.complete_from is not None:
+            done = done[done[:, 0] >= self.complete_from]
+        if len(done):
+            self.candles = np.concatenate([self.candles, done])[-limit:]
+
+    def settle(self, base: np.ndarray, latest: np.ndarray, limit: int):
+        """Fold closed base candles in and close every bucket before the latest candle's."""
+        current = _bucket(latest[0], self.tf_ms)
+        if len(base) == 1:
+            # The streaming case: one candle closed, no segment reduction needed
+            bucket = _bucket(base[0, 0], self.tf_ms)
+            if self.settled is not None and self.settled[0] != bucket:
+                self.append(self.settled[None], limit)
+                self.settled = None
+            self.settled = _fold(self.settled, base[0], bucket)
+        elif len(base):
+            rows = base if self.settled is None else np.vstack([self.settled, base])
+            agg = resample_ohlcv(rows, self.tf_ms)
+            self.settled = agg[-1]
+            self.append(agg[:-1], limit)
+        if self.settled is not None and self.settled[0] < current:
+            self.append(self.settled[None], limit)
+            self.settled = None
+        self.update_partial(latest, current)
+
+    def update_partial(self, latest: np.ndarray, current: float):
+        self.partial = _fold(self.settled, latest, current)
+        self.version += 1
+
+
+class _Symbol:
+    def __init__(self):
+        self.latest = None  # newest base candle, still revisable
+        self.series = {}
+
+
+class Resampler:
+    """Every higher timeframe of a symbol derived from one base-timeframe stream.
+
+    ingest() takes base candles as fetched (overlapping windows, a revised
+    still-open candle) and only folds in what is new: base candles before the
+    latest one are final, so each derived series keeps the aggregate of its
+    current bucket and the partial candle is that aggregate plus the latest
+    base candle. Buckets close when a base candle of a later bucket arrives.
+    History older than the base stream reaches comes from seed(), once.
+    """
+
+    def __init__(self, base_timeframe: str = '1m', timeframes: list = None, limit: int = 500):
+        self.base_timeframe = base_timeframe
+        self.base_ms = timeframe_ms(base_timeframe)
+        self.limit = limit
+        self.timeframes = {}
+        for timeframe in timeframes or []:
+            self.add_timeframe(timeframe)
+        self._symbols = {}
+        self._lock = threading.Lock()
+
+    def add_timeframe(self, timeframe: str):
+        tf_ms = timeframe_ms(timeframe)
+        if tf_ms <= self.base_ms or tf_ms % self.base_ms:
+            raise ValueError(f"{timeframe} is not a multiple of the base timeframe {self.base_timeframe}")
+        self.timeframes[timeframe] = tf_ms
+
+    def can_derive(self, timeframe: str) -> bool:
+        try:
+            tf_ms = timeframe_ms(timeframe)
+        except ValueError:
+            return False
+        return tf_ms > self.base_ms and tf_ms % self.base_ms == 0
+
+    def _state(self, symbol: str) -> _Symbol:
+        state = self._symbols.get(symbol)
+        if state is None:
+            state = self._symbols[symbol] = _Symbol()
+        return state
+
+    def _series(self, symbol: str, timeframe: str) -> _Series:
+        state = self._state(symbol)
+        series = state.series.get(timeframe)
+        if series is None:
+            if timeframe not in self.timeframes:
+                self.add_timeframe(timeframe)
+            series = state.series[timeframe] = _Series(self.timeframes[timeframe])
+            if state.latest is not None:
+                # Derived from here on; history needs seed()
+                series.complete_from = state.latest[0]
+                series.update_partial(state.latest, _bucket(state.latest[0], series.tf_ms))
+        return series
+
+    def ingest(self, symbol: str, candles) -> int:
+        """Feed base candles (oldest first); returns how many were new or revised."""
+        rows = _to_rows(candles)
+        with self._lock:
+            state = self._state(symbol)
+            for timeframe in self.timeframes:
+                self._series(symbol, timeframe)
+            latest = state.latest
+            if latest is not None:
+                rows = rows[rows[:, 0] >= latest[0]]
+            if not len(rows):
+                return 0
+            if latest is None:
+                pending = rows
+                for series in state.series.values():
+                    # The first bucket may start before the stream does
+                    series.complete_from = bucket_starts(rows[:1, 0] + series.tf_ms - 1, series.tf_ms)[0]
+            elif rows[0, 0] == latest[0]:
+                pending = rows
+            else:
+                if rows[0, 0] > latest[0] + self.base_ms:
+                    logger.warning(f"{symbol}: base candles missing after {int(latest[0])}, "
+                                   f"derived timeframes need re-seeding")
+                    for series in state.series.values():
+                        series.seeded = False
+                pending = np.vstack([latest, rows])
+            state.latest = pending[-1].copy()
+            for series in state.series.values():
+                series.settle(pending[:-1], state.latest, self.limit)
+            return len(rows)
+
+    def seeded(self, symbol: str, timeframe: str) -> bool:
+        with self._lock:
+            return self._series(symbol, timeframe).seeded
+
+    def seed(self, symbol: str, timeframe: str, candles):
+        """Backfill `timeframe` history (e.g. one fetch_ohlcv of it) behind the derived candles.
+
+        Call after the symbol's first ingest(): the seeded candle of the
+        current bucket becomes its aggregate so far, minus the latest base
+        candle that the partial adds back.
+        """
+        rows = _to_rows(candles)
+        with self._lock:
+            state = self._state(symbol)
+            series = self._series(symbol, timeframe)
+            series.seeded = True
+            if not len(rows):
+                return
+            latest = state.latest
+            if latest is None:
+                # The open last candle is rebuilt from base candles
+                series.candles = rows[:-1][-self.limit:]
+                return
+            current = _bucket(latest[0], series.tf_ms)
+            rows = rows[rows[:, 0] <= current]
+            if len(rows) and rows[-1, 0] == current:
+                settled = rows[-1].copy()
+                settled[5] = max(settled[5] - latest[5], 0.0)
+                series.settled = settled
+                rows = rows[:-1]
+            if len(rows):
+                # Exchange history wins; derived candles only extend it
+                newer = series.candles[series.candles[:, 0] > rows[-1, 0]]
+                series.candles = np.concatenate([rows, newer])[-self.limit:]
+            series.complete_from = None
+            series.update_partial(latest, current)
+
+    def version(self, symbol: str, timeframe: str) -> int:
+        """Changes whenever the candles of `timeframe` do."""
+        with self._lock:
+            return self._series(symbol, timeframe).version
+
+    def candles(self, symbol: str, timeframe: str, limit: int = None) -> pd.DataFrame:
+        """Completed candles plus the partial one, shaped like DataEngine.fetch_ohlcv."""
+        with self._lock:
+            series = self._series(symbol, timeframe)
+            rows = series.candles
+            if series.partial is not None:
+                rows = np.vstack([rows, series.partial])
+        rows = rows[-(limit or self.limit):]
+        df = pd.DataFrame(rows[:, 1:], columns=OHLCV_COLUMNS[1:])
+        df.insert(0, 'timestamp', pd.to_datetime(rows[:, 0].astype(np.int64), unit='ms'))
+        return df
@@ -0,0 +1,306 @@
+import logging
+import math
+import time
+from datetime import datetime, timezone
+import numpy as np
+from .config import Config
+from .metrics import REGISTRY
+from .resample import timeframe_ms
+
+logger = logging.getLogger(__name__)
+
+RISK_BLOCKS = REGISTRY.counter('trader_risk_blocks_total', 'Orders refused by pre-trade risk checks', ['reason'])
+RISK_EXITS = REGISTRY.counter('trader_risk_exits_total', 'Stop-loss and take-profit exits triggered', ['reason'])
+
+_EPSILON = 1e-12
+_FIELDS = ('amount', 'avg_price', 'price', 'variance', 'returns', 'exiting')
+
+
+def position_size(config: Config, equity: float, price: float) -> float:
+    """Amount that loses RiskConfig.max_risk_per_trade of equity if the stop-loss is hit.
+
+    Capped at RiskConfig.max_position_exposure of equity in notional.
+    """
+    if price <= 0 or equity <= 0:
+        return 0.0
+    cap = equity * config.risk.max_position_exposure / price
+    stop_distance = price * config.trading.stop_loss_percent / 100
+    if stop_distance <= 0:
+        return cap
+    return min(equity * config.risk.max_risk_per_trade / stop_distance, cap)
+
+
+class RiskEngine:
+    """Portfolio risk state and checks for the live loop.
+
+    Positions, marks and per-symbol volatility live in parallel NumPy arrays,
+    one slot per symbol, and the running cash, gross exposure and market value
+    are updated incrementally on every fill and price. That keeps allow() a
+    handful of scalar operations at order time, while evaluate() re-derives
+    the aggregates and finds every stop-loss/take-profit hit in one vectorized
+    pass per tick. Limits come from TradingConfig (daily loss, stops,
+    volatility bounds) and RiskConfig (sizing and exposure).
+
+    Volatility is measured per `timeframe` candle (DataConfig.timeframe by
+    default) and scaled by sqrt(time) to RiskConfig.volatility_horizon before
+    it is compared with the bounds.
+    """
+
+    def __init__(self, config: Config, balance: float = 0.0, clock=None, capacity: int = 64,
+                 timeframe: str = None):
+        self.config = config
+        self.clock = clock
+        candle_ms = timeframe_ms(timeframe or config.data.timeframe)
+        self._volatility_scale = math.sqrt(timeframe_ms(config.risk.volatility_horizon) / candle_ms) * 100
+        self.cash = balance
+        self.symbols = []
+        self._slots = {}
+        self.amount = np.zeros(capacity)
+        self.avg_price = np.zeros(capacity)
+        self.price = np.full(capacity, np.nan)
+        self.variance = np.zeros(capacity)
+        self.returns = np.zeros(capacity, dtype=np.int64)
+        self.exiting = np.zeros(capacity, dtype=bool)
+        self._exposure = 0.0
+        self._value = 0.0
+        self._open = 0
+        self._day = None
+        self.day_start_equity = None
+        self.halted = False
+        self._order_fills = {}
+
+    # -- state --------------------------------------------------------------------
+
+    def _slot(self, symbol: str) -> int:
+        i = self._slots.get(symbol)
+        if i is None:
+            i = self._slots[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            if i == len(self.amount):
+                for name in _FIELDS:
+                    old = getattr(self, name)
+                    new = np.full(2 * len(old), np.nan) if name == 'price' else np.zeros(2 * len(old), old.dtype)
+                    new[:len(old)] = old
+                    setattr(self, name, new)
+        return i
+
+    def _mark(self, i: int) -> float:
+        price = self.price[i]
+        return price if price == price else self.avg_price[i]
+
+    def _revalue(self, i: int, amount: float, price: float = None):
+        """Move slot i to `amount` (and `price`), keeping the running aggregates in step."""
+        old_amount, old_mark = self.amount[i], self._mark(i)
+        self.amount[i] = amount
+        if price is not None:
+            self.price[i] = price
+        mark = self._mark(i)
+        self._exposure += abs(amount) * mark - abs(old_amount) * old_mark
+        self._value += amount * mark - old_amount * old_mark
+        self._open += int(abs(amount) >= _EPSILON) - int(abs(old_amount) >= _EPSILON)
+
+    def equity(self) -> float:
+        return self.cash + self._value
+
+    def exposure(self) -> float:
+        """Gross notional of all positions at their last marks."""
+        return self._exposure
+
+    def daily_pnl(self) -> float:
+        self._roll_day()
+        return self.equity() - self.day_start_equity
+
+    def volatility(self, symbol: str) -> float:
+        """EWMA volatility of returns over RiskConfig.volatility_horizon, in percent (NaN until warmed up)."""
+        i = self._slots.get(symbol)
+        if i is None or self.returns[i] < 2:
+            return float('nan')
+        return math.sqrt(self.variance[i]) * self._volatility_scale
+
+    def fund(self, balance: float):
+        """Set cash, e.g. from the exchange balance at start-up, and restart the day's loss tracking."""
+        self.cash = balance
+        self._day = None
+
+    def _roll_day(self):
+        now = self.clock.time() if self.clock is not None else time.time()
+        day = datetime.fromtimestamp(now, timezone.utc).date()
+        if day != self._day:
+            self._day = day
+            self.day_start_equity = self.equity()
+            if self.halted:
+                logger.info("New trading day, lifting the daily loss halt")
+            self.halted = False
+
+    def _check_halt(self):
+        self._roll_day()
+        limit = self.config.trading.max_daily_loss * self.day_start_equity
+        if not self.halted and limit > 0 and self.equity() - self.day_start_equity <= -limit:
+            self.halted = True
+            logger.warning(f"Daily loss limit hit ({self.equity() - self.day_start_equity:.2f}), "
+                           f"new positions blocked until tomorrow")
+
+    # -- updates ------------------------------------------------------------------
+
+    def update(self, symbol: str, close: float):
+        """Fold a closed candle into the symbol's mark and volatility."""
+        i = self._slot(symbol)
+        last = self.price[i]
+        if last > 0 and close > 0:
+            r = math.log(close / last)
+            alpha = 2.0 / (self.config.risk.volatility_window + 1)
+            self.variance[i] = r * r if self.returns[i] == 0 else (1 - alpha) * self.variance[i] + alpha * r * r
+            self.returns[i] += 1
+        self._revalue(i, self.amount[i], close)
+
+    def mark(self, prices: dict):
+        """Update marks (e.g. from tickers) without touching volatility."""
+        quotes = [(self._slot(s), p) for s, p in prices.items() if p is not None and p > 0]
+        if not quotes:
+            return
+        idx = np.fromiter((i for i, _ in quotes), dtype=np.intp, count=len(quotes))
+        price = np.fromiter((p for _, p in quotes), dtype=np.float64, count=len(quotes))
+        amount = self.amount[idx]
+        old = amount * np.where(np.isnan(self.price[idx]), self.avg_price[idx], self.price[idx])
+        self.price[idx] = price
+        new = amount * price
+        self._exposure += float(np.abs(new).sum() - np.abs(old).sum())
+        self._value += float(new.sum() - old.sum())
+
+    def on_fill(self, symbol: str, side: str, amount: float, price: float, fee: float = 0.0):
+        """Apply an executed fill to cash and the position (average cost)."""
+        i = self._slot(symbol)
+        current, avg = self.amount[i], self.avg_price[i]
+        signed = amount if side == 'buy' else -amount
+        new = current + signed
+        if abs(current) < _EPSILON or (current > 0) == (signed > 0):
+            avg = (abs(current) * avg + abs(signed) * price) / (abs(current) + abs(signed))
+        elif abs(new) < _EPSILON:
+            new, avg = 0.0, 0.0
+        elif (new > 0) != (current > 0):
+            # Flipped through flat: the remainder opened at this price
+            avg = price
+        self.cash -= signed * price + fee
+        self._revalue(i, new, None if self.price[i] == self.price[i] else price)
+        self.avg_price[i] = avg
+        if abs(new) < _EPSILON or (new > 0) != (current > 0):
+            self.exiting[i] = False
+
+    def on_order_update(self, order):
+        """OrderPipeline callback: apply newly filled quantity of a live order."""
+        recorded = self._order_fills.get(order.client_id, 0.0)
+        delta = order.filled - recorded
+        if delta > _EPSILON and order.average is not None:
+            self._order_fills[order.client_id] = order.filled
+            fee = order.fee * delta / order.filled if order.filled else 0.0
+            self.on_fill(order.symbol, order.side, delta, order.average, fee)
+        if order.done and order.state != 'filled':  # OrderState.FILLED
+            # A failed exit must be able to fire again
+            self.clear_exit(order.symbol)
+
+    def on_trade_result(self, symbol: str, side: str, result: dict):
+        """Apply an ExecutionEngine.execute_trade result (simulated or ccxt order)."""
+        if not result:
+            return
+        amount = result.get('filled', result.get('amount'))
+        price = result.get('average') or result.get('price')
+        fee = result.get('fee') or 0.0
+        if isinstance(fee, dict):
+            fee = fee.get('cost') or 0.0
+        if amount and price:
+            self.on_fill(symbol, side, amount, price, fee)
+
+    def restore(self, positions: dict):
+        """Seed positions from Ledger.open_positions() after a restart."""
+        for symbol, position in positions.items():
+            i = self._slot(symbol)
+            self._revalue(i, 0.0)
+            self.avg_price[i] = position.avg_price
+            self._revalue(i, position.amount)
+
+    def clear_exit(self, symbol: str):
+        i = self._slots.get(symbol)
+        if i is not None:
+            self.exiting[i] = False
+
+    # -- checks -------------------------------------------------------------------
+
+    def position_size(self, symbol: str, price: float) -> float:
+        return position_size(self.config, self.equity(), price)
+
+    def allow(self, symbol: str, side: str, amount: float, price: float = None):
+        """Pre-trade check; returns (allowed, reason). Orders that only reduce a position always pass."""
+        if not self.config.risk.enabled:
+            return True, None
+        i = self._slots.get(symbol)
+        current = self.amount[i] if i is not None else 0.0
+        new = current + (amount if side == 'buy' else -amount)
+        if abs(new) <= abs(current) + _EPSILON and new * current >= 0:
+            return True, None
+        if price is None:
+            price = self._mark(i) if i is not None else float('nan')
+        reason = self._limit_hit(i, current, new, price)
+        if reason is not None:
+            RISK_BLOCKS.inc(reason=reason)
+            logger.info(f"{symbol}: {side} {amount:.6g} blocked by risk check ({reason})")
+            return False, reason
+        return True, None
+
+    def _limit_hit(self, i, current: float, new: float, price: float):
+        cfg, trading = self.config.risk, self.config.trading
+        self._check_halt()
+        if self.halted:
+            return 'daily_loss'
+        if i is not None and self.returns[i] >= 2:
+            vol = math.sqrt(self.variance[i]) * self._volatility_scale
+            if vol < trading.min_volatility or vol > trading.max_volatility:
+                return 'volatility'
+        if abs(current) < _EPSILON and self._open >= cfg.max_open_positions:
+            return 'max_positions'
+        if not price > 0:
+            return 'no_price'
+        equity = self.equity()
+        if abs(new) * price > cfg.max_position_exposure * equity * (1 + 1e-9):
+            return 'position_exposure'
+        old = abs(current) * (self._mark(i) if i is not None else price)
+        if self._exposure - old + abs(new) * price > cfg.max_gross_exposure * equity * (1 + 1e-9):
+            return 'gross_exposure'
+        return None
+
+    def evaluate(self, prices: dict = None) -> list:
+        """One vectorized pass over every position: refresh aggregates, find stop/take-profit hits.
+
+        Returns [{'symbol', 'side', 'amount', 'price', 'reason'}] closing orders for
+        positions that hit a level; each fires once until the position is
+        flat or clear_exit() is called.
+        """
+        if prices:
+            self.mark(prices)
+        n = len(self.symbols)
+        amount = self.amount[:n]
+        avg = self.avg_price[:n]
+        price = np.where(np.isnan(self.price[:n]), avg, self.price[:n])
+        value = amount * price
+        self._exposure = float(np.abs(value).sum())
+        self._value = float(value.sum())
+        self._open = int(np.count_nonzero(np.abs(amount) >= _EPSILON))
+        self._check_halt()
+        if not self.config.risk.enabled:
+            return []
+
+        trading = self.config.trading
+        with np.errstate(divide='ignore', invalid='ignore'):
+            move = np.where(avg > 0, price / avg - 1, 0.0) * np.sign(amount)
+        stop = trading.stop_loss_percent / 100
+        take = trading.take_profit_percent / 100
+        stopped = (move <= -stop) if stop > 0 else np.zeros(n, dtype=bool)
+        taken = (move >= take) if take > 0 else np.zeros(n, dtype=bool)
+        fire = (stopped | taken) & (np.abs(amount) >= _EPSILON) & ~self.exiting[:n]
+        exits = []
+        for i in np.flatnonzero(fire):
+            reason = 'stop_loss' if stopped[i] else 'take_profit'
+            self.exiting[i] = True
+            RISK_EXITS.inc(reason=reason)
+            exits.append({'symbol': self.symbols[i], 'side': 'sell' if amount[i] > 0 else 'buy',
+                          'amount': float(abs(amount[i])), 'price': float(price[i]), 'reason': reason})
+        return exits
@@ -0,0 +1,289 @@
+import logging
+from dataclasses import dataclass, replace
+import numpy as np
+from .config import StrategyConfig
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+SHADOW_SIGNALS = REGISTRY.counter('trader_shadow_signals_total', 'Signals of shadow strategy variants',
+                                  ['strategy', 'side'])
+
+_BINARY = {
+    'and': np.logical_and, 'or': np.logical_or,
+    'lt': np.less, 'le': np.less_equal, 'gt': np.greater, 'ge': np.greater_equal,
+    'add': np.add, 'sub': np.subtract, 'mul': np.multiply, 'div': np.divide,
+}
+
+
+class Expr:
+    """Node of a rule expression tree.
+
+    Built from Col/Param/Const leaves with Python operators: comparisons and
+    arithmetic on numbers, & | ~ on conditions. Trees are plain data; a
+    RuleSet compiles them into evaluation plans.
+    """
+
+    __slots__ = ('op', 'args', 'value')
+
+    def __init__(self, op: str, args: tuple = (), value=None):
+        self.op = op
+        self.args = args
+        self.value = value
+
+    def _binary(self, op: str, other, swap: bool = False) -> 'Expr':
+        other = other if isinstance(other, Expr) else Const(other)
+        return Expr(op, (other, self) if swap else (self, other))
+
+    def __and__(self, other):
+        return self._binary('and', other)
+
+    def __rand__(self, other):
+        return self._binary('and', other, swap=True)
+
+    def __or__(self, other):
+        return self._binary('or', other)
+
+    def __ror__(self, other):
+        return self._binary('or', other, swap=True)
+
+    def __invert__(self):
+        return Expr('not', (self,))
+
+    def __lt__(self, other):
+        return self._binary('lt', other)
+
+    def __le__(self, other):
+        return self._binary('le', other)
+
+    def __gt__(self, other):
+        return self._binary('gt', other)
+
+    def __ge__(self, other):
+        return self._binary('ge', other)
+
+    def __add__(self, other):
+        return self._binary('add', other)
+
+    def __radd__(self, other):
+        return self._binary('add', other, swap=True)
+
+    def __sub__(self, other):
+        return self._binary('sub', other)
+
+    def __rsub__(self, other):
+        return self._binary('sub', other, swap=True)
+
+    def __mul__(self, other):
+        return self._binary('mul', other)
+
+    def __rmul__(self, other):
+        return self._binary('mul', other, swap=True)
+
+    def __truediv__(self, other):
+        return self._binary('div', other)
+
+    def __rtruediv__(self, other):
+        return self._binary('div', other, swap=True)
+
+    def shift(self, periods: int = 1) -> 'Expr':
+        """Value `periods` candles earlier (NaN or False before the start; constants are unchanged)."""
+        return Expr('shift', (self,), periods)
+
+    def crosses_above(self, other) -> 'Expr':
+        other = other if isinstance(other, Expr) else Const(other)
+        return (self > other) & (self.shift() <= other.shift())
+
+    def crosses_below(self, other) -> 'Expr':
+        other = other if isinstance(other, Expr) else Const(other)
+        return (self < other) & (self.shift() >= other.shift())
+
+    def __repr__(self):
+        if self.op in ('col', 'param', 'const'):
+            return f"{self.op}({self.value!r})"
+        if self.op == 'shift':
+            return f"{self.args[0]!r}.shift({self.value})"
+        return f"{self.op}({', '.join(map(repr, self.args))})"
+
+
+def Col(name: str) -> Expr:
+    """An indicator or price column, e.g. Col('rsi')."""
+    return Expr('col', value=name)
+
+
+def Param(name: str) -> Expr:
+    """A StrategyConfig threshold, filled in when a Rule is bound to parameters."""
+    return Expr('param', value=name)
+
+
+def Const(value: float) -> Expr:
+    return Expr('const', value=float(value))
+
+
+def bind(expr: Expr, params) -> Expr:
+    """Replace Param leaves with the values of `params` (a StrategyConfig or dict)."""
+    if expr.op == 'param':
+        value = params[expr.value] if isinstance(params, dict) else getattr(params, expr.value)
+        return Const(value)
+    if not expr.args:
+        return expr
+    return Expr(expr.op, tuple(bind(a, params) for a in expr.args), expr.value)
+
+
+@dataclass
+class Rule:
+    """A strategy: enter long where `buy` holds, exit where `sell` holds (sell wins ties)."""
+    name: str
+    buy: Expr
+    sell: Expr
+
+
+# The technical strategy Strategy.generate_signals has always traded
+TECHNICAL_BUY = (Col('rsi') < Param('rsi_oversold')) & (Col('macd') > Col('signal_line'))
+TECHNICAL_SELL = (Col('rsi') > Param('rsi_overbought')) & (Col('macd') < Col('signal_line'))
+# AI overlay: only buy when the model predicts a close above the previous one
+AI_CONFIRM = Col('ai_prediction') > Col('close').shift(1)
+# XGBoost overlay: only buy when the classifier rates an up-move likely enough
+XGB_CONFIRM = Col('xgb_probability') > Param('xgb_min_probability')
+
+
+def default_rule(params: StrategyConfig = None, name: str = 'default', ai: bool = False,
+                 xgb: bool = False) -> Rule:
+    params = params or StrategyConfig()
+    buy = TECHNICAL_BUY
+    if ai:
+        buy = buy & AI_CONFIRM
+    if xgb:
+        buy = buy & XGB_CONFIRM
+    return Rule(name, bind(buy, params), bind(TECHNICAL_SELL, params))
+
+
+def shadow_rules(params: StrategyConfig, ai: bool = False, xgb: bool = False) -> list:
+    """Default-rule variants from StrategyConfig.shadow_variants ({name: {threshold: value}})."""
+    return [default_rule(replace(params, **overrides), name, ai, xgb)
+            for name, overrides in (params.shadow_variants or {}).items()]
+
+
+def _shape(expr: Expr) -> tuple:
+    """Structure of `expr` with constant values left out."""
+    if expr.op == 'const':
+        return ('const',)
+    return (expr.op, expr.value) + tuple(_shape(a) for a in expr.args)
+
+
+class _Plan:
+    """Rules of one shape evaluated together, their constants as a trailing variant axis."""
+
+    def __init__(self, rules: list):
+        self.names = [rule.name for rule in rules]
+        self.columns = []
+        self.steps = []
+        self._slots = {}
+        self._varying = []  # per step: has a time axis (depends on some column)
+        self.buy = self._compile([rule.buy for rule in rules])
+        self.sell = self._compile([rule.sell for rule in rules])
+        self.lookback = max((step[3] for step in self.steps), default=0)
+
+    def _compile(self, nodes: list) -> int:
+        head = nodes[0]
+        if head.op == 'param':
+            raise ValueError(f"Unbound parameter {head.value!r}; bind() the rule first")
+        if head.op == 'const':
+            values = tuple(n.value for n in nodes)
+            key = ('const', values)
+            args, value = (), values[0] if len(set(values)) == 1 else np.array(values)
+        else:
+            args = tuple(self._compile([n.args[i] for n in nodes]) for i in range(len(head.args)))
+            if head.op == 'shift' and not self._varying[args[0]]:
+                # Constants are the same on every candle
+                return args[0]
+            key = (head.op, head.value, args)
+            value = head.value
+        slot = self._slots.get(key)
+        if slot is not None:
+            return slot
+        if head.op == 'col' and head.value not in self.columns:
+            self.columns.append(head.value)
+        lookback = max((self.steps[a][3] for a in args), default=0)
+        if head.op == 'shift':
+            lookback += head.value
+        slot = self._slots[key] = len(self.steps)
+        self.steps.append((head.op, args, value, lookback))
+        self._varying.append(head.op == 'col' or any(self._varying[a] for a in args))
+        return slot
+
+    def run(self, fields, rows: slice = None) -> dict:
+        variants = len(self.names) > 1
+        values = []
+        shape = ()
+        for op, args, value, _ in self.steps:
+            if op == 'col':
+                x = np.asarray(fields[value])
+                if rows is not None:
+                    x = x[rows]
+                shape = x.shape
+                values.append(x[..., None] if variants else x)
+            elif op == 'const':
+                values.append(value)
+            elif op == 'not':
+                values.append(np.logical_not(values[args[0]]))
+            elif op == 'shift':
+                # Along time (axis 0); conditions are false before the start, numbers NaN
+                x = np.asarray(values[args[0]])
+                if x.dtype == np.bool_:
+                    out = np.zeros_like(x)
+                else:
+                    x = x.astype(np.float64, copy=False)
+                    out = np.full_like(x, np.nan)
+                if value < len(x):
+                    out[value:] = x[:len(x) - value]
+                values.append(out)
+            else:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    values.append(_BINARY[op](values[args[0]], values[args[1]]))
+        if variants:
+            shape = shape + (len(self.names),)
+        signal = np.where(np.broadcast_to(values[self.buy], shape), 1, 0).astype(np.int8)
+        signal[np.broadcast_to(values[self.sell], shape)] = -1
+        if not variants:
+            return {self.names[0]: signal}
+        return {name: signal[..., k] for k, name in enumerate(self.names)}
+
+
+class RuleSet:
+    """Many rules compiled into a few evaluation plans over (time x symbol) arrays.
+
+    Rules with the same tree shape (variants that only change thresholds,
+    such as shadow strategies) share one plan whose constants are vectors:
+    each node is one NumPy operation over a trailing variant axis, so dozens
+    of variants cost about as much as one. Within a plan every distinct node
+    is evaluated once. Fields may be 1-D (one symbol) or 2-D (time x symbol,
+    e.g. a FeatureMatrix); time is axis 0.
+    """
+
+    def __init__(self, rules: list):
+        self.rules = list(rules)
+        groups = {}
+        for rule in self.rules:
+            groups.setdefault((_shape(rule.buy), _shape(rule.sell)), []).append(rule)
+        self._plans = [_Plan(group) for group in groups.values()]
+        self.columns = list(dict.fromkeys(c for plan in self._plans for c in plan.columns))
+        self.lookback = max((plan.lookback for plan in self._plans), default=0)
+
+    def _run(self, fields, rows: slice = None) -> dict:
+        signals = {}
+        for plan in self._plans:
+            signals.update(plan.run(fields, rows))
+        return {rule.name: signals[rule.name] for rule in self.rules}
+
+    def evaluate(self, fields) -> dict:
+        """{rule name: int8 signal array} (1 buy, -1 sell, 0 none) for every row of `fields`."""
+        return self._run(fields)
+
+    def evaluate_latest(self, fields) -> dict:
+        """{rule name: signal} for the last row only, reading just the rows its shifts need.
+
+        Scalar per rule for 1-D fields, one value per symbol for 2-D fields.
+        """
+        signals = self._run(fields, slice(-(self.lookback + 1), None))
+        return {name: signal[-1] if signal.ndim > 1 else int(signal[-1]) for name, signal in signals.items()}
@@ -0,0 +1,300 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+import pandas as pd
+from .config import Config
+from .candle_store import CandleStore
+from .data_engine import create_exchange, load_markets_async, normalize_symbol
+from .indicators import IndicatorEngine
+from .metrics import API_CALLS, RATE_LIMIT_WAITS, RATE_LIMIT_WAIT_SECONDS, TICK_TO_ORDER_SECONDS, timed
+from .predictor import BatchingPredictor, Predictor
+from .risk import RiskEngine
+from .rules import SHADOW_SIGNALS
+
+if TYPE_CHECKING:
+    from .orders import OrderPipeline
+
+logger = logging.getLogger(__name__)
+
+
+class Clock:
+    """Wall clock used by the scheduler; replaceable for accelerated replay."""
+
+    def time(self) -> float:
+        return time.time()
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(max(seconds, 0))
+
+
+class RateLimiter:
+    """Async token bucket shared by every coroutine using one exchange."""
+
+    def __init__(self, rate: float, capacity: float = 10, clock: Clock = None):
+        self.rate = rate  # tokens per second
+        self.capacity = capacity
+        self.clock = clock or Clock()
+        self.tokens = capacity
+        self.updated = self.clock.time()
+        self.waits = 0
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def for_exchange(cls, exchange, capacity: float = 10, clock: Clock = None):
+        """Budget derived from ccxt's `rateLimit` (milliseconds between calls)."""
+        rate_limit_ms = getattr(exchange, 'rateLimit', None) or 100
+        return cls(1000.0 / rate_limit_ms, capacity, clock)
+
+    async def acquire(self, weight: float = 1):
+        async with self._lock:
+            while True:
+                now = self.clock.time()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                self.waits += 1
+                wait = (weight - self.tokens) / self.rate
+                RATE_LIMIT_WAITS.inc()
+                RATE_LIMIT_WAIT_SECONDS.inc(wait)
+                await self.clock.sleep(wait)
+
+
+class TradingScheduler:
+    """Drives fetch -> indicators -> signal -> execute for many symbols concurrently.
+
+    Each symbol runs as its own task that wakes just after its candle closes,
+    fetches only the candles it has not seen, and updates indicators
+    incrementally. All exchange calls draw from one shared RateLimiter.
+    """
+
+    def __init__(self, config: Config, strategy, executor, exchange=None, symbols=None,
+                 timeframe: str = None, history: int = 100, settle_seconds: float = 2.0,
+                 retry_seconds: float = 10.0, clock: Clock = None, predictor: Predictor = None,
+                 orders: 'OrderPipeline' = None, risk: RiskEngine = None):
+        self.config = config
+        self.strategy = strategy
+        self.executor = executor
+        self.exchange = exchange
+        self.symbols = symbols
+        self.timeframe = timeframe or config.data.timeframe
+        self.history = history
+        self.predictor = None
+        if predictor is not None:
+            # Symbols that close on the same tick share one inference batch
+            self.predictor = BatchingPredictor(predictor)
+            if predictor.has_lstm:
+                self.history = max(history, predictor.seq_length + config.strategy.sma_slow)
+        self.settle_seconds = settle_seconds
+        self.retry_seconds = retry_seconds
+        self.clock = clock or Clock()
+        self.indicators = IndicatorEngine(config.strategy)
+        self._recent = {}  # symbol -> last indicator rows, for rules that look back
+        self.store = CandleStore() if config.data.cache_enabled else None
+        self.limiter = None
+        # Live orders go through the async pipeline; paper trades stay on the executor
+        self.orders = orders
+        self._owns_exchange = exchange is None
+        self.risk = risk
+        # Live equity is read from the exchange balance once run() has connected
+        self._fund_risk = False
+        if risk is None and config.risk.enabled:
+            paper = config.trading.paper_trading
+            self.risk = RiskEngine(config, getattr(executor, 'paper_balance', 0.0) if paper else 0.0,
+                                   clock=self.clock, timeframe=self.timeframe)
+            self._fund_risk = not paper
+            ledger = getattr(executor, 'ledger', None)
+            if ledger is not None:
+                self.risk.restore(ledger.open_positions('paper' if paper else 'live'))
+        # Orders go through one worker thread: the executor's paper balance
+        # is not thread-safe and live order calls must not block the event loop.
+        self._order_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="orders")
+
+    async def run(self):
+        """Run until cancelled."""
+        if self.exchange is None:
+            import ccxt.async_support as ccxt_async
+            # The shared RateLimiter replaces ccxt's per-instance throttle
+            self.exchange = create_exchange(self.config, ccxt_async, enableRateLimit=False)
+        self.limiter = RateLimiter.for_exchange(self.exchange, clock=self.clock)
+        if self.orders is None and not self.config.trading.paper_trading:
+            from .orders import OrderPipeline
+            ledger = getattr(self.executor, 'ledger', None)
+            listeners = [c.on_order_update for c in (ledger, self.risk) if c is not None]
+
+            def on_update(order):
+                for listener in listeners:
+                    listener(order)
+            self.orders = OrderPipeline(self.exchange, limiter=self.limiter, clock=self.clock, on_update=on_update)
+        if self.orders is not None:
+            await self.orders.start()
+        try:
+            await load_markets_async(self.exchange, limiter=self.limiter,
+                                     ttl=self.config.data.markets_cache_hours * 3600)
+            pairs = self.symbols or self.config.data.pairs
+            symbols = [normalize_symbol(p, self.exchange) for p in pairs]
+            if self._fund_risk:
+                await self._fund_risk_engine(symbols)
+            logger.info(f"Scheduling {len(symbols)} symbols on {self.timeframe}")
+            await asyncio.gather(*(self._run_symbol(s) for s in symbols))
+        finally:
+            if self.orders is not None:
+                await self.orders.stop(timeout=self.retry_seconds)
+            self._order_pool.shutdown(wait=False)
+            if self._owns_exchange:
+                await self.exchange.close()
+
+    async def _fund_risk_engine(self, symbols: list):
+        """Seed the risk engine's cash with the account balance in the pairs' quote currency.
+
+        Risk limits are fractions of equity, so live trading does not start without it.
+        """
+        quotes = {self.exchange.markets[s]['quote'] for s in symbols if s in self.exchange.markets}
+        if len(quotes) != 1:
+            raise RuntimeError(f"Risk limits need every pair in one quote currency, got {sorted(quotes)}")
+        quote = quotes.pop()
+        await self.limiter.acquire()
+        API_CALLS.inc(method='fetch_balance')
+        try:
+            balance = await self.exchange.fetch_balance()
+        except Exception as e:
+            raise RuntimeError(f"Cannot read the {quote} balance for risk limits: {e}") from e
+        total = (balance.get('total') or {}).get(quote)
+        if total is None:
+            raise RuntimeError(f"Exchange balance has no {quote}; cannot size risk limits")
+        self.risk.fund(float(total))
+        logger.info(f"Risk engine funded with {total} {quote}, equity {self.risk.equity():.2f}")
+
+    def _timeframe_seconds(self) -> int:
+        return self.exchange.parse_timeframe(self.timeframe)
+
+    def _next_close(self, now: float) -> float:
+        tf = self._timeframe_seconds()
+        return (int(now // tf) + 1) * tf
+
+    async def _fetch(self, symbol: str, since: int = None, limit: int = None):
+        await self.limiter.acquire()
+        API_CALLS.inc(method='fetch_ohlcv')
+        with timed('fetch_ohlcv'):
+            ohlcv = await self.exchange.fetch_ohlcv(symbol, self.timeframe, since=since, limit=limit)
+        if self.store is not None and ohlcv:
+            self.store.write(self.exchange.id, symbol, self.timeframe, ohlcv)
+        return ohlcv
+
+    def _closed(self, ohlcv, now: float):
+        """Drop the still-forming candle so signals only fire on closed ones."""
+        tf_ms = self._timeframe_seconds() * 1000
+        now_ms = now * 1000
+        return [row for row in ohlcv if row[0] + tf_ms <= now_ms]
+
+    async def _run_symbol(self, symbol: str):
+        tf = self._timeframe_seconds()
+        since = None
+        limit = self.history
+        while True:
+            now = self.clock.time()
+            try:
+                ohlcv = self._closed(await self._fetch(symbol, since=since, limit=limit), now)
+                if ohlcv:
+                    await self.process(symbol, ohlcv, ohlcv[-1][0] / 1000 + tf)
+                    since = ohlcv[-1][0] + 1
+                    limit = None
+                # Exchanges can publish a closed candle slightly late: poll again
+                # shortly instead of waiting a whole timeframe for it.
+                latest_closed_ms = (int(now // tf) - 1) * tf * 1000
+                if since is None or since <= latest_closed_ms:
+                    delay = self.settle_seconds
+                else:
+                    delay = self._next_close(now) + self.settle_seconds - self.clock.time()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error processing {symbol}: {e}")
+                delay = self.retry_seconds
+            await self.clock.sleep(delay)
+
+    async def process(self, symbol: str, ohlcv, close_time: float):
+        """Run risk exits, indicators, signals and execution for newly closed candles."""
+        if self.risk is not None:
+            for row in ohlcv:
+                self.risk.update(symbol, row[4])
+            for stop in self.risk.evaluate():
+                logger.warning(f"{stop['symbol']}: {stop['reason']} at {stop['price']}, closing {stop['amount']}")
+                if await self._execute(stop['symbol'], stop['side'], stop['amount'],
+                                       f"{stop['reason']}-{int(close_time)}") is None:
+                    self.risk.clear_exit(stop['symbol'])
+
+        df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        with timed('indicators_incremental'):
+            df = self.indicators.update(symbol, self.timeframe, df)
+        if df is None or df.empty:
+            return None
+
+        prediction = None
+        if self.predictor is not None:
+            prediction = await self.predictor.predict(symbol, df)
+        df = self._with_history(symbol, df)
+        ai_predictions = xgb_probabilities = None
+        if prediction is not None:
+            ai_predictions = Predictor.as_series(df, prediction, 'lstm')
+            xgb_probabilities = Predictor.as_series(df, prediction, 'xgb')
+
+        with timed('generate_signals'):
+            latest_signal = self.strategy.latest_signal(df, ai_predictions, xgb_probabilities)
+            shadow = self.strategy.shadow_signals(df, ai_predictions, xgb_probabilities)
+        for name, signal in shadow.items():
+            if signal != 0:
+                SHADOW_SIGNALS.inc(strategy=name, side='buy' if signal == 1 else 'sell')
+                logger.debug(f"{symbol}: shadow strategy {name} signals {signal}")
+        if latest_signal == 0:
+            return None
+
+        price = df['close'].iloc[-1]
+        side = 'buy' if latest_signal == 1 else 'sell'
+        if self.risk is not None:
+            amount = self.risk.position_size(symbol, price)
+            if not self.risk.allow(symbol, side, amount, price)[0]:
+                return None
+        else:
+            amount = self.strategy.calculate_position_size(self.executor.paper_balance, price)
+        # Keyed on the candle so a re-processed candle cannot double-submit
+        result = await self._execute(symbol, side, amount, int(close_time))
+        if result is None:
+            return None
+        latency = self.clock.time() - close_time
+        TICK_TO_ORDER_SECONDS.observe(latency, symbol=symbol)
+        action = 'submitted' if self.orders is not None else 'executed'
+        logger.info(f"{symbol}: signal {latest_signal} {action} {latency * 1000:.0f} ms after candle close")
+        return result
+
+    def _with_history(self, symbol: str, df: pd.DataFrame) -> pd.DataFrame:
+        """`df` behind the indicator rows of earlier ticks the rules still read (e.g. shift(1)).
+
+        IndicatorEngine.update only returns new candles, usually one per tick.
+        """
+        keep = self.strategy.lookback(ai=self.predictor is not None) + 1
+        recent = self._recent.get(symbol)
+        if recent is not None and len(df) < keep:
+            # A revised latest candle replaces its earlier version
+            recent = recent[recent['timestamp'] < df['timestamp'].iloc[0]]
+            df = pd.concat([recent, df], ignore_index=True)
+        self._recent[symbol] = df.iloc[-keep:]
+        return df
+
+    async def _execute(self, symbol: str, side: str, amount: float, key):
+        """Send an order through the pipeline (live) or the executor (paper)."""
+        if self.orders is not None:
+            if self.orders.busy(symbol):
+                logger.info(f"{symbol}: {side} skipped, previous order still working")
+                return None
+            return self.orders.submit(symbol, side, amount, key=key)
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            self._order_pool, self.executor.execute_trade, symbol, 1 if side == 'buy' else -1, amount)
+        if self.risk is not None:
+            self.risk.on_trade_result(symbol, side, result)
+        return result
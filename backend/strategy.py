@@ -1,44 +1,80 @@
+import copy
 import pandas as pd
 import numpy as np
 import logging
 from .config import Config
+from .metrics import timed
+from .risk import position_size
+from .rules import RuleSet, default_rule, shadow_rules
 
 logger = logging.getLogger(__name__)
 
 class Strategy:
-    """Trading strategy logic."""
-    
+    """Trading strategy logic.
+
+    Signals come from the default rule (rules.TECHNICAL_BUY/SELL, plus the
+    AI confirmation when predictions are given), compiled once per set of
+    StrategyConfig thresholds. Shadow variants run through one shared
+    RuleSet so they cost a few comparisons per tick.
+    """
+
     def __init__(self, config: Config):
         self.config = config
-        
-    def generate_signals(self, df: pd.DataFrame, ai_predictions=None):
-        """Generate buy/sell signals based on technicals and AI."""
-        signals = pd.DataFrame(index=df.index)
-        signals['signal'] = 0 # 0: Neutral, 1: Buy, -1: Sell
-        
-        # Technical Logic (e.g., RSI)
-        rsi_buy = df['rsi'] < 30
-        rsi_sell = df['rsi'] > 70
-        
-        # MACD Logic
-        macd_buy = df['macd'] > df['signal_line']
-        macd_sell = df['macd'] < df['signal_line']
-        
-        # Combine Technicals
-        signals.loc[rsi_buy & macd_buy, 'signal'] = 1
-        signals.loc[rsi_sell & macd_sell, 'signal'] = -1
-        
-        # AI Overlay (if available)
+        self._compiled = {}
+
+    def rules(self, ai: bool = False, shadow: bool = False, xgb: bool = False) -> RuleSet:
+        """The compiled live (or shadow) RuleSet for the current thresholds."""
+        params = self.config.strategy
+        compiled = self._compiled.get((ai, xgb, shadow))
+        # Recompile when the thresholds were changed (e.g. through Config.update)
+        if compiled is None or compiled[0] != vars(params):
+            rules = shadow_rules(params, ai, xgb) if shadow else [default_rule(params, ai=ai, xgb=xgb)]
+            compiled = self._compiled[(ai, xgb, shadow)] = (copy.deepcopy(vars(params)), RuleSet(rules))
+        return compiled[1]
+
+    def lookback(self, ai: bool = False, xgb: bool = False) -> int:
+        """Candles before the latest one that latest_signal/shadow_signals read."""
+        lookback = self.rules(ai, xgb=xgb).lookback
+        if self.config.strategy.shadow_variants:
+            lookback = max(lookback, self.rules(ai, shadow=True, xgb=xgb).lookback)
+        return lookback
+
+    @staticmethod
+    def _fields(df: pd.DataFrame, ruleset: RuleSet, ai_predictions=None, xgb_probabilities=None) -> dict:
+        fields = {c: df[c].to_numpy() for c in ruleset.columns if c not in ('ai_prediction', 'xgb_probability')}
         if ai_predictions is not None:
-            # For example, only buy if AI also predicts price increase
-            # This is a simplified logic
-            ai_buy = ai_predictions > df['close'].shift(1)
-            signals.loc[signals['signal'] == 1 & ~ai_buy, 'signal'] = 0
-            
-        return signals
+            fields['ai_prediction'] = np.asarray(ai_predictions, dtype=np.float64)
+        if xgb_probabilities is not None:
+            fields['xgb_probability'] = np.asarray(xgb_probabilities, dtype=np.float64)
+        return fields
+
+    def _ruleset(self, ai_predictions, xgb_probabilities, shadow: bool = False) -> RuleSet:
+        return self.rules(ai=ai_predictions is not None, shadow=shadow, xgb=xgb_probabilities is not None)
+
+    @timed('generate_signals')
+    def generate_signals(self, df: pd.DataFrame, ai_predictions=None, xgb_probabilities=None):
+        """Generate buy/sell signals based on technicals and AI.
+
+        `ai_predictions` are LSTM next-close predictions, `xgb_probabilities`
+        XGBoost up-move probabilities; either confirms buys when given.
+        """
+        ruleset = self._ruleset(ai_predictions, xgb_probabilities)
+        signal = ruleset.evaluate(self._fields(df, ruleset, ai_predictions, xgb_probabilities))['default']
+        # 0: Neutral, 1: Buy, -1: Sell
+        return pd.DataFrame({'signal': signal.astype(np.int64)}, index=df.index)
+
+    def latest_signal(self, df: pd.DataFrame, ai_predictions=None, xgb_probabilities=None) -> int:
+        """Signal of the last candle only, as the live loop needs."""
+        ruleset = self._ruleset(ai_predictions, xgb_probabilities)
+        return ruleset.evaluate_latest(self._fields(df, ruleset, ai_predictions, xgb_probabilities))['default']
+
+    def shadow_signals(self, df: pd.DataFrame, ai_predictions=None, xgb_probabilities=None) -> dict:
+        """{variant: latest signal} for StrategyConfig.shadow_variants."""
+        if not self.config.strategy.shadow_variants:
+            return {}
+        ruleset = self._ruleset(ai_predictions, xgb_probabilities, shadow=True)
+        return ruleset.evaluate_latest(self._fields(df, ruleset, ai_predictions, xgb_probabilities))
 
     def calculate_position_size(self, balance: float, price: float):
         """Calculate amount to trade based on risk config."""
-        risk_amount = balance * self.config.risk.max_risk_per_trade
-        position_size = risk_amount / price # Simplified
-        return position_size
+        return position_size(self.config, balance, price)
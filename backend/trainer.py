@@ -1,16 +1,102 @@
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torch.utils.data import DataLoader, TensorDataset
+from torch.utils.data import BatchSampler, DataLoader, Dataset, RandomSampler
 import pandas as pd
 import numpy as np
 import logging
+import multiprocessing as mp
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from .config import Config
+from .features import FeatureMatrix
+from .indicators import INDICATOR_COLUMNS
 from .models import ModelFactory
+from .registry import ModelRegistry, lstm_model_name, slug
 
 logger = logging.getLogger(__name__)
 
+class SlidingWindowDataset(Dataset):
+    """LSTM sequences served as strided views over one contiguous buffer.
+
+    `features` is a (time, n_features) float32 tensor; sample i is the window
+    features[i:i+seq_length] with target[i+seq_length] as label. No window is
+    ever materialised: indexing with a list of indices gathers a whole batch
+    in one operation.
+    """
+
+    def __init__(self, features: torch.Tensor, target: torch.Tensor, seq_length: int):
+        if not features.is_contiguous():
+            features = features.contiguous()
+        self.features = features
+        self.seq_length = seq_length
+        n, n_features = features.shape
+        if n <= seq_length:
+            raise ValueError(f"Need more than seq_length={seq_length} rows for a training window, got {n}")
+        self.windows = features.as_strided((n - seq_length, seq_length, n_features),
+                                           (n_features, n_features, 1))
+        self.targets_buffer = target
+        self.targets = target[seq_length:]
+
+    def __len__(self):
+        return len(self.windows)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, list):
+            idx = torch.as_tensor(idx)
+        return self.windows[idx], self.targets[idx]
+
+    def split(self, holdout: float):
+        """Chronological (train, validation) datasets sharing this buffer."""
+        n_val = int(len(self) * holdout)
+        n_train = len(self) - n_val
+        train = SlidingWindowDataset(self.features[:n_train + self.seq_length],
+                                     self.targets_buffer[:n_train + self.seq_length], self.seq_length)
+        if n_val == 0:
+            return train, None
+        val = SlidingWindowDataset(self.features[n_train:], self.targets_buffer[n_train:], self.seq_length)
+        return train, val
+
+    def loader(self, batch_size: int = 32, shuffle: bool = True) -> DataLoader:
+        """DataLoader yielding whole batches gathered straight from the buffer."""
+        sampler = RandomSampler(self) if shuffle else range(len(self))
+        return DataLoader(self, sampler=BatchSampler(sampler, batch_size, drop_last=False), batch_size=None)
+
+
+def to_millis(value) -> int:
+    """Epoch milliseconds from a datetime-like or an integer millisecond timestamp."""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return int(pd.Timestamp(value).value // 1_000_000)
+
+
+def reference_stats(df: pd.DataFrame, feature_cols: list, window: int) -> dict:
+    """Mean/std of the last `window` rows, stored with a model as its drift reference.
+
+    'reference_until' (epoch ms of the last of those rows) lets drift checks
+    compare only candles after the reference window.
+    """
+    values = df[feature_cols].tail(window).to_numpy(dtype=np.float64)
+    stats = {'reference_mean': values.mean(axis=0).tolist(), 'reference_std': values.std(axis=0).tolist()}
+    if 'timestamp' in df and len(df):
+        stats['reference_until'] = to_millis(df['timestamp'].iloc[-1])
+    return stats
+
+
+def _init_training_worker(threads: int):
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+
+
+def _train_symbol(config: Config, symbol: str, df: pd.DataFrame, feature_cols: list, checkpoint: str) -> dict:
+    trainer = ModelTrainer(config)
+    model = trainer.train_lstm(df, feature_cols=feature_cols, checkpoint=checkpoint)
+    return {'model': model.cpu(), 'mean': trainer.mean, 'std': trainer.std, 'feature_cols': trainer.feature_cols,
+            'val_loss': trainer.best_loss, 'epochs': trainer.epochs_trained,
+            'trained_until': to_millis(df['timestamp'].iloc[-1]),
+            'reference': reference_stats(df, trainer.feature_cols, config.model.replay_window)}
+
+
 class ModelTrainer:
     """Trainer for the AI models."""
     
@@ -18,34 +104,66 @@ class ModelTrainer:
         self.config = config
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         
-    def prepare_data(self, df: pd.DataFrame, target_col: str = 'close'):
-        """Prepare sequences for LSTM training."""
-        data = df.filter([target_col]).values
-        # Simple normalization
-        self.mean = data.mean()
-        self.std = data.std()
-        normalized_data = (data - self.mean) / self.std
-        
-        X, y = [], []
-        seq_length = 60 # Look back 60 candles
-        for i in range(len(normalized_data) - seq_length):
-            X.append(normalized_data[i:i+seq_length])
-            y.append(normalized_data[i+seq_length])
-            
-        return torch.FloatTensor(np.array(X)), torch.FloatTensor(np.array(y))
-
-    def train_lstm(self, df: pd.DataFrame):
-        """Train the LSTM model."""
-        X, y = self.prepare_data(df)
-        dataset = TensorDataset(X, y)
-        loader = DataLoader(dataset, batch_size=32, shuffle=True)
-        
-        model = ModelFactory.get_model('lstm', input_dim=1).to(self.device)
+    def prepare_data(self, df: pd.DataFrame, target_col: str = 'close', feature_cols: list = None,
+                     seq_length: int = None, stats: tuple = None) -> SlidingWindowDataset:
+        """Prepare sequences for LSTM training.
+
+        Features are normalised per column into a single float32 buffer; the
+        returned dataset exposes X as `dataset.windows` and y as `dataset.targets`.
+        Pass `stats=(mean, std)` to reuse an existing model's normalisation.
+        """
+        feature_cols = list(feature_cols or [target_col])
+        if target_col not in feature_cols:
+            feature_cols.append(target_col)
+        data = df[feature_cols].to_numpy(dtype=np.float32)
+        if stats is not None:
+            self.mean = np.asarray(stats[0], dtype=np.float32)
+            self.std = np.asarray(stats[1], dtype=np.float32)
+        else:
+            # Simple normalization
+            self.mean = data.mean(axis=0)
+            self.std = data.std(axis=0)
+            self.std[self.std == 0] = 1.0
+        self.feature_cols = feature_cols
+        normalized_data = torch.from_numpy(np.ascontiguousarray((data - self.mean) / self.std))
+
+        seq_length = seq_length or self.config.model.lstm_lookback
+        target_idx = feature_cols.index(target_col)
+        return SlidingWindowDataset(normalized_data, normalized_data[:, target_idx:target_idx + 1], seq_length)
+
+    def train_lstm(self, df: pd.DataFrame, feature_cols: list = None, checkpoint: str = None):
+        """Train the LSTM model.
+
+        The last ModelConfig.test_size of the windows is held out for
+        validation; training stops after `early_stopping_patience` epochs
+        without improvement and the best weights are returned. With
+        `checkpoint`, state is saved after every epoch and an interrupted run
+        resumes from it.
+        """
+        cfg = self.config.model
+        dataset = self.prepare_data(df, feature_cols=feature_cols)
+        train_set, val_set = dataset.split(cfg.test_size)
+        loader = train_set.loader(batch_size=cfg.batch_size, shuffle=True)
+
+        model = ModelFactory.get_model('lstm', input_dim=len(self.feature_cols)).to(self.device)
         criterion = nn.MSELoss()
         optimizer = optim.Adam(model.parameters(), lr=0.001)
-        
-        model.train()
-        for epoch in range(10): # Example epochs
+        state = {'epoch': 0, 'best_loss': float('inf'), 'best_state': None, 'bad_epochs': 0, 'finished': False}
+        # Identifies the training data so a checkpoint is only resumed on the same run
+        signature = [len(dataset)] + np.concatenate([self.mean, self.std]).tolist()
+
+        if checkpoint and os.path.exists(checkpoint):
+            saved = torch.load(checkpoint, map_location=self.device, weights_only=False)
+            if saved['feature_cols'] == self.feature_cols and saved.get('signature') == signature:
+                model.load_state_dict(saved['model'])
+                optimizer.load_state_dict(saved['optimizer'])
+                state = saved['state']
+                logger.info(f"Resuming from {checkpoint} after epoch {state['epoch']}")
+            else:
+                logger.warning(f"Ignoring checkpoint {checkpoint}: training data changed")
+
+        while not state['finished'] and state['epoch'] < cfg.epochs:
+            model.train()
             total_loss = 0
             for batch_X, batch_y in loader:
                 batch_X, batch_y = batch_X.to(self.device), batch_y.to(self.device)
@@ -55,8 +173,147 @@ class ModelTrainer:
                 loss.backward()
                 optimizer.step()
                 total_loss += loss.item()
-            logger.info(f"Epoch {epoch+1}, Loss: {total_loss/len(loader)}")
-            
+            state['epoch'] += 1
+            train_loss = total_loss / len(loader)
+            val_loss = self._evaluate(model, val_set, criterion) if val_set is not None else train_loss
+            logger.info(f"Epoch {state['epoch']}, Loss: {train_loss:.6f}, Val loss: {val_loss:.6f}")
+
+            if val_loss < state['best_loss']:
+                state['best_loss'] = val_loss
+                state['best_state'] = {k: v.detach().clone() for k, v in model.state_dict().items()}
+                state['bad_epochs'] = 0
+            else:
+                state['bad_epochs'] += 1
+                if state['bad_epochs'] >= cfg.early_stopping_patience:
+                    logger.info(f"Early stopping after epoch {state['epoch']}")
+                    state['finished'] = True
+            if checkpoint:
+                self._checkpoint(checkpoint, model, optimizer, state, signature)
+
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        if state['best_state'] is not None:
+            model.load_state_dict(state['best_state'])
+        self.best_loss = state['best_loss']
+        self.epochs_trained = state['epoch']
+        return model
+
+    def fine_tune_lstm(self, model, df: pd.DataFrame, feature_cols: list, mean, std,
+                       target_col: str = 'close'):
+        """Continue training a deployed LSTM on the most recent candles.
+
+        Uses the model's own scaler stats and a replay buffer of the last
+        ModelConfig.replay_window rows, at update_learning_rate for
+        update_epochs. Returns the model with (error before, error after) on
+        the newest test_size of the buffer in `self.update_loss`.
+        """
+        cfg = self.config.model
+        dataset = self.prepare_data(df.tail(cfg.replay_window), target_col, feature_cols, stats=(mean, std))
+        train_set, val_set = dataset.split(cfg.test_size)
+        criterion = nn.MSELoss()
+        model = model.to(self.device)
+        before = self._evaluate(model, val_set, criterion) if val_set is not None else None
+
+        optimizer = optim.Adam(model.parameters(), lr=cfg.update_learning_rate)
+        loader = train_set.loader(batch_size=cfg.batch_size, shuffle=True)
+        for epoch in range(cfg.update_epochs):
+            model.train()
+            for batch_X, batch_y in loader:
+                batch_X, batch_y = batch_X.to(self.device), batch_y.to(self.device)
+                optimizer.zero_grad()
+                loss = criterion(model(batch_X), batch_y)
+                loss.backward()
+                optimizer.step()
+        after = self._evaluate(model, val_set, criterion) if val_set is not None else None
+        self.update_loss = (before, after)
+        return model.eval()
+
+    def evaluate_lstm(self, model, df: pd.DataFrame, feature_cols: list, mean, std,
+                      target_col: str = 'close') -> float:
+        """Mean squared error of `model` on `df`, normalised with the model's own stats."""
+        dataset = self.prepare_data(df, target_col, feature_cols, stats=(mean, std))
+        return self._evaluate(model.to(self.device), dataset, nn.MSELoss())
+
+    def _evaluate(self, model, dataset: SlidingWindowDataset, criterion) -> float:
+        model.eval()
+        total, count = 0.0, 0
+        with torch.inference_mode():
+            for batch_X, batch_y in dataset.loader(batch_size=4096, shuffle=False):
+                batch_X, batch_y = batch_X.to(self.device), batch_y.to(self.device)
+                total += criterion(model(batch_X), batch_y).item() * len(batch_X)
+                count += len(batch_X)
+        return total / max(count, 1)
+
+    def _checkpoint(self, path: str, model, optimizer, state: dict, signature: list):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = f"{path}.tmp"
+        torch.save({'model': model.state_dict(), 'optimizer': optimizer.state_dict(), 'state': state,
+                    'feature_cols': self.feature_cols, 'signature': signature}, tmp)
+        os.replace(tmp, path)
+
+    def train_many(self, frames: dict, feature_cols: list = None, workers: int = None, threads: int = None,
+                   registry=None, resume: bool = True) -> dict:
+        """Train one LSTM per symbol concurrently in a process pool.
+
+        Cores are split between workers and each worker's torch intra-op
+        threads are pinned to its share, so processes do not oversubscribe
+        the CPU. Returns {symbol: {'model', 'mean', 'std', 'feature_cols',
+        'val_loss', 'epochs'}}; with `registry`, each model is also
+        registered as 'lstm-<symbol>'.
+        """
+        cfg = self.config.model
+        cores = os.cpu_count() or 1
+        workers = max(1, min(workers or cfg.training_workers or cores, len(frames)))
+        threads = threads or cfg.training_threads or max(1, cores // workers)
+        logger.info(f"Training {len(frames)} models on {workers} processes x {threads} threads")
+
+        results = {}
+        context = mp.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_training_worker,
+                                 initargs=(threads,)) as pool:
+            futures = {
+                pool.submit(_train_symbol, self.config, symbol, df, feature_cols,
+                            self._checkpoint_path(symbol) if resume else None): symbol
+                for symbol, df in frames.items()
+            }
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    results[symbol] = future.result()
+                except Exception as e:
+                    logger.error(f"Training {symbol} failed: {e}")
+                    continue
+                logger.info(f"{symbol}: val loss {results[symbol]['val_loss']:.6f} "
+                            f"after {results[symbol]['epochs']} epochs")
+                if registry is not None:
+                    r = results[symbol]
+                    registry.register_lstm(lstm_model_name(symbol), r['model'], r['feature_cols'], r['mean'],
+                                           r['std'], model_config=cfg,
+                                           metrics={'val_loss': r['val_loss'], 'trained_until': r['trained_until'],
+                                                    'update': 'full', **r['reference']})
+        return results
+
+    def _checkpoint_path(self, symbol: str) -> str:
+        return os.path.join(self.config.model.checkpoint_dir, f"lstm-{slug(symbol)}.pt")
+
+    def train_lstm_from_matrix(self, matrix: FeatureMatrix, symbol: str, feature_cols: list = None):
+        """Train the LSTM on one symbol's rows of an aligned FeatureMatrix."""
+        feature_cols = list(feature_cols or ['close'] + INDICATOR_COLUMNS)
+        return self.train_lstm(matrix.frame(symbol, feature_cols), feature_cols=feature_cols)
+
+    def train_xgboost(self, matrix: FeatureMatrix, feature_cols: list = None, horizon: int = 1):
+        """Train the XGBoost classifier on every symbol's rows of a FeatureMatrix.
+
+        Labels are whether close is higher `horizon` candles later.
+        """
+        feature_cols = list(feature_cols or INDICATOR_COLUMNS)
+        X, y = matrix.xgb_dataset(feature_cols, horizon)
+        logger.info(f"Training XGBoost on {len(X)} rows from {len(matrix.symbols)} symbols")
+        model = ModelFactory.get_model('xgboost')
+        model.train(X, y)
+        self.xgb_feature_cols = feature_cols
+        # Scale for drift checks on later updates
+        self.xgb_std = X.std(axis=0)
         return model
 
     def save_model(self, model, path: str):
@@ -64,3 +321,9 @@ class ModelTrainer:
         os.makedirs(os.path.dirname(path), exist_ok=True)
         torch.save(model.state_dict(), path)
         logger.info(f"Model saved to {path}")
+
+    def register_model(self, model, name: str, registry=None, metrics: dict = None) -> dict:
+        """Store the model in the registry with the scaler stats from prepare_data."""
+        registry = registry or ModelRegistry()
+        return registry.register_lstm(name, model, self.feature_cols, self.mean, self.std,
+                                      model_config=self.config.model, metrics=metrics)
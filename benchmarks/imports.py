@@ -0,0 +1,111 @@
+"""Import-time budget for the backend modules.
+
+    python benchmarks/imports.py                # check every module, exits 1 on a violation
+    python benchmarks/imports.py --scale 2      # double the time budgets on slow machines
+
+Each module is imported in a fresh interpreter from an empty working
+directory. The check fails when an import exceeds its time budget, loads a
+heavy dependency it should not need, or writes files (as a module-level
+Config() used to).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY = ('torch', 'xgboost', 'ccxt', 'scipy', 'sqlalchemy', 'streamlit', 'fastapi')
+
+# module -> (seconds, heavy modules it may load)
+BUDGETS = {
+    'backend': (0.05, ()),
+    'backend.config': (0.3, ()),
+    'backend.metrics': (0.3, ()),
+    'backend.indicators': (1.0, ()),
+    'backend.features': (1.0, ()),
+    'backend.strategy': (1.0, ()),
+    'backend.executor': (1.0, ()),
+    'backend.data_engine': (1.2, ()),
+    'backend.resample': (1.0, ()),
+    'backend.chart_feed': (1.2, ()),
+    'backend.predictor': (1.2, ()),
+    'backend.registry': (1.2, ()),
+    'backend.scheduler': (1.5, ()),
+    'backend.replay': (1.5, ()),
+    'backend.ledger': (1.5, ('sqlalchemy',)),
+    'backend.orders': (1.5, ('ccxt',)),
+    'backend.optimizer': (1.5, ()),
+    'main': (1.5, ()),
+}
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{'seconds': time.perf_counter() - start, 'modules': sorted(sys.modules)}}))
+"""
+
+
+def measure(module: str, repeat: int = 3) -> dict:
+    """Best-of-`repeat` import time of `module` and what it loaded and wrote."""
+    best = None
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory(prefix="imports-") as cwd:
+            env = {**os.environ, 'PYTHONPATH': str(ROOT)}
+            out = subprocess.run([sys.executable, '-c', _PROBE.format(module=module)], cwd=cwd, env=env,
+                                 capture_output=True, text=True, check=True).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            result['written'] = sorted(os.listdir(cwd))
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    best['heavy'] = sorted({m.split('.')[0] for m in best['modules']} & set(HEAVY))
+    return best
+
+
+def violations(module: str, result: dict, scale: float = 1.0) -> list:
+    """What a measure() result breaks of `module`'s budget."""
+    budget, allowed = BUDGETS[module]
+    budget *= scale
+    problems = []
+    if result['seconds'] > budget:
+        problems.append(f"{result['seconds']:.2f}s over {budget:.2f}s budget")
+    unexpected = [m for m in result['heavy'] if m not in allowed]
+    if unexpected:
+        problems.append(f"loads {', '.join(unexpected)}")
+    if result['written']:
+        problems.append(f"writes {', '.join(result['written'])}")
+    return problems
+
+
+def check(scale: float = 1.0, repeat: int = 3) -> list:
+    failures = []
+    print(f"{'module':<24} {'import':>9} {'budget':>9}  heavy")
+    for module, (budget, _) in BUDGETS.items():
+        result = measure(module, repeat)
+        budget *= scale
+        problems = violations(module, result, scale)
+        print(f"{module:<24} {result['seconds'] * 1000:>7.0f}ms {budget * 1000:>7.0f}ms  "
+              f"{', '.join(result['heavy']) or '-'}{'  FAIL: ' + '; '.join(problems) if problems else ''}")
+        if problems:
+            failures.append(module)
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=1.0, help="multiply every time budget")
+    parser.add_argument('--repeat', type=int, default=3, help="imports per module (best is kept)")
+    args = parser.parse_args(argv)
+    failures = check(args.scale, args.repeat)
+    if failures:
+        print(f"\n{len(failures)} module(s) over budget: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
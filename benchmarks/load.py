@@ -0,0 +1,155 @@
+"""Load test: run_trading_bot against a local ReplayExchange on an accelerated clock.
+
+    python benchmarks/load.py                            # 20 synthetic pairs, 1000x, paper trading
+    python benchmarks/load.py --symbols 100 --minutes 600
+    python benchmarks/load.py --live --fill volume       # orders through OrderPipeline, partial fills
+    python benchmarks/load.py --latency 0.05 --jitter 0.05 --error-rate 0.01
+    python benchmarks/load.py --csv BTC/USDT=btc.csv     # recorded candles instead of synthetic ones
+
+The bot runs unmodified (DataEngine, scheduler, executor, ledger, ticker
+stream) with no network. Replay data and injected latency/failures are
+seeded, so two runs of one build see the same market; wall-clock timings
+still vary with the machine. Reports how many candle closes the bot kept up
+with, per-stage wall timings and tick-to-order latency, and writes the
+report to benchmarks/results/load_<time>.json.
+
+Tick-to-order latency is in replay seconds from candle close, so it includes
+the scheduler's settle delay, injected latency and compute time multiplied
+by --speed: it shows whether the bot would keep up at that speed-up.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.synthetic import synthetic_frames
+
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+
+def _config(symbols: list, live: bool):
+    from backend.config import Config
+    workdir = tempfile.mkdtemp(prefix="load-")
+    config = Config(os.path.join(workdir, "config.yaml"))
+    config.data.pairs = symbols
+    config.data.timeframe = '1m'
+    config.data.cache_enabled = False
+    config.data.markets_cache_hours = 0
+    config.logging.metrics_enabled = False
+    config.trading.paper_trading = not live
+    config.trading.ledger_url = f"sqlite:///{os.path.join(workdir, 'ledger.db')}"
+    return config
+
+
+def _replay(args):
+    from backend.replay import FILL_MODELS, ReplayExchange
+    kwargs = dict(speed=args.speed, fill_model=FILL_MODELS[args.fill](), latency=args.latency,
+                  jitter=args.jitter, error_rate=args.error_rate, warmup=args.warmup, seed=args.seed)
+    if args.csv:
+        paths = dict(spec.split('=', 1) for spec in args.csv)
+        replay = ReplayExchange.from_csv(paths, **kwargs)
+    else:
+        frames = synthetic_frames(args.symbols, args.warmup + args.minutes, seed=args.seed,
+                                  volatility=args.volatility)
+        replay = ReplayExchange(frames, **kwargs)
+    return replay
+
+
+def _stage_report() -> dict:
+    from backend.metrics import STAGE_SECONDS
+    return {stage: {k: (v * 1000 if k != 'count' and v is not None else v) for k, v in s.items()}
+            for stage, s in STAGE_SECONDS.snapshot().items()}
+
+
+def _latency_report() -> dict:
+    """Tick-to-order quantiles of the slowest symbol."""
+    from backend.metrics import TICK_TO_ORDER_SECONDS
+    per_symbol = TICK_TO_ORDER_SECONDS.snapshot()
+    report = {'count': sum(s['count'] for s in per_symbol.values())}
+    for q in ('p50', 'p90', 'p99'):
+        report[q] = max((s[q] for s in per_symbol.values()), default=None)
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=20, help="synthetic pairs to trade")
+    parser.add_argument('--minutes', type=int, default=1000, help="replayed 1m candles per pair")
+    parser.add_argument('--volatility', type=float, default=0.0008,
+                        help="synthetic per-candle return stdev (the default, ~3%%/day at 1m, "
+                             "passes the risk volatility band)")
+    parser.add_argument('--warmup', type=int, default=200, help="candles of history before the replay starts")
+    parser.add_argument('--speed', type=float, default=1000.0, help="replay clock speed-up over real time")
+    parser.add_argument('--latency', type=float, default=0.0, help="injected latency per API call (replay s)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="mean extra exponential latency (replay s)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of API calls that time out")
+    parser.add_argument('--fill', choices=['immediate', 'volume'], default='immediate', help="fill model")
+    parser.add_argument('--live', action='store_true', help="live order path (OrderPipeline) against the replay")
+    parser.add_argument('--csv', nargs='*', metavar='SYMBOL=PATH', help="replay recorded candle files")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="report file (default benchmarks/results/load_<time>.json)")
+    args = parser.parse_args(argv)
+
+    from backend.metrics import API_CALLS
+    from backend.orders import ORDER_UPDATES
+    from main import run_trading_bot
+    # main configures INFO logging; per-trade lines would swamp the report
+    logging.getLogger().setLevel(logging.WARNING)
+
+    replay = _replay(args)
+    symbols = list(replay.candles)
+    config = _config(symbols, args.live)
+    started = time.perf_counter()
+    run_trading_bot(config, replay=replay)
+    wall = time.perf_counter() - started
+    # The bot rewinds the clock to the replay start once it is set up
+    replayed = min(replay.clock.time(), replay.end_time) - replay.clock.start
+
+    stages = _stage_report()
+    ticks = stages.get('indicators_incremental', {}).get('count', 0)
+    expected = len(symbols) * int(replayed // 60)
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'args': vars(args),
+        'wall_s': wall,
+        'replayed_s': replayed,
+        'candle_closes': expected,
+        'ticks_processed': ticks,
+        'ticks_per_s': ticks / wall if wall > 0 else None,
+        'tick_to_order_s': _latency_report(),
+        'stages_ms': stages,
+        'api_calls': API_CALLS.snapshot(),
+        'order_updates': ORDER_UPDATES.snapshot(),
+        'orders': len(replay.orders),
+    }
+
+    print(f"{len(symbols)} symbols, {replayed / 60:.0f} replay minutes in {wall:.1f}s wall ({args.speed:g}x)")
+    print(f"processed {ticks} of {expected} candle closes ({report['ticks_per_s'] or 0:,.0f}/s)")
+    latency = report['tick_to_order_s']
+    if latency['count']:
+        print(f"tick-to-order (replay s): p50 {latency['p50']:.2f}  p90 {latency['p90']:.2f}  "
+              f"p99 {latency['p99']:.2f}  (slowest symbol) over {latency['count']} orders")
+    print(f"\n{'stage':<24} {'count':>8} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10}")
+    for stage, s in sorted(stages.items()):
+        print(f"{stage:<24} {s['count']:>8} {s['p50']:>10.3f} {s['p90']:>10.3f} {s['p99']:>10.3f}")
+    print(f"\napi calls: {report['api_calls']}")
+    if report['order_updates']:
+        print(f"order updates: {report['order_updates']}")
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"load_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, default=str))
+    print(f"\nReport written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,357 @@
+"""Benchmark runner for the data, strategy, training and execution hot paths.
+
+    python benchmarks/run.py                       # full suite, writes benchmarks/results/<time>.json
+    python benchmarks/run.py --quick               # skip the largest cases
+    python benchmarks/run.py --only indicators     # cases whose name contains 'indicators'
+    python benchmarks/run.py --save-baseline       # also store the run as benchmarks/baseline.json
+    python benchmarks/run.py --threshold 0.15      # fail if a case is >15% slower than the baseline
+
+Every case runs on synthetic data, so results only depend on the code and the
+machine. Exits with status 1 when any case regresses past the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import SyntheticExchange, synthetic_frames, synthetic_ohlcv
+
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+BASELINE = ROOT / "benchmarks" / "baseline.json"
+
+CASES = []
+
+
+def case(name: str, repeat: int = 5, large: bool = False):
+    """Register a setup function returning (callable to time, items per call)."""
+    def register(setup):
+        CASES.append({'name': name, 'setup': setup, 'repeat': repeat, 'large': large})
+        return setup
+    return register
+
+
+def _config():
+    from backend.config import Config
+    # A fresh file keeps local user settings out of the numbers
+    config = Config(os.path.join(tempfile.mkdtemp(prefix="bench-"), "config.yaml"))
+    config.data.cache_enabled = False
+    return config
+
+
+def _indicator_case(rows: int):
+    def setup():
+        from backend.data_engine import DataEngine
+        engine = DataEngine(_config())
+        df = synthetic_ohlcv(rows)
+        return lambda: engine.add_technical_indicators(df), rows
+    return setup
+
+
+case('indicators_1k', repeat=50)(_indicator_case(1_000))
+case('indicators_100k', repeat=10)(_indicator_case(100_000))
+case('indicators_10m', repeat=2, large=True)(_indicator_case(10_000_000))
+
+
+@case('indicators_incremental_tick', repeat=5)
+def _incremental():
+    from backend.indicators import IndicatorEngine
+    df = synthetic_ohlcv(1_500)
+    history, ticks = df.iloc[:500], [df.iloc[i:i + 1] for i in range(500, 1_500)]
+
+    def run():
+        engine = IndicatorEngine()
+        engine.update('BTC/USDT', '1m', history)
+        for tick in ticks:
+            engine.update('BTC/USDT', '1m', tick)
+    return run, len(ticks)
+
+
+@case('feature_matrix_20x100k', repeat=3)
+def _feature_matrix():
+    from backend.features import FeatureMatrix
+    frames = synthetic_frames(20, 100_000)
+    return lambda: FeatureMatrix.from_frames(frames).compute_indicators(), 20 * 100_000
+
+
+@case('generate_signals_100k', repeat=10)
+def _signals():
+    from backend.data_engine import DataEngine
+    from backend.strategy import Strategy
+    config = _config()
+    df = DataEngine(config).add_technical_indicators(synthetic_ohlcv(100_000))
+    strategy = Strategy(config)
+    return lambda: strategy.generate_signals(df), len(df)
+
+
+@case('rules_40_variants_20x10k', repeat=5)
+def _rules():
+    from dataclasses import replace
+    from backend.features import FeatureMatrix
+    from backend.rules import RuleSet, default_rule
+    config = _config()
+    matrix = FeatureMatrix.from_frames(synthetic_frames(20, 10_000)).compute_indicators(config.strategy)
+    rules = RuleSet([default_rule(replace(config.strategy, rsi_oversold=20 + i, rsi_overbought=80 - i), f"v{i}")
+                     for i in range(40)])
+    return lambda: rules.evaluate(matrix), 40 * 20 * 10_000
+
+
+@case('backtest_100k', repeat=5)
+def _backtest():
+    from backend.backtest import Backtester
+    from backend.strategy import Strategy
+    config = _config()
+    backtester = Backtester(config, Strategy(config))
+    df = backtester.prepare(synthetic_ohlcv(100_000))
+    return lambda: backtester.run(df, 'BTC/USDT'), len(df)
+
+
+@case('lstm_prepare_data_100k', repeat=5)
+def _prepare_data():
+    from backend.indicators import INDICATOR_COLUMNS
+    from backend.trainer import ModelTrainer
+    from backend.data_engine import DataEngine
+    config = _config()
+    df = DataEngine(config).add_technical_indicators(synthetic_ohlcv(100_000))
+    trainer = ModelTrainer(config)
+    features = ['close'] + INDICATOR_COLUMNS
+    return lambda: trainer.prepare_data(df, feature_cols=features), len(df)
+
+
+@case('lstm_epoch_10k', repeat=3)
+def _lstm_epoch():
+    import torch
+    import torch.nn as nn
+    from backend.data_engine import DataEngine
+    from backend.indicators import INDICATOR_COLUMNS
+    from backend.models import ModelFactory
+    from backend.trainer import ModelTrainer
+    config = _config()
+    df = DataEngine(config).add_technical_indicators(synthetic_ohlcv(10_000))
+    trainer = ModelTrainer(config)
+    torch.manual_seed(0)
+    trainer.device = torch.device('cpu')
+
+    def run():
+        dataset = trainer.prepare_data(df, feature_cols=['close'] + INDICATOR_COLUMNS)
+        model = ModelFactory.get_model('lstm', input_dim=len(trainer.feature_cols))
+        optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
+        criterion = nn.MSELoss()
+        model.train()
+        for batch_X, batch_y in dataset.loader(batch_size=32, shuffle=True):
+            optimizer.zero_grad()
+            loss = criterion(model(batch_X), batch_y)
+            loss.backward()
+            optimizer.step()
+        return dataset
+    return run, len(df)
+
+
+def _xgb_data(rows: int):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(rows, 8)).astype(np.float32)
+    y = (X[:, 0] + 0.5 * X[:, 1] + rng.normal(0, 0.5, rows) > 0).astype(np.int8)
+    return X, y
+
+
+@case('xgboost_train_50k', repeat=3)
+def _xgb_train():
+    from backend.models import XGBoostModel
+    X, y = _xgb_data(50_000)
+    return lambda: XGBoostModel().train(X, y), len(X)
+
+
+@case('xgboost_predict_50k', repeat=10)
+def _xgb_predict():
+    from backend.models import XGBoostModel
+    X, y = _xgb_data(50_000)
+    model = XGBoostModel()
+    model.train(X, y)
+    return lambda: model.predict(X), len(X)
+
+
+@case('xgboost_predict_row', repeat=5)
+def _xgb_predict_row():
+    from backend.models import XGBoostModel
+    X, y = _xgb_data(5_000)
+    model = XGBoostModel()
+    model.train(X, y)
+    rows = [X[i:i + 1] for i in range(1_000)]
+
+    def run():
+        for row in rows:
+            model.predict(row)
+    return run, len(rows)
+
+
+@case('executor_simulated_orders', repeat=5)
+def _executor():
+    from backend.executor import ExecutionEngine
+    from backend.market_data import MarketDataHub
+    config = _config()
+    config.trading.paper_trading = True
+    exchange = SyntheticExchange()
+    hub = MarketDataHub(exchange, ttl=3600)
+    n = 10_000
+
+    def run():
+        executor = ExecutionEngine(config, exchange, hub)
+        executor.paper_balance = 1e12
+        for i in range(n):
+            executor.execute_trade('BTC/USDT', 1 if i % 2 == 0 else -1, 0.01)
+    return run, n
+
+
+@case('risk_evaluate_500_positions', repeat=5)
+def _risk():
+    from backend.risk import RiskEngine
+    config = _config()
+    rng = np.random.default_rng(0)
+    symbols = [f"SYM{i}/USDT" for i in range(500)]
+    risk = RiskEngine(config, balance=1e9)
+    for symbol in symbols:
+        risk.update(symbol, 100.0)
+        risk.on_fill(symbol, 'buy', 1.0, 100.0)
+    ticks = [dict(zip(symbols, 100.0 * (1 + rng.normal(0, 0.005, len(symbols))))) for _ in range(100)]
+
+    def run():
+        for prices in ticks:
+            risk.evaluate(prices)
+            risk.allow(symbols[0], 'buy', 0.1, 100.0)
+    return run, len(ticks)
+
+
+@case('resample_1m_tick_5_timeframes', repeat=5)
+def _resample():
+    from backend.resample import Resampler
+    df = synthetic_ohlcv(11_440)
+    ms = df['timestamp'].to_numpy(dtype='datetime64[ms]').astype(np.int64)
+    rows = df.assign(timestamp=ms).to_numpy(dtype=np.float64)
+    # Ticks as the raw ccxt rows a stream delivers
+    history, ticks = df.iloc[:1_440], [rows[i:i + 1] for i in range(1_440, len(rows))]
+
+    def run():
+        resampler = Resampler('1m', ['5m', '15m', '1h', '4h', '1d'])
+        resampler.ingest('BTC/USDT', history)
+        for tick in ticks:
+            resampler.ingest('BTC/USDT', tick)
+    return run, len(ticks)
+
+
+def _time(fn, repeat: int) -> list:
+    fn()  # warm-up: caches, lazy imports, allocator
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _environment() -> dict:
+    env = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+    try:
+        env['commit'] = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       capture_output=True, text=True).stdout.strip()
+    except OSError:
+        pass
+    return env
+
+
+def run_cases(only: str = None, quick: bool = False, repeat_scale: float = 1.0) -> dict:
+    results = {}
+    for spec in CASES:
+        if only and only not in spec['name']:
+            continue
+        if quick and spec['large']:
+            continue
+        fn, items = spec['setup']()
+        samples = _time(fn, max(1, int(spec['repeat'] * repeat_scale)))
+        median = statistics.median(samples)
+        results[spec['name']] = {
+            'median_s': median,
+            'min_s': min(samples),
+            'repeat': len(samples),
+            'items': items,
+            'items_per_s': items / median if median > 0 else None,
+        }
+        print(f"{spec['name']:<32} {median * 1000:>10.2f} ms  {items / median:>14,.0f} items/s")
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Cases whose median is more than `threshold` slower than the baseline."""
+    regressions = []
+    print(f"\n{'case':<32} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, current in results.items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            continue
+        change = current['median_s'] / base['median_s'] - 1
+        flag = '  REGRESSION' if change > threshold else ''
+        print(f"{name:<32} {base['median_s'] * 1000:>10.2f}ms {current['median_s'] * 1000:>10.2f}ms "
+              f"{change:>+7.1%}{flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', help="run cases whose name contains this string")
+    parser.add_argument('--quick', action='store_true', help="skip the largest cases")
+    parser.add_argument('--repeat-scale', type=float, default=1.0, help="multiply every case's repeat count")
+    parser.add_argument('--threads', type=int, default=1, help="torch intra-op threads")
+    parser.add_argument('--output', help="result file (default benchmarks/results/<time>.json)")
+    parser.add_argument('--baseline', default=str(BASELINE), help="baseline file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="allowed slowdown before failing")
+    parser.add_argument('--save-baseline', action='store_true', help="store this run as the baseline")
+    args = parser.parse_args(argv)
+
+    import torch
+    torch.set_num_threads(args.threads)
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': {**_environment(), 'torch_threads': args.threads},
+        'results': run_cases(args.only, args.quick, args.repeat_scale),
+    }
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults written to {output}")
+
+    regressions = []
+    baseline_path = Path(args.baseline)
+    if baseline_path.exists():
+        regressions = compare(report['results'], json.loads(baseline_path.read_text()), args.threshold)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(report, indent=2))
+        print(f"Baseline written to {baseline_path}")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,63 +1,102 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
 from datetime import datetime
+import logging
 import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from backend.config import Config
-from backend.data_engine import DataEngine
+from backend.data_engine import DataEngine, normalize_symbol
 from backend.strategy import Strategy
+from backend.chart_feed import DashboardService
+from backend.ledger import Ledger
+from dashboard.charts import build_figure, extend_figure
+
+logger = logging.getLogger(__name__)
 
 st.set_page_config(page_title="AI Crypto Trader", layout="wide")
 
+
+@st.cache_resource
+def get_services(exchange_id: str):
+    """Config, data service and strategy, built once per exchange and shared by all sessions."""
+    config = Config()
+    config.trading.exchange_id = exchange_id
+    data_engine = DataEngine(config)
+    data_engine.load_markets()
+    if config.data.stream_tickers:
+        try:
+            data_engine.market_data.start([normalize_symbol(p, data_engine.exchange) for p in config.data.pairs])
+        except Exception as e:
+            logger.warning(f"Ticker streaming unavailable, using REST polling: {e}")
+    service = DashboardService(data_engine, refresh_seconds=config.data.dashboard_refresh_seconds,
+                               base_timeframe=config.data.base_timeframe)
+    return config, service, Strategy(config)
+
+
+@st.cache_resource
+def get_ledger(url: str) -> Ledger:
+    return Ledger(url)
+
+
+def render_positions(ledger: Ledger, service: DashboardService):
+    summary = ledger.pnl_summary(service.price)
+    if summary.empty:
+        st.info("No trades recorded yet.")
+        return
+    st.dataframe(summary[['mode', 'symbol', 'amount', 'avg_price', 'price', 'unrealized_pnl', 'realized_pnl',
+                          'fees', 'trades']], use_container_width=True, hide_index=True)
+    st.metric("Total PnL", f"${summary['realized_pnl'].sum() + summary['unrealized_pnl'].fillna(0).sum():,.2f}")
+
+
+def render_chart(df: pd.DataFrame, key: tuple, version: int, max_points: int):
+    """Keep the figure in session state and only append what changed since it was drawn."""
+    chart = st.session_state.get('chart')
+    last = df['timestamp'].iloc[-1]
+    if chart is None or chart['key'] != key or df['timestamp'].iloc[0] > chart['last']:
+        chart = st.session_state['chart'] = {'key': key, 'fig': build_figure(df), 'last': last, 'version': version}
+    elif version != chart['version']:
+        extend_figure(chart['fig'], df[df['timestamp'] >= chart['last']], max_points)
+        chart['last'] = last
+        chart['version'] = version
+    st.plotly_chart(chart['fig'], use_container_width=True)
+
+
 def main():
     st.title("🚀 AI-Driven Crypto Trading Dashboard")
-    
+
     st.sidebar.header("Settings")
     exchange = st.sidebar.selectbox("Exchange", ["binance", "coinbase"])
     symbol = st.sidebar.text_input("Symbol", "BTC/USDT")
     timeframe = st.sidebar.selectbox("Timeframe", ["1m", "5m", "15m", "1h", "4h", "1d"])
-    
-    config = Config() 
-    data_engine = DataEngine(config)
-    strategy = Strategy(config)
-    
+
+    config, service, strategy = get_services(exchange)
+
     col1, col2 = st.columns([3, 1])
-    
+
     with col1:
         st.subheader(f"Market Data: {symbol}")
-        df = data_engine.fetch_ohlcv(symbol, timeframe)
-        if df is not None:
-            df = data_engine.add_technical_indicators(df)
-            
-            fig = go.Figure(data=[go.Candlestick(x=df['timestamp'],
-                            open=df['open'], high=df['high'],
-                            low=df['low'], close=df['close'], name='Price')])
-            
-            fig.add_trace(go.Scatter(x=df['timestamp'], y=df['sma_20'], name='SMA 20', line=dict(color='orange')))
-            fig.add_trace(go.Scatter(x=df['timestamp'], y=df['bb_upper'], name='BB Upper', line=dict(dash='dash', color='gray')))
-            fig.add_trace(go.Scatter(x=df['timestamp'], y=df['bb_lower'], name='BB Lower', line=dict(dash='dash', color='gray')))
-            
-            st.plotly_chart(fig, use_container_width=True)
-            
+        feed = service.feed(symbol, timeframe)
+        df = feed.get()
+        if df is not None and not df.empty:
+            render_chart(df, (exchange, symbol, timeframe), feed.version, service.limit)
+
     with col2:
         st.subheader("Trading Status")
-        price = data_engine.get_realtime_price(symbol)
-        st.metric("Current Price", f"${price:,.2f}")
-        
+        price = service.price(symbol)
+        if price is not None:
+            st.metric("Current Price", f"${price:,.2f}")
+
         st.subheader("AI Signal")
         st.success("BUY SIGNAL (85% Confidence)")
-        
+
         if st.button("Train Model"):
             st.info("Starting model training...")
-            
+
     st.subheader("Active Positions")
-    st.table(pd.DataFrame([
-        {"Symbol": "BTC/USDT", "Entry": 45000, "Current": price, "PnL": f"{(price-45000)/45000*100:.2f}%"}
-    ]))
+    render_positions(get_ledger(config.trading.ledger_url), service)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,34 @@
+import pandas as pd
+import plotly.graph_objects as go
+
+OVERLAYS = [
+    ('sma_20', 'SMA 20', dict(color='orange')),
+    ('bb_upper', 'BB Upper', dict(dash='dash', color='gray')),
+    ('bb_lower', 'BB Lower', dict(dash='dash', color='gray')),
+]
+
+
+def build_figure(df: pd.DataFrame) -> go.Figure:
+    fig = go.Figure(data=[go.Candlestick(x=df['timestamp'],
+                    open=df['open'], high=df['high'],
+                    low=df['low'], close=df['close'], name='Price')])
+    for column, name, line in OVERLAYS:
+        fig.add_trace(go.Scatter(x=df['timestamp'], y=df[column], name=name, line=line))
+    return fig
+
+
+def _append(values, new, max_points: int) -> tuple:
+    """Replace the last point with the first new one and append the rest."""
+    return (tuple(values[:-1]) + tuple(new))[-max_points:]
+
+
+def extend_figure(fig: go.Figure, rows: pd.DataFrame, max_points: int):
+    """Append candles to an existing figure; rows[0] revises its last candle."""
+    with fig.batch_update():
+        candle = fig.data[0]
+        candle.x = _append(candle.x, rows['timestamp'], max_points)
+        for column in ('open', 'high', 'low', 'close'):
+            setattr(candle, column, _append(getattr(candle, column), rows[column], max_points))
+        for trace, (column, _, _) in zip(fig.data[1:], OVERLAYS):
+            trace.x = _append(trace.x, rows['timestamp'], max_points)
+            trace.y = _append(trace.y, rows[column], max_points)
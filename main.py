@@ -1,52 +1,173 @@
-import time
+import argparse
+import asyncio
 import logging
+from functools import partial
 from backend.config import Config
-from backend.data_engine import DataEngine
+from backend.data_engine import DataEngine, normalize_symbol
 from backend.strategy import Strategy
 from backend.executor import ExecutionEngine
-from backend.trainer import ModelTrainer
+from backend.indicators import INDICATOR_COLUMNS
+from backend.predictor import Predictor
+from backend.registry import ModelRegistry, lstm_model_name
+from backend.metrics import MetricsServer
+from backend.scheduler import TradingScheduler
 
+# Torch (trainer, online) and SQLAlchemy (ledger) are imported by the commands that use them
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def run_trading_bot():
-    """Main loop for the trading bot."""
+async def _run_for(coro, seconds: float = None):
+    """Await `coro`, cancelling it after `seconds` (None: until it finishes)."""
+    try:
+        await asyncio.wait_for(coro, seconds)
+    except asyncio.TimeoutError:
+        logger.info(f"Stopped after {seconds:.1f}s")
+
+def _load_predictor(config: Config, symbols: list, registry: ModelRegistry = None):
+    """Predictor with the registered per-symbol LSTMs and the XGBoost model; None if nothing is registered."""
+    registry = registry or ModelRegistry()
+    predictor = Predictor(config)
+    names = [(lstm_model_name(s), s) for s in symbols] + [('xgboost', None)]
+    loaded = []
+    for name, symbol in names:
+        if not registry.versions(name):
+            continue
+        try:
+            registry.load(name).install(predictor, symbol=symbol)
+            loaded.append(name)
+        except Exception as e:
+            logger.error(f"Could not load model {name}: {e}")
+    if not loaded:
+        return None
+    logger.info(f"Live predictions from {', '.join(loaded)}")
+    return predictor
+
+def run_trading_bot(config: Config = None, replay=None, duration: float = None):
+    """Main loop for the trading bot.
+
+    With a ReplayExchange the bot trades recorded or synthetic candles on the
+    replay's accelerated clock instead of the configured exchange, stopping
+    when the candles run out or after `duration` wall seconds.
+    """
+    from backend.ledger import Ledger
     logger.info("Starting AI Trading Bot...")
-    
+
+    config = config or Config()
+    data_engine = DataEngine(config, exchange=replay)
+    strategy = Strategy(config)
+    ledger = Ledger(config.trading.ledger_url)
+    executor = ExecutionEngine(config, data_engine.exchange, data_engine.market_data, ledger)
+    data_engine.load_markets()
+    metrics_server = None
+    if config.logging.metrics_enabled:
+        metrics_server = MetricsServer(config.logging.metrics_host, config.logging.metrics_port,
+                                       profiler=config.logging.profiler_enabled)
+        metrics_server.start()
+    symbols = [normalize_symbol(p, data_engine.exchange) for p in config.data.pairs]
+    predictor = _load_predictor(config, symbols)
+    stream_exchange = None
+    if replay is not None:
+        stream_exchange = replay.async_view()
+        # Setup time should not eat into the replayed candles
+        replay.clock.reset(replay.clock.start)
+        # Quote ages are measured in wall time; keep them to the same span of replay time
+        data_engine.market_data.ttl /= replay.clock.speed
+        data_engine.market_data.stale_after /= replay.clock.speed
+        if duration is None:
+            duration = max(replay.end_time - replay.clock.time(), 0) / replay.clock.speed
+    if config.data.stream_tickers:
+        data_engine.market_data.start(symbols, stream_exchange=stream_exchange)
+
+    # Every pair in DataConfig.pairs runs concurrently, woken at candle close
+    if replay is not None:
+        scheduler = TradingScheduler(config, strategy, executor, exchange=stream_exchange, clock=replay.clock,
+                                     predictor=predictor)
+    else:
+        scheduler = TradingScheduler(config, strategy, executor, predictor=predictor)
+    try:
+        asyncio.run(_run_for(scheduler.run(), duration))
+    except KeyboardInterrupt:
+        logger.info("Bot stopped by user.")
+    finally:
+        data_engine.market_data.stop()
+        if metrics_server is not None:
+            metrics_server.stop()
+        ledger.close()
+    logger.info(f"Current paper balance: {executor.paper_balance}")
+
+def _fetch_frame(config, data_engine, symbol: str, limit: int):
+    df = data_engine.add_technical_indicators(data_engine.fetch_ohlcv(symbol, config.data.timeframe, limit))
+    return df if df is not None and not df.empty else None
+
+def _fetch_frames(config, data_engine, limit: int) -> dict:
+    frames = {}
+    for pair in config.data.pairs:
+        symbol = normalize_symbol(pair, data_engine.exchange)
+        df = _fetch_frame(config, data_engine, symbol, limit)
+        if df is not None:
+            frames[symbol] = df
+    return frames
+
+def _training_limit(config, data_engine) -> int:
+    """Candles in DataConfig.lookback_days, the history full trains use."""
+    return config.data.lookback_days * 24 * 60 * 60 // data_engine.exchange.parse_timeframe(config.data.timeframe)
+
+def retrain_models():
+    """Retrain the per-pair LSTMs concurrently and register them."""
+    from backend.trainer import ModelTrainer
     config = Config()
     data_engine = DataEngine(config)
-    strategy = Strategy(config)
-    executor = ExecutionEngine(config, data_engine.exchange)
-    
-    symbol = "BTC/USDT"
-    
-    while True:
+    data_engine.load_markets()
+    data_engine.download_history()
+    frames = _fetch_frames(config, data_engine, _training_limit(config, data_engine))
+    results = ModelTrainer(config).train_many(frames, feature_cols=['close'] + INDICATOR_COLUMNS,
+                                              registry=ModelRegistry())
+    logger.info(f"Retrained {len(results)}/{len(frames)} models")
+
+def download_history():
+    """Fill the candle store with DataConfig.lookback_days of history for every pair."""
+    config = Config()
+    written = DataEngine(config).download_history()
+    logger.info(f"Downloaded {sum(written.values())} candles for {len(written)} pairs")
+
+def update_models():
+    """Hourly refresh: fine-tune registered models on new candles, retraining only on drift."""
+    from backend.online import OnlineUpdater
+    config = Config()
+    data_engine = DataEngine(config)
+    data_engine.load_markets()
+    registry = ModelRegistry()
+    updater = OnlineUpdater(config, registry)
+    frames = _fetch_frames(config, data_engine, config.model.replay_window)
+    # Drift-triggered retrains fetch the full training history, like 'retrain'
+    limit = _training_limit(config, data_engine)
+    for symbol, df in frames.items():
+        name = lstm_model_name(symbol)
+        if not registry.versions(name):
+            logger.warning(f"{name} is not registered yet; run 'retrain' first")
+            continue
         try:
-            # 1. Fetch Data
-            df = data_engine.fetch_ohlcv(symbol, timeframe='1h', limit=100)
-            df = data_engine.add_technical_indicators(df)
-            
-            # 2. Generate Signals
-            signals = strategy.generate_signals(df)
-            latest_signal = signals['signal'].iloc[-1]
-            
-            # 3. Execute Trades
-            if latest_signal != 0:
-                price = df['close'].iloc[-1]
-                amount = strategy.calculate_position_size(executor.paper_balance, price)
-                executor.execute_trade(symbol, latest_signal, amount)
-                
-            logger.info(f"Loop finished. Current paper balance: {executor.paper_balance}")
-            
-            # Wait for next candle (or a set interval)
-            time.sleep(60) # Run every minute for testing
-            
-        except KeyboardInterrupt:
-            logger.info("Bot stopped by user.")
-            break
+            result = updater.update_lstm(name, df, history=partial(_fetch_frame, config, data_engine, symbol, limit))
+            logger.info(f"{name}: {result['action']} (v{result['version']})")
         except Exception as e:
-            logger.error(f"Error in main loop: {e}")
-            time.sleep(10)
+            logger.error(f"Updating {name} failed: {e}")
+    if registry.versions('xgboost'):
+        matrix = data_engine.build_feature_matrix(list(frames), config.data.timeframe,
+                                                  config.model.replay_window)
+        if matrix is not None:
+            history = partial(data_engine.build_feature_matrix, list(frames), config.data.timeframe, limit)
+            result = updater.update_xgboost('xgboost', matrix, history=history)
+            logger.info(f"xgboost: {result['action']} (v{result['version']})")
 
 if __name__ == "__main__":
-    run_trading_bot()
+    parser = argparse.ArgumentParser(description="AI Trading Bot")
+    parser.add_argument('command', nargs='?', default='trade', choices=['trade', 'retrain', 'update', 'download'])
+    command = parser.parse_args().command
+    if command == 'retrain':
+        retrain_models()
+    elif command == 'update':
+        update_models()
+    elif command == 'download':
+        download_history()
+    else:
+        run_trading_bot()
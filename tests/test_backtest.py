@@ -0,0 +1,45 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from backend.backtest import Backtester
+from backend.config import Config
+from backend.strategy import Strategy
+from benchmarks.synthetic import synthetic_ohlcv
+
+
+@pytest.fixture
+def config(tmp_path):
+    config = Config(os.path.join(tmp_path, "config.yaml"))
+    config.strategy.rsi_oversold = 45
+    config.strategy.rsi_overbought = 55
+    return config
+
+
+def _assert_same(fast, slow):
+    assert len(fast.trades) > 0
+    pd.testing.assert_frame_equal(fast.trades, slow.trades, check_exact=False, rtol=1e-9)
+    pd.testing.assert_series_equal(fast.equity, slow.equity, check_exact=False, rtol=1e-9)
+    assert fast.stats.keys() == slow.stats.keys()
+    for key, value in fast.stats.items():
+        assert value == pytest.approx(slow.stats[key], rel=1e-9, nan_ok=True), key
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_vectorized_matches_loop_on_strategy_signals(config, seed):
+    backtester = Backtester(config, Strategy(config))
+    df = synthetic_ohlcv(3000, seed=seed, volatility=0.01)
+    _assert_same(backtester.run(df, 'BTC/USDT'), backtester.run(df, 'BTC/USDT', vectorized=False))
+
+
+def test_vectorized_matches_loop_on_random_signals(config):
+    # Tight levels so stops, targets and signal exits all occur
+    config.trading.stop_loss_percent = 1.0
+    config.trading.take_profit_percent = 1.5
+    backtester = Backtester(config, Strategy(config))
+    df = backtester.prepare(synthetic_ohlcv(3000, seed=5, volatility=0.01))
+    signals = np.random.default_rng(5).choice([-1, 0, 1], size=len(df), p=[0.05, 0.85, 0.1])
+    fast = backtester.run(df, 'BTC/USDT', signals=signals)
+    slow = backtester.run(df, 'BTC/USDT', signals=signals, vectorized=False)
+    _assert_same(fast, slow)
+    assert {'stop_loss', 'take_profit', 'signal'} <= set(fast.trades['exit_reason'])
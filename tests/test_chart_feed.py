@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backend.chart_feed import CandleFeed
+from backend.indicators import INDICATOR_COLUMNS, IndicatorEngine, technical_indicators
+from benchmarks.synthetic import synthetic_ohlcv
+
+
+class FakeEngine:
+    """Serves the last `limit` of `candles[:end]`, the newest optionally still forming."""
+
+    def __init__(self, candles: pd.DataFrame):
+        self.candles = candles
+        self.indicators = IndicatorEngine()
+        self.end = 0
+        self.forming = False
+        self.fetches = 0
+
+    def fetch_ohlcv(self, symbol, timeframe, limit):
+        self.fetches += 1
+        df = self.candles.iloc[max(0, self.end - limit):self.end].copy()
+        if self.forming:
+            df.iloc[-1, df.columns.get_loc('close')] *= 1.001
+            df.iloc[-1, df.columns.get_loc('high')] = df[['high', 'close']].iloc[-1].max()
+        return df
+
+    def update_technical_indicators(self, df, symbol, timeframe):
+        return self.indicators.update(symbol, timeframe, df)
+
+
+def _steps(engine, feed, start: int, stop: int):
+    """Advance one candle at a time, each first seen forming and then closed; yields every frame read."""
+    for end in range(start, stop):
+        engine.end = end
+        for forming in (True, False):
+            engine.forming = forming
+            yield feed.get()
+
+
+def test_feed_extends_incrementally_and_revises_latest():
+    candles = synthetic_ohlcv(300, seed=4, volatility=0.01)
+    engine = FakeEngine(candles)
+    feed = CandleFeed(engine, 'X', '1m', limit=100, refresh_seconds=0)
+    versions = []
+    for _ in _steps(engine, feed, 120, 301):
+        versions.append(feed.version)
+    assert versions == list(range(1, len(versions) + 1))
+    assert engine.fetches == len(versions)
+
+    # Indicator state starts from the first window fetched
+    expected = candles.iloc[20:].copy()
+    expected[INDICATOR_COLUMNS] = technical_indicators(expected['close'])
+    expected = expected.tail(100).reset_index(drop=True)
+    frame = feed.get()
+    assert list(frame['timestamp']) == list(expected['timestamp'])
+    for col in ['close'] + INDICATOR_COLUMNS:
+        np.testing.assert_allclose(frame[col].to_numpy(dtype=float), expected[col].to_numpy(dtype=float),
+                                   rtol=1e-9, atol=1e-9, err_msg=col)
+
+
+def test_extended_figure_matches_a_redraw():
+    pytest.importorskip('plotly')
+    from dashboard.charts import build_figure, extend_figure
+    candles = synthetic_ohlcv(250, seed=6, volatility=0.01)
+    engine = FakeEngine(candles)
+    feed = CandleFeed(engine, 'X', '1m', limit=80, refresh_seconds=0)
+    fig = last = version = None
+    for df in _steps(engine, feed, 100, 251):
+        # As render_chart does: draw once, then append only what changed
+        if fig is None:
+            fig, last, version = build_figure(df), df['timestamp'].iloc[-1], feed.version
+        elif feed.version != version:
+            extend_figure(fig, df[df['timestamp'] >= last], feed.limit)
+            last, version = df['timestamp'].iloc[-1], feed.version
+
+    redrawn = build_figure(feed.get())
+    assert len(fig.data) == len(redrawn.data)
+    for extended, expected in zip(fig.data, redrawn.data):
+        assert list(pd.to_datetime(list(extended.x))) == list(pd.to_datetime(list(expected.x)))
+        for attr in ('open', 'high', 'low', 'close') if expected.type == 'candlestick' else ('y',):
+            np.testing.assert_allclose(np.asarray(list(getattr(extended, attr)), dtype=float),
+                                       np.asarray(list(getattr(expected, attr)), dtype=float), err_msg=attr)
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backend.features import PRICE_FIELDS, FeatureMatrix
+from backend.indicators import INDICATOR_COLUMNS, technical_indicators
+from benchmarks.synthetic import synthetic_frames
+
+pytest.importorskip('scipy')
+
+
+def _assert_matches_pandas(values: np.ndarray, close: pd.Series):
+    expected = technical_indicators(close.reset_index(drop=True))
+    for col in INDICATOR_COLUMNS:
+        want = expected[col].to_numpy(dtype=np.float64)
+        got = values[col]
+        np.testing.assert_array_equal(np.isnan(got), np.isnan(want), err_msg=col)
+        np.testing.assert_allclose(got, want, rtol=1e-5, atol=1e-4, err_msg=col)
+
+
+def _ragged_frames():
+    frames = synthetic_frames(3, 300, seed=5, volatility=0.01)
+    frames['SYM0/USDT'].loc[120:140, 'close'] = frames['SYM0/USDT']['close'].iloc[120]
+    # Listed 100 candles late, and missing ten candles mid-series
+    frames['SYM1/USDT'] = frames['SYM1/USDT'].iloc[100:].reset_index(drop=True)
+    frames['SYM2/USDT'] = frames['SYM2/USDT'].drop(index=range(150, 160)).reset_index(drop=True)
+    # The first frame not covering the whole timeline forces a union of timestamps
+    return {s: frames[s] for s in ('SYM2/USDT', 'SYM0/USDT', 'SYM1/USDT')}
+
+
+def test_indicators_match_pandas_per_symbol():
+    frames = synthetic_frames(4, 400, seed=2, volatility=0.01)
+    matrix = FeatureMatrix.from_frames(frames).compute_indicators()
+    assert matrix.shape == (400, 4)
+    assert matrix['sma_20'].dtype == np.float32
+    for j, df in enumerate(frames.values()):
+        _assert_matches_pandas({col: matrix[col][:, j] for col in INDICATOR_COLUMNS}, df['close'])
+
+
+def test_late_listing_and_gaps_stay_aligned():
+    frames = _ragged_frames()
+    matrix = FeatureMatrix.from_frames(frames).compute_indicators()
+    np.testing.assert_array_equal(matrix.timestamps, frames['SYM0/USDT']['timestamp'].to_numpy())
+    assert matrix.symbols == ['SYM2/USDT', 'SYM0/USDT', 'SYM1/USDT']
+
+    late = matrix.symbols.index('SYM1/USDT')
+    for name in PRICE_FIELDS + INDICATOR_COLUMNS:
+        assert np.isnan(matrix[name][:100, late]).all(), name
+    _assert_matches_pandas({col: matrix[col][100:, late] for col in INDICATOR_COLUMNS}, frames['SYM1/USDT']['close'])
+    frame = matrix.frame('SYM1/USDT', ['close'] + INDICATOR_COLUMNS)
+    assert frame['timestamp'].iloc[0] == frames['SYM1/USDT']['timestamp'].iloc[49]
+
+    gappy = matrix.symbols.index('SYM2/USDT')
+    last_close = frames['SYM2/USDT']['close'].iloc[149]
+    for name in ('open', 'high', 'low', 'close'):
+        np.testing.assert_allclose(matrix[name][150:160, gappy], last_close, rtol=1e-6)
+    assert (matrix['volume'][150:160, gappy] == 0).all()
+    # Indicators see the gap as a flat stretch at the last close
+    filled = frames['SYM2/USDT'].set_index('timestamp')['close'].reindex(matrix.timestamps).ffill()
+    _assert_matches_pandas({col: matrix[col][:, gappy] for col in INDICATOR_COLUMNS}, filled)
+
+
+@pytest.mark.parametrize('horizon', [1, 3])
+def test_xgb_dataset_rows_after_since(horizon):
+    matrix = FeatureMatrix.from_frames(_ragged_frames()).compute_indicators()
+    since = int(matrix.timestamps[180].astype('datetime64[ms]').astype(np.int64))
+    X, y = matrix.xgb_dataset(INDICATOR_COLUMNS, horizon, since=since)
+
+    rows, labels = [], []
+    close = matrix['close']
+    for t in range(181, len(matrix.timestamps) - horizon):
+        for j in range(len(matrix.symbols)):
+            row = [matrix[col][t, j] for col in INDICATOR_COLUMNS]
+            if np.isfinite(row).all() and np.isfinite(close[t + horizon, j]):
+                rows.append(row)
+                labels.append(int(close[t + horizon, j] > close[t, j]))
+    np.testing.assert_array_equal(X, np.array(rows, dtype=np.float32))
+    np.testing.assert_array_equal(y, labels)
+
+    X_all, _ = matrix.xgb_dataset(INDICATOR_COLUMNS, horizon)
+    assert len(X_all) > len(X) and X.dtype == np.float32
@@ -0,0 +1,11 @@
+import os
+import pytest
+from benchmarks.imports import BUDGETS, measure, violations
+
+# CI runners are slower and noisier than a developer machine
+SCALE = float(os.environ.get('IMPORT_BUDGET_SCALE', '3'))
+
+
+@pytest.mark.parametrize('module', list(BUDGETS))
+def test_import_budget(module):
+    assert violations(module, measure(module, repeat=2), SCALE) == []
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backend.config import StrategyConfig
+from backend.indicators import INDICATOR_COLUMNS, IndicatorEngine, StreamingIndicators, technical_indicators
+from benchmarks.synthetic import synthetic_ohlcv
+
+
+def _candles(n: int, seed: int = 0) -> pd.DataFrame:
+    df = synthetic_ohlcv(n, seed=seed, volatility=0.01)
+    # A flat stretch exercises the zero-gain/zero-loss RSI branches
+    df.loc[100:130, 'close'] = df['close'].iloc[100]
+    return df
+
+
+def _reference(df: pd.DataFrame, params: StrategyConfig = None) -> pd.DataFrame:
+    out = df.copy()
+    out[INDICATOR_COLUMNS] = technical_indicators(df['close'], params)
+    return out.dropna()
+
+
+def _assert_matches(actual: pd.DataFrame, expected: pd.DataFrame):
+    assert list(actual['timestamp']) == list(expected['timestamp'])
+    for col in INDICATOR_COLUMNS:
+        np.testing.assert_allclose(actual[col].to_numpy(dtype=float), expected[col].to_numpy(dtype=float),
+                                   rtol=1e-9, atol=1e-9, err_msg=col)
+
+
+@pytest.mark.parametrize('params', [None, StrategyConfig(sma_fast=7, sma_slow=30, rsi_period=5, macd_fast=5,
+                                                         macd_slow=13, macd_signal=4, bb_std=1.5)])
+def test_streaming_update_matches_pandas(params):
+    df = _candles(400, seed=1)
+    stream = StreamingIndicators(params)
+    rows = [stream.update(t, c) for t, c in zip(df['timestamp'], df['close'])]
+    streamed = df.copy()
+    streamed[INDICATOR_COLUMNS] = pd.DataFrame(rows, index=df.index)[INDICATOR_COLUMNS]
+    _assert_matches(streamed.dropna(), _reference(df, params))
+
+
+def test_engine_seed_path_then_incremental_matches_pandas():
+    df = _candles(IndicatorEngine.SEED_THRESHOLD + 200, seed=2)
+    engine = IndicatorEngine()
+    first = IndicatorEngine.SEED_THRESHOLD + 50
+    parts = [engine.update('BTC/USDT', '1m', df.iloc[:first])]
+    assert engine.get_stream('BTC/USDT', '1m').count == first
+    for end in range(first + 1, len(df) + 1, 7):
+        # Each poll overlaps the last one, as exchanges return it again
+        parts.append(engine.update('BTC/USDT', '1m', df.iloc[end - 10:end]))
+    parts.append(engine.update('BTC/USDT', '1m', df.iloc[-10:]))
+    combined = pd.concat(parts)
+    combined = combined[~combined['timestamp'].duplicated(keep='last')]
+    _assert_matches(combined, _reference(df))
+
+
+def test_revising_latest_candle_matches_final_values():
+    df = _candles(300, seed=3)
+    engine = IndicatorEngine()
+    engine.update('BTC/USDT', '1m', df.iloc[:200])
+    for i in range(200, len(df)):
+        forming = df.iloc[[i]].copy()
+        # The still-open candle is streamed at a few prices before it closes
+        for close in (forming['close'].iloc[0] * 1.05, forming['close'].iloc[0] * 0.9):
+            engine.update('BTC/USDT', '1m', forming.assign(close=close))
+        last = engine.update('BTC/USDT', '1m', df.iloc[i - 1:i + 1])
+    _assert_matches(last.iloc[-1:], _reference(df).iloc[-1:])
+    stream = engine.get_stream('BTC/USDT', '1m')
+    expected = technical_indicators(df['close']).iloc[-1]
+    for col in INDICATOR_COLUMNS:
+        assert stream.values()[col] == pytest.approx(expected[col], rel=1e-9, abs=1e-9)
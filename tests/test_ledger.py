@@ -0,0 +1,116 @@
+import logging
+import sqlite3
+import pytest
+
+pytest.importorskip('sqlalchemy')
+from backend.ledger import Ledger  # noqa: E402
+
+
+@pytest.fixture
+def url(tmp_path):
+    return f"sqlite:///{tmp_path / 'ledger.db'}"
+
+
+def test_flush_persists_paper_and_live_books_separately(url):
+    ledger = Ledger(url, flush_interval=0.01)
+    ledger.record_trade('BTC/USDT', 'buy', 1.0, 100.0, fee=0.1)
+    ledger.record_trade('BTC/USDT', 'buy', 2.0, 110.0, order_id='c1', mode='live')
+    ledger.record_trade('BTC/USDT', 'sell', 0.5, 120.0, mode='live')
+    ledger.set_balance(9_899.9)
+    ledger.flush()
+
+    reopened = Ledger(url)
+    paper, live = reopened.open_positions('paper'), reopened.open_positions('live')
+    assert paper['BTC/USDT'].amount == 1.0 and paper['BTC/USDT'].avg_price == 100.0
+    assert live['BTC/USDT'].amount == 1.5 and live['BTC/USDT'].avg_price == 110.0
+    assert reopened.balance() == 9_899.9
+    summary = reopened.pnl_summary().set_index('mode')
+    assert summary.loc['paper', 'trades'] == 1 and summary.loc['live', 'trades'] == 2
+    assert summary.loc['live', 'realized_pnl'] == pytest.approx(5.0)
+    ledger.close()
+    reopened.close()
+
+
+def _failing(ledger, failures: int):
+    write = ledger._write
+    calls = {'n': 0}
+
+    def flaky(batch):
+        calls['n'] += 1
+        if calls['n'] <= failures:
+            raise RuntimeError("database is locked")
+        write(batch)
+    ledger._write = flaky
+    return calls
+
+
+def test_failed_write_is_retried(url):
+    ledger = Ledger(url, flush_interval=0.01, retries=3, retry_delay=0.0)
+    calls = _failing(ledger, 2)
+    ledger.record_trade('ETH/USDT', 'buy', 1.0, 10.0)
+    ledger.flush()
+    assert calls['n'] == 3 and ledger.failed == []
+    assert len(Ledger(url).recent_trades()) == 1
+    ledger.close()
+
+
+def test_batch_that_exhausts_retries_goes_out_with_the_next_one(url, caplog):
+    ledger = Ledger(url, flush_interval=0.01, retries=1, retry_delay=0.0)
+    _failing(ledger, 2)
+    ledger.record_trade('ETH/USDT', 'buy', 1.0, 10.0)
+    ledger.flush()
+    assert len(ledger.failed) == 2  # the trade and its position snapshot
+    ledger.record_trade('ETH/USDT', 'buy', 1.0, 20.0)
+    ledger.flush()
+    assert ledger.failed == []
+    reopened = Ledger(url)
+    assert len(reopened.recent_trades()) == 2
+    assert reopened.position('ETH/USDT').amount == 2.0
+
+    _failing(ledger, 100)
+    ledger.record_trade('ETH/USDT', 'sell', 2.0, 30.0)
+    with caplog.at_level(logging.ERROR, logger='backend.ledger'):
+        ledger.close()
+    assert len(ledger.failed) == 2
+    assert 'not written' in caplog.text
+
+
+def test_positions_keyed_by_symbol_only_are_migrated(tmp_path):
+    path = tmp_path / 'ledger.db'
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE positions (symbol VARCHAR(32) PRIMARY KEY, amount FLOAT NOT NULL, avg_price FLOAT NOT NULL,
+                                realized_pnl FLOAT NOT NULL, updated_at FLOAT NOT NULL);
+        CREATE TABLE trades (id INTEGER PRIMARY KEY, ts FLOAT NOT NULL, symbol VARCHAR(32) NOT NULL,
+                             side VARCHAR(4) NOT NULL, amount FLOAT NOT NULL, price FLOAT NOT NULL,
+                             fee FLOAT NOT NULL, realized_pnl FLOAT NOT NULL, order_id VARCHAR(64),
+                             mode VARCHAR(8) NOT NULL);
+        INSERT INTO positions VALUES ('BTC/USDT', 1.0, 100.0, 0.0, 1.0), ('ETH/USDT', 2.0, 10.0, 0.0, 1.0);
+        INSERT INTO trades VALUES (1, 1.0, 'BTC/USDT', 'buy', 1.0, 100.0, 0.0, 0.0, 'c1', 'live');
+    """)
+    conn.close()
+    ledger = Ledger(f"sqlite:///{path}")
+    assert set(ledger.open_positions('live')) == {'BTC/USDT'}
+    assert set(ledger.open_positions('paper')) == {'ETH/USDT'}
+    ledger.record_trade('BTC/USDT', 'buy', 1.0, 100.0)
+    ledger.close()
+    assert Ledger(f"sqlite:///{path}").position('BTC/USDT', 'live').amount == 1.0
+
+
+def test_databases_without_on_conflict_use_update_then_insert(url, monkeypatch):
+    monkeypatch.setattr(Ledger, '_native_insert', lambda self: None)
+    ledger = Ledger(url, flush_interval=0.01)
+    ledger.record_trade('BTC/USDT', 'buy', 1.0, 100.0)
+    ledger.set_balance(1_000.0)
+    ledger.flush()
+    ledger.record_trade('BTC/USDT', 'buy', 1.0, 110.0)
+    ledger.record_trade('ETH/USDT', 'buy', 2.0, 10.0, mode='live')
+    ledger.set_balance(800.0)
+    ledger.flush()
+    ledger.close()
+
+    reopened = Ledger(url)
+    assert reopened.position('BTC/USDT').amount == 2.0 and reopened.position('BTC/USDT').avg_price == 105.0
+    assert reopened.position('ETH/USDT', 'live').amount == 2.0
+    assert reopened.balance() == 800.0
+    reopened.close()
@@ -0,0 +1,115 @@
+import asyncio
+import os
+import threading
+import time
+import pytest
+from backend.config import Config
+from backend.market_data import MarketDataHub
+
+
+class FakeRestExchange:
+    def __init__(self, delay: float = 0.0, **fields):
+        self.delay = delay
+        self.fields = {'last': 100.0, **fields}
+        self.calls = 0
+
+    def fetch_ticker(self, symbol):
+        self.calls += 1
+        time.sleep(self.delay)
+        return {'symbol': symbol, 'timestamp': int(time.time() * 1000), **self.fields}
+
+
+class FakeStreamExchange:
+    """watch_ticker yields a rising last price every few milliseconds."""
+    has = {'watchTickers': False}
+
+    def __init__(self):
+        self.ticks = 0
+        self.closed = False
+
+    async def watch_ticker(self, symbol):
+        await asyncio.sleep(0.005)
+        self.ticks += 1
+        return {'symbol': symbol, 'last': 200.0 + self.ticks, 'bid': None, 'ask': None, 'timestamp': None}
+
+    async def close(self):
+        self.closed = True
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_stream_updates_cache_without_rest():
+    rest, stream = FakeRestExchange(), FakeStreamExchange()
+    hub = MarketDataHub(rest)
+    hub.start(['BTC/USDT', 'ETH/USDT'], stream_exchange=stream)
+    try:
+        _wait_for(lambda: len(hub.quotes) == 2)
+        first = hub.get_price('BTC/USDT')
+        _wait_for(lambda: hub.get_price('BTC/USDT') > first)
+        assert hub.get_ticker('ETH/USDT')['source'] == 'stream'
+    finally:
+        hub.stop()
+    assert stream.closed
+    assert rest.calls == hub.rest_calls == 0
+
+
+def test_ttl_expiry_falls_back_to_rest():
+    rest = FakeRestExchange()
+    hub = MarketDataHub(rest, ttl=0.05, stale_after=0.05)
+    assert hub.get_price('BTC/USDT') == 100.0
+    assert hub.get_price('BTC/USDT') == 100.0
+    assert rest.calls == 1
+    time.sleep(0.06)
+    hub.get_price('BTC/USDT')
+    assert rest.calls == 2
+    # A stale streamed quote is replaced by REST too
+    hub.on_ticker({'symbol': 'BTC/USDT', 'last': 250.0})
+    assert hub.get_price('BTC/USDT') == 250.0
+    time.sleep(0.06)
+    assert hub.get_price('BTC/USDT') == 100.0
+    assert rest.calls == hub.rest_calls == 3
+
+
+def test_concurrent_callers_share_one_rest_request():
+    rest = FakeRestExchange(delay=0.1)
+    hub = MarketDataHub(rest)
+    barrier = threading.Barrier(8)
+    prices = []
+
+    def worker():
+        barrier.wait()
+        prices.append(hub.get_price('BTC/USDT'))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert prices == [100.0] * 8
+    assert rest.calls == hub.rest_calls == 1
+
+
+def test_price_falls_back_when_last_missing():
+    assert MarketDataHub(FakeRestExchange(last=None, close=99.0)).get_price('X') == 99.0
+    assert MarketDataHub(FakeRestExchange(last=None, bid=98.0, ask=100.0)).get_price('X') == 99.0
+    assert MarketDataHub(FakeRestExchange(last=None, ask=101.0)).get_price('X') == 101.0
+    with pytest.raises(ValueError):
+        MarketDataHub(FakeRestExchange(last=None)).get_price('X')
+
+
+@pytest.mark.parametrize('testnet', [True, False])
+def test_stream_client_follows_testnet_flag(tmp_path, testnet):
+    pytest.importorskip('ccxt')
+    from backend.data_engine import DataEngine
+    config = Config(os.path.join(tmp_path, "config.yaml"))
+    config.binance.testnet = testnet
+    engine = DataEngine(config)
+    client = engine.market_data._stream_client()
+    assert client.id == engine.exchange.id
+    assert bool(client.isSandboxModeEnabled) == testnet == bool(engine.exchange.isSandboxModeEnabled)
+    assert client.options['defaultType'] == engine.exchange.options['defaultType']
@@ -0,0 +1,103 @@
+import asyncio
+import os
+import pytest
+from backend.config import Config
+from backend.metrics import STAGE_SECONDS, MetricsRegistry, MetricsServer, timed
+
+
+def test_prometheus_text_exposition():
+    registry = MetricsRegistry()
+    calls = registry.counter('api_calls_total', 'Exchange API requests', ['method'])
+    waits = registry.counter('waits_total', 'Throttled requests')
+    latency = registry.summary('latency_seconds', 'Request latency', ['symbol'])
+    calls.inc(method='fetch_ticker')
+    calls.inc(2, method='create_order')
+    waits.inc()
+    for value in range(1, 101):
+        latency.observe(value / 100, symbol='BTC/USDT')
+    assert registry.render() == '\n'.join([
+        '# HELP api_calls_total Exchange API requests',
+        '# TYPE api_calls_total counter',
+        'api_calls_total{method="create_order"} 2',
+        'api_calls_total{method="fetch_ticker"} 1',
+        '# HELP waits_total Throttled requests',
+        '# TYPE waits_total counter',
+        'waits_total 1',
+        '# HELP latency_seconds Request latency',
+        '# TYPE latency_seconds summary',
+        'latency_seconds{symbol="BTC/USDT",quantile="0.5"} 0.51',
+        'latency_seconds{symbol="BTC/USDT",quantile="0.9"} 0.91',
+        'latency_seconds{symbol="BTC/USDT",quantile="0.99"} 1',
+        'latency_seconds_sum{symbol="BTC/USDT"} 50.5',
+        'latency_seconds_count{symbol="BTC/USDT"} 100',
+    ]) + '\n'
+
+
+def test_summary_quantiles_cover_recent_window():
+    summary = MetricsRegistry().summary('s', 'help', ['stage'], window=10)
+    assert summary.quantile(0.5, stage='a') is None
+    for value in range(100):
+        summary.observe(value, stage='a')
+    summary.observe(5, stage='b')
+    assert summary.quantile(0.5, stage='a') == 95
+    assert summary.quantile(0.99, stage='a') == 99
+    assert summary.snapshot() == {'a': {'count': 100, 'p50': 95, 'p90': 99, 'p99': 99},
+                                  'b': {'count': 1, 'p50': 5, 'p90': 5, 'p99': 5}}
+
+
+def test_labels_and_types_are_checked():
+    registry = MetricsRegistry()
+    counter = registry.counter('c', 'help', ['method'])
+    assert registry.counter('c', 'help', ['method']) is counter
+    with pytest.raises(ValueError):
+        counter.inc(symbol='X')
+    with pytest.raises(ValueError):
+        counter.inc()
+    with pytest.raises(ValueError):
+        registry.summary('c', 'help')
+    counter.inc(method=3)
+    assert counter.value(method='3') == 1
+
+
+def test_timers_observe_blocks_and_functions():
+    summary = MetricsRegistry().summary('t', 'help', ['stage'])
+    with summary.time(stage='block'):
+        pass
+
+    @summary.time(stage='sync')
+    def work(x):
+        return x * 2
+
+    @summary.time(stage='async')
+    async def async_work(x):
+        await asyncio.sleep(0)
+        return x + 1
+
+    assert work(2) == 4 and work.__name__ == 'work'
+    assert asyncio.run(async_work(1)) == 2
+    with pytest.raises(RuntimeError), summary.time(stage='block'):
+        raise RuntimeError()
+    snapshot = summary.snapshot()
+    assert {stage: s['count'] for stage, s in snapshot.items()} == {'block': 2, 'sync': 1, 'async': 1}
+    assert all(s['p99'] >= 0 for s in snapshot.values())
+
+    before = STAGE_SECONDS.snapshot().get('test_stage', {'count': 0})['count']
+    with timed('test_stage'):
+        pass
+    assert STAGE_SECONDS.snapshot()['test_stage']['count'] == before + 1
+
+
+def test_server_endpoints():
+    TestClient = pytest.importorskip('fastapi.testclient').TestClient
+    registry = MetricsRegistry()
+    registry.counter('c_total', 'help').inc()
+    client = TestClient(MetricsServer(registry=registry).app())
+    response = client.get('/metrics')
+    assert response.headers['content-type'].startswith('text/plain')
+    assert 'c_total 1' in response.text.splitlines()
+    assert client.get('/metrics.json').json() == {'c_total': {'': 1}}
+    assert client.get('/debug/profile?seconds=0').status_code == 404
+
+
+def test_metrics_server_is_opt_in(tmp_path):
+    assert Config(os.path.join(tmp_path, "config.yaml")).logging.metrics_enabled is False
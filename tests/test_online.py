@@ -0,0 +1,72 @@
+import os
+import pytest
+from backend.config import Config
+from backend.registry import ModelRegistry
+from benchmarks.synthetic import synthetic_ohlcv
+
+torch = pytest.importorskip('torch')
+
+FEATURES = ['close', 'volume']
+
+
+@pytest.fixture
+def config(tmp_path):
+    config = Config(os.path.join(tmp_path, "config.yaml"))
+    config.model.lstm_lookback = 8
+    config.model.lstm_units = 4
+    config.model.epochs = 1
+    config.model.update_epochs = 1
+    config.model.replay_window = 100
+    return config
+
+
+@pytest.fixture
+def updater(config, tmp_path):
+    from backend.online import OnlineUpdater
+    from backend.trainer import ModelTrainer, reference_stats, to_millis
+    history = synthetic_ohlcv(800, seed=4)
+    trainer = ModelTrainer(config)
+    model = trainer.train_lstm(history.iloc[:600], FEATURES)
+    registry = ModelRegistry(str(tmp_path / "models"))
+    trainer.register_model(model, 'lstm-test', registry, metrics={
+        'val_loss': trainer.best_loss, 'trained_until': to_millis(history['timestamp'].iloc[599]),
+        'update': 'full', **reference_stats(history.iloc[:600], FEATURES, config.model.replay_window)})
+    return OnlineUpdater(config, registry), history
+
+
+class _Detector:
+    def __init__(self, drift: bool):
+        self.drift = drift
+        self.values = None
+
+    def check(self, values, *args, **kwargs):
+        self.values = values
+        return {'drift': self.drift, 'reason': 'test' if self.drift else None, 'shift': 0.0, 'error_ratio': None}
+
+
+def test_drift_is_checked_on_candles_after_the_reference_window(updater):
+    updater, history = updater
+    updater.detector = _Detector(False)
+    # The poll overlaps the last 80 training candles
+    result = updater.update_lstm('lstm-test', history.iloc[520:640])
+    assert result['action'] in ('updated', 'rejected')
+    assert len(updater.detector.values) == 40
+    assert (updater.detector.values == history[FEATURES].iloc[600:640].to_numpy()).all()
+
+
+def test_drift_retrains_on_full_history(updater):
+    updater, history = updater
+    updater.detector = _Detector(True)
+    trained = []
+    train_lstm = updater.trainer.train_lstm
+
+    def spy(df, feature_cols=None, checkpoint=None):
+        trained.append(len(df))
+        return train_lstm(df, feature_cols, checkpoint)
+    updater.trainer.train_lstm = spy
+
+    result = updater.update_lstm('lstm-test', history.tail(100), history=lambda: history)
+    assert result['action'] == 'retrained'
+    assert trained == [len(history)]
+    metrics = updater.registry.load('lstm-test').manifest['metrics']
+    assert metrics['trained_until'] == metrics['reference_until'] == int(history['timestamp'].iloc[-1].value // 10**6)
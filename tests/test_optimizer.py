@@ -0,0 +1,47 @@
+import os
+import numpy as np
+import pandas as pd
+from backend.config import Config
+from backend.optimizer import ParameterSweep
+from benchmarks.synthetic import synthetic_ohlcv
+
+MINUTE = 60_000
+
+
+def _frames() -> dict:
+    # B starts 300 candles after A and misses an hour in the middle
+    a = synthetic_ohlcv(2000, seed=1, volatility=0.01)
+    b = synthetic_ohlcv(1700, seed=2, volatility=0.01, start_ms=1_600_000_000_000 + 300 * MINUTE)
+    b = b.drop(b.index[800:860]).reset_index(drop=True)
+    return {'A/USDT': a, 'B/USDT': b}
+
+
+def _rows_between(df: pd.DataFrame, start_ms: int, end_ms: int) -> tuple:
+    ts = df['timestamp'].astype('datetime64[ms]').astype(np.int64)
+    rows = np.flatnonzero((ts >= start_ms) & (ts <= end_ms))
+    return rows[0], rows[-1] + 1
+
+
+def test_folds_cover_the_same_period_for_every_symbol():
+    frames = _frames()
+    folds = ParameterSweep.folds(frames, train_bars=600, test_bars=200)
+    # The shared timeline runs from B's first candle to the end of both, gap included
+    assert len(folds) == (1700 - 800) // 200 + 1
+    assert pd.Timestamp(folds[0]['train_start'], unit='ms') == frames['B/USDT']['timestamp'].iloc[0]
+    for fold in folds:
+        assert fold['test_end'] - fold['test_start'] == 199 * MINUTE
+        windows = {'train': (fold['train_start'], fold['test_start'] - MINUTE),
+                   'test': (fold['test_start'], fold['test_end'])}
+        for window, (start, end) in windows.items():
+            assert {s for s, _, _ in fold[window]} == set(frames)
+            for symbol, lo, hi in fold[window]:
+                assert (lo, hi) == _rows_between(frames[symbol], start, end), (window, symbol)
+
+
+def test_walk_forward_reports_fold_periods(tmp_path):
+    config = Config(os.path.join(tmp_path, "config.yaml"))
+    sweep = ParameterSweep(config, {'rsi_oversold': [30, 40]}, workers=1, results_dir=str(tmp_path))
+    table = sweep.walk_forward(_frames(), train_bars=800, test_bars=400, save=False)
+    assert list(table['fold']) == [1, 2]
+    assert (np.diff(table['test_start'].to_numpy()) == np.timedelta64(400, 'm')).all()
+    assert set(table['rsi_oversold']) <= {30, 40}
@@ -0,0 +1,116 @@
+import asyncio
+import ccxt
+import pytest
+from backend.orders import OrderPipeline, OrderState
+
+
+class FakeExchange:
+    """Async exchange whose calls fail according to a script of exceptions (or None for success)."""
+
+    has = {}
+
+    def __init__(self, fills_after: int = 0):
+        self.orders = {}
+        self.by_client_id = {}
+        self.script = {'create_order': [], 'fetch_order': [], 'cancel_order': []}
+        self.calls = {k: 0 for k in self.script}
+        self.fills_after = fills_after
+
+    def _next_error(self, method: str):
+        self.calls[method] += 1
+        script = self.script[method]
+        return script.pop(0) if script else None
+
+    async def create_order(self, symbol, type, side, amount, price=None, params=None):
+        client_id = params['clientOrderId']
+        error = self._next_error('create_order')
+        if client_id in self.by_client_id:
+            raise ccxt.DuplicateOrderId(client_id)
+        if isinstance(error, ccxt.InvalidOrder):
+            raise error
+        order = {'id': str(len(self.orders) + 1), 'clientOrderId': client_id, 'symbol': symbol, 'side': side,
+                 'amount': amount, 'filled': 0.0, 'status': 'open', 'polls': 0}
+        self.orders[order['id']] = self.by_client_id[client_id] = order
+        if error is not None:
+            # Lost response: the order reached the book anyway
+            raise error
+        return dict(order)
+
+    async def fetch_order(self, id, symbol=None, params=None):
+        error = self._next_error('fetch_order')
+        if error is not None:
+            raise error
+        order = self.orders.get(id) or self.by_client_id.get((params or {}).get('clientOrderId'))
+        if order is None:
+            raise ccxt.OrderNotFound(id)
+        order['polls'] += 1
+        if order['status'] == 'open' and order['polls'] > self.fills_after:
+            order['filled'], order['status'], order['average'] = order['amount'], 'closed', 100.0
+        return dict(order)
+
+    async def cancel_order(self, id, symbol=None, params=None):
+        error = self._next_error('cancel_order')
+        if error is not None:
+            raise error
+        self.orders[id]['status'] = 'canceled'
+        return dict(self.orders[id])
+
+
+def _run(exchange, side='buy', amount=1.0, **kwargs):
+    async def run():
+        pipeline = OrderPipeline(exchange, retry_delay=0.001, poll_interval=0.001, **kwargs)
+        await pipeline.start()
+        order = pipeline.submit('BTC/USDT', side, amount, key=1)
+        await pipeline.wait(order.client_id, timeout=5)
+        await pipeline.stop()
+        return pipeline, order
+    return asyncio.run(run())
+
+
+def test_fills_are_tracked_into_positions():
+    pipeline, order = _run(FakeExchange(fills_after=2))
+    assert order.state == OrderState.FILLED and order.filled == 1.0
+    assert pipeline.positions == {'BTC/USDT': 1.0}
+
+
+def test_timeout_after_order_reached_exchange_is_not_resubmitted():
+    exchange = FakeExchange()
+    exchange.script['create_order'] = [ccxt.RequestTimeout('lost')]
+    pipeline, order = _run(exchange)
+    assert order.state == OrderState.FILLED
+    assert len(exchange.orders) == 1 and exchange.calls['create_order'] == 1
+
+
+def test_retried_submission_matches_duplicate_client_id():
+    exchange = FakeExchange()
+    exchange.script['create_order'] = [ccxt.RequestTimeout('lost')]
+    # The lookup after the timeout fails too, so the retry hits DuplicateOrderId
+    exchange.script['fetch_order'] = [ccxt.RequestTimeout('lookup')]
+    pipeline, order = _run(exchange)
+    assert order.state == OrderState.FILLED
+    assert len(exchange.orders) == 1 and exchange.calls['create_order'] == 2
+    assert pipeline.positions == {'BTC/USDT': 1.0}
+
+
+def test_rejected_order_is_not_retried():
+    exchange = FakeExchange()
+    exchange.script['create_order'] = [ccxt.InvalidOrder('too small')]
+    _, order = _run(exchange)
+    assert order.state == OrderState.REJECTED and exchange.calls['create_order'] == 1
+
+
+def test_network_errors_while_polling_keep_tracking():
+    exchange = FakeExchange(fills_after=1)
+    exchange.script['fetch_order'] = [ccxt.NetworkError('down'), ccxt.RequestTimeout('slow'),
+                                      ccxt.RequestTimeout('slow')]
+    pipeline, order = _run(exchange, side='sell')
+    assert order.state == OrderState.FILLED
+    assert pipeline.positions == {'BTC/USDT': -1.0}
+
+
+def test_unfilled_order_is_cancelled_at_deadline_despite_cancel_errors():
+    exchange = FakeExchange(fills_after=10**9)
+    exchange.script['cancel_order'] = [ccxt.RequestTimeout('slow')]
+    _, order = _run(exchange, order_timeout=0.01)
+    assert order.state == OrderState.CANCELED
+    assert exchange.calls['cancel_order'] == 2
@@ -0,0 +1,79 @@
+import os
+import numpy as np
+import pytest
+from backend.config import Config
+from backend.predictor import Predictor
+from backend.registry import ModelRegistry, lstm_model_name
+from benchmarks.synthetic import synthetic_ohlcv
+
+torch = pytest.importorskip('torch')
+xgb = pytest.importorskip('xgboost')
+
+
+@pytest.fixture
+def config(tmp_path):
+    config = Config(os.path.join(tmp_path, "config.yaml"))
+    config.model.lstm_lookback = 8
+    return config
+
+
+def _lstm(seed: int):
+    from backend.models import LSTMModel
+    torch.manual_seed(seed)
+    return LSTMModel(input_dim=2, hidden_dim=4, num_layers=1)
+
+
+def _expected(model, df, mean, std, seq_length: int) -> float:
+    values = (df[['close', 'volume']].to_numpy(dtype=np.float32) - mean) / std
+    with torch.inference_mode():
+        out = model(torch.from_numpy(values[-seq_length:][None])).numpy()[0, 0]
+    return float(out * std[0] + mean[0])
+
+
+def test_per_symbol_models_predict_with_their_own_weights(config):
+    frames = {'A/USDT': synthetic_ohlcv(50, seed=1), 'B/USDT': synthetic_ohlcv(50, seed=2),
+              'C/USDT': synthetic_ohlcv(50, seed=3)}
+    mean, std = np.array([30000, 20], dtype=np.float32), np.array([100, 10], dtype=np.float32)
+    models = {'A/USDT': _lstm(1), 'B/USDT': _lstm(2), None: _lstm(3)}
+    predictor = Predictor(config)
+    for symbol, model in models.items():
+        predictor.set_lstm(model, ['close', 'volume'], mean, std, symbol=symbol)
+    predictions = predictor.predict(frames)
+    for symbol, df in frames.items():
+        model = models.get(symbol, models[None])
+        assert predictions[symbol]['lstm'] == pytest.approx(_expected(model, df, mean, std, 8), rel=1e-5)
+
+
+def test_registry_models_reach_the_strategy_inputs(config, tmp_path):
+    registry = ModelRegistry(str(tmp_path / "models"))
+    mean, std = np.array([30000, 20], dtype=np.float32), np.array([100, 10], dtype=np.float32)
+    registry.register_lstm(lstm_model_name('A/USDT'), _lstm(1), ['close', 'volume'], mean, std)
+    X = np.random.default_rng(0).normal(size=(200, 2)).astype(np.float32)
+    booster = xgb.train({'objective': 'binary:logistic'}, xgb.DMatrix(X, label=(X[:, 0] > 0)), 5)
+    registry.register_xgboost('xgboost', booster, ['close', 'volume'])
+
+    from main import _load_predictor
+    predictor = _load_predictor(config, ['A/USDT', 'B/USDT'], registry)
+    assert set(predictor.lstms) == {'A/USDT'}
+    df = synthetic_ohlcv(50)
+    prediction = predictor.predict({'A/USDT': df, 'B/USDT': df})
+    assert set(prediction['A/USDT']) == {'lstm', 'xgb'}
+    assert set(prediction['B/USDT']) == {'xgb'}
+    probability = Predictor.as_series(df, prediction['B/USDT'], 'xgb')
+    assert probability.iloc[-1] == prediction['B/USDT']['xgb'] and probability.iloc[:-1].isna().all()
+    assert _load_predictor(config, ['A/USDT'], ModelRegistry(str(tmp_path / "empty"))) is None
+
+
+def test_xgboost_probability_gates_buys(config):
+    from backend.data_engine import DataEngine
+    from backend.strategy import Strategy
+    config.strategy.rsi_oversold = 60
+    df = DataEngine(config).add_technical_indicators(synthetic_ohlcv(2000, volatility=0.01))
+    strategy = Strategy(config)
+    plain = strategy.generate_signals(df)['signal'].to_numpy()
+    confident = strategy.generate_signals(df, xgb_probabilities=np.full(len(df), 0.9))['signal'].to_numpy()
+    doubtful = strategy.generate_signals(df, xgb_probabilities=np.full(len(df), 0.1))['signal'].to_numpy()
+    assert (plain == 1).any()
+    np.testing.assert_array_equal(confident, plain)
+    assert not (doubtful == 1).any()
+    np.testing.assert_array_equal(doubtful[plain == -1], -1)
@@ -0,0 +1,84 @@
+import json
+import os
+import shutil
+import threading
+import numpy as np
+import pytest
+from backend.config import Config
+from backend.registry import MANIFEST_FILE, ModelRegistry, lstm_model_name, slug
+
+torch = pytest.importorskip('torch')
+
+
+def _lstm(seed: int):
+    from backend.models import LSTMModel
+    torch.manual_seed(seed)
+    return LSTMModel(input_dim=2, hidden_dim=4, num_layers=1)
+
+
+def _register(registry, model, name='lstm-X'):
+    config = Config(os.path.join(registry.root, "config.yaml"))
+    return registry.register_lstm(name, model, ['close', 'volume'], np.array([30000.0, 20.0]),
+                                  np.array([100.0, 10.0]), model_config=config.model, metrics={'val_loss': 0.1})
+
+
+def test_register_load_round_trip(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    model = _lstm(1)
+    manifest = _register(registry, model)
+    loaded = registry.load('lstm-X')
+    assert loaded.manifest == manifest
+    assert loaded.manifest['scaler'] == {'mean': [30000.0, 20.0], 'std': [100.0, 10.0]}
+    x = torch.randn(3, 5, 2)
+    with torch.inference_mode():
+        np.testing.assert_array_equal(loaded.model(x).numpy(), model.eval()(x).numpy())
+    assert registry.load('lstm-X', manifest['hash'][:6]).manifest['version'] == 1
+
+
+def test_identical_artifact_keeps_its_version(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    first = _register(registry, _lstm(1))
+    assert _register(registry, _lstm(1))['version'] == first['version'] == 1
+    assert _register(registry, _lstm(2))['version'] == 2
+    assert [v['version'] for v in registry.versions('lstm-X')] == [1, 2]
+    assert not [p for p in os.listdir(tmp_path / 'lstm-X') if p.startswith('.staging')]
+
+
+def test_leftover_target_directory_is_replaced(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    manifest = _register(registry, _lstm(1))
+    # A registration that died between moving its directory in and writing the index
+    os.remove(tmp_path / 'lstm-X' / 'versions.json')
+    (tmp_path / 'lstm-X' / manifest['hash'] / 'stray').write_text('partial')
+    again = _register(registry, _lstm(1))
+    assert again['hash'] == manifest['hash'] and again['version'] == 1
+    assert not (tmp_path / 'lstm-X' / manifest['hash'] / 'stray').exists()
+    # An indexed version whose directory went missing is restored under the same number
+    _register(registry, _lstm(2))
+    shutil.rmtree(tmp_path / 'lstm-X' / manifest['hash'])
+    assert _register(registry, _lstm(1))['version'] == 1
+    with open(tmp_path / 'lstm-X' / manifest['hash'] / MANIFEST_FILE) as f:
+        assert json.load(f)['version'] == 1
+    assert [v['version'] for v in registry.versions('lstm-X')] == [1, 2]
+
+
+def test_concurrent_registrations_get_distinct_versions(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    models = [_lstm(seed) for seed in range(6)]
+    barrier = threading.Barrier(len(models))
+
+    def register(model):
+        barrier.wait()
+        _register(registry, model)
+
+    threads = [threading.Thread(target=register, args=(m,)) for m in models]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(v['version'] for v in registry.versions('lstm-X')) == list(range(1, 7))
+
+
+def test_model_names_are_path_safe():
+    assert slug('BTC/USDT:USDT') == 'BTC-USDT_USDT'
+    assert lstm_model_name('ETH/USDT') == 'lstm-ETH-USDT'
@@ -0,0 +1,151 @@
+import os
+import numpy as np
+import pytest
+from backend.config import Config
+from backend.replay import ImmediateFill, ReplayClock, ReplayExchange, VolumeFill
+from backend.resample import resample_ohlcv
+from benchmarks.synthetic import synthetic_frames
+
+ccxt = pytest.importorskip('ccxt')
+
+SYMBOL = 'SYM0/USDT'
+MINUTE = 60_000
+
+
+class _FrozenClock(ReplayClock):
+    """Replay clock that only moves when a test sets `now`."""
+
+    def __init__(self, now: float):
+        super().__init__(now, speed=1.0)
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+def _replay(n: int = 300, **kwargs) -> ReplayExchange:
+    replay = ReplayExchange(synthetic_frames(1, n), clock=_FrozenClock(0.0), **kwargs)
+    replay.load_markets()
+    return replay
+
+
+def _at(replay, candle: int, seconds: float = 0.0):
+    replay.clock.now = replay.candles[SYMBOL][candle, 0] / 1000 + seconds
+
+
+def test_only_closed_candles_and_the_forming_open_are_visible():
+    replay = _replay()
+    rows = replay.candles[SYMBOL]
+    _at(replay, 250, 30)
+    ohlcv = np.array(replay.fetch_ohlcv(SYMBOL, limit=100))
+    assert ohlcv[-1, 0] == rows[250, 0]
+    # The forming candle shows nothing but its open
+    assert list(ohlcv[-1, 1:]) == [rows[250, 1]] * 4 + [0.0]
+    np.testing.assert_array_equal(ohlcv[:-1], rows[151:250])
+
+    # At the close of candle 250 it is complete and 251 is forming
+    _at(replay, 251)
+    ohlcv = np.array(replay.fetch_ohlcv(SYMBOL, since=int(rows[249, 0])))
+    np.testing.assert_array_equal(ohlcv[:2], rows[249:251])
+    assert ohlcv[2, 0] == rows[251, 0] and ohlcv[2, 5] == 0.0 and len(ohlcv) == 3
+
+
+def test_resampled_candles_match_resample_ohlcv():
+    replay = _replay()
+    rows = replay.candles[SYMBOL]
+    _at(replay, 252, 10)
+    ohlcv = np.array(replay.fetch_ohlcv(SYMBOL, '5m', since=int(rows[0, 0])))
+    expected = resample_ohlcv(rows, 5 * MINUTE)
+    # Like an exchange, only buckets opening at or after `since`
+    expected = expected[expected[:, 0] >= rows[0, 0]]
+    # Every bucket before the forming one is complete
+    np.testing.assert_allclose(ohlcv[:-1], expected[:len(ohlcv) - 1])
+    assert ohlcv[-1, 0] == expected[len(ohlcv) - 1, 0] and ohlcv[-1, 0] <= rows[252, 0]
+    assert ohlcv[-1, 0] + 5 * MINUTE > replay.clock.now * 1000
+
+
+def test_volume_fill_spreads_across_candles():
+    replay = _replay(fill_model=VolumeFill(participation=0.1))
+    rows = replay.candles[SYMBOL]
+    _at(replay, 200, 1)
+    order = replay.create_order(SYMBOL, 'market', 'buy', 1e6)
+    assert order['filled'] == 0.0 and order['status'] == 'open'
+    _at(replay, 201, 1)
+    order = replay.fetch_order(order['id'])
+    assert order['filled'] == pytest.approx(0.1 * rows[200, 5])
+    _at(replay, 204, 1)
+    order = replay.fetch_order(order['id'])
+    assert order['filled'] == pytest.approx(0.1 * rows[200:204, 5].sum())
+    assert order['status'] == 'open' and order['remaining'] == pytest.approx(1e6 - order['filled'])
+
+
+def test_immediate_fill_slips_against_the_taker():
+    replay = _replay(fill_model=ImmediateFill(slippage_bps=10))
+    _at(replay, 200, 1)
+    last = replay.fetch_ticker(SYMBOL)['last']
+    buy = replay.create_order(SYMBOL, 'market', 'buy', 1.0)
+    sell = replay.create_order(SYMBOL, 'market', 'sell', 1.0)
+    assert buy['status'] == sell['status'] == 'closed'
+    assert buy['average'] > last > sell['average']
+    assert buy['average'] == pytest.approx(replay.fetch_ticker(SYMBOL)['ask'] * 1.001)
+
+
+def _faults(seed: int) -> list:
+    replay = _replay(error_rate=0.3, seed=seed)
+    _at(replay, 200)
+    pattern = []
+    for _ in range(60):
+        try:
+            replay.fetch_ticker(SYMBOL)
+            pattern.append(False)
+        except ccxt.RequestTimeout:
+            pattern.append(True)
+    return pattern
+
+
+def test_seeded_faults_repeat():
+    assert _faults(7) == _faults(7)
+    assert any(_faults(7)) and not all(_faults(7))
+    assert _faults(7) != _faults(8)
+
+
+def test_lost_response_order_is_found_by_client_id():
+    replay = _replay(error_rate=1.0, seed=3)
+    _at(replay, 200, 1)
+    lost = None
+    for i in range(20):
+        client_id = f"c{i}"
+        with pytest.raises(ccxt.RequestTimeout):
+            replay.create_order(SYMBOL, 'market', 'buy', 1.0, params={'clientOrderId': client_id})
+        if client_id in replay._by_client_id:
+            lost = client_id
+            break
+    assert lost is not None
+    replay.error_rate = 0.0
+    order = replay.fetch_order(None, SYMBOL, params={'clientOrderId': lost})
+    assert order['clientOrderId'] == lost and order['status'] == 'closed'
+    with pytest.raises(ccxt.DuplicateOrderId):
+        replay.create_order(SYMBOL, 'market', 'buy', 1.0, params={'clientOrderId': lost})
+
+
+def test_trading_bot_smoke_run(tmp_path):
+    pytest.importorskip('sqlalchemy')
+    from backend.metrics import STAGE_SECONDS
+    from main import run_trading_bot
+    frames = synthetic_frames(2, 260, volatility=0.0008)
+    replay = ReplayExchange(frames, speed=2000.0, warmup=200)
+    config = Config(os.path.join(tmp_path, "config.yaml"))
+    config.data.pairs = list(frames)
+    config.data.timeframe = '1m'
+    config.data.cache_enabled = False
+    config.data.markets_cache_hours = 0
+    config.logging.metrics_enabled = False
+    config.trading.ledger_url = f"sqlite:///{tmp_path / 'ledger.db'}"
+
+    def ticks():
+        return STAGE_SECONDS.snapshot().get('indicators_incremental', {}).get('count', 0)
+    before = ticks()
+    run_trading_bot(config, replay=replay)
+    assert replay.clock.time() >= replay.end_time
+    # One incremental indicator update per symbol and closed candle, give or take the last
+    assert ticks() - before >= 2 * 55
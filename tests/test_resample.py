@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backend.resample import Resampler, bucket_starts, resample_ohlcv, timeframe_ms
+from benchmarks.synthetic import synthetic_ohlcv
+
+MINUTE = 60_000
+HOUR_ALIGNED = 1_599_998_400_000  # a multiple of one hour
+TIMEFRAMES = ['5m', '15m', '1h']
+
+
+def _rows(n: int, offset_minutes: int = 7, timeframe_ms: int = MINUTE) -> np.ndarray:
+    df = synthetic_ohlcv(n, seed=11, timeframe_ms=timeframe_ms,
+                         start_ms=HOUR_ALIGNED + offset_minutes * MINUTE)
+    rows = df[['open', 'high', 'low', 'close', 'volume']].to_numpy()
+    return np.column_stack([df['timestamp'].to_numpy(dtype='datetime64[ms]').astype(np.int64), rows])
+
+
+def _expected(seen: np.ndarray, timeframe: str) -> np.ndarray:
+    """resample_ohlcv of every base candle seen, without a completed bucket the stream only partly covers."""
+    tf_ms = timeframe_ms(timeframe)
+    out = resample_ohlcv(seen, tf_ms)
+    keep = out[:, 0] >= bucket_starts(seen[:1, 0] + tf_ms - 1, tf_ms)[0]
+    keep[-1] = True  # the partial candle is always shown
+    return out[keep]
+
+
+def _derived(resampler: Resampler, timeframe: str) -> np.ndarray:
+    df = resampler.candles('X', timeframe, limit=10_000)
+    return np.column_stack([df['timestamp'].to_numpy(dtype='datetime64[ms]').astype(np.int64),
+                            df[['open', 'high', 'low', 'close', 'volume']].to_numpy()])
+
+
+def _assert_matches(resampler, seen):
+    for timeframe in TIMEFRAMES:
+        np.testing.assert_allclose(_derived(resampler, timeframe), _expected(seen, timeframe), rtol=1e-12,
+                                   err_msg=timeframe)
+
+
+def test_streaming_overlapping_windows_with_revised_open_candle():
+    rows = _rows(400)
+    resampler = Resampler('1m', TIMEFRAMES, limit=10_000)
+    resampler.ingest('X', rows[:20])
+    for end in range(21, len(rows) + 1):
+        # The still-open candle is first seen early, then revised when it closes
+        forming = rows[end - 1].copy()
+        forming[[2, 3, 4]] = forming[1]
+        forming[5] /= 3
+        resampler.ingest('X', np.vstack([rows[end - 10:end - 1], forming]))
+        resampler.ingest('X', rows[end - 10:end])
+        if end % 37 == 0 or end == len(rows):
+            _assert_matches(resampler, rows[:end])
+
+
+def test_segment_path_matches_streaming():
+    rows = _rows(400)
+    resampler = Resampler('1m', TIMEFRAMES, limit=10_000)
+    for end in range(41, len(rows) + 41, 41):
+        resampler.ingest('X', rows[max(end - 50, 0):end])
+    _assert_matches(resampler, rows)
+
+
+def test_buckets_the_stream_starts_inside_are_trimmed():
+    resampler = Resampler('1m', ['5m', '1h'], limit=10_000)
+    resampler.ingest('X', _rows(120, offset_minutes=7))
+    assert _derived(resampler, '5m')[0, 0] == HOUR_ALIGNED + 10 * MINUTE
+    assert _derived(resampler, '1h')[0, 0] == HOUR_ALIGNED + 60 * MINUTE
+
+
+def test_seed_then_ingest_matches_full_history():
+    rows = _rows(400, offset_minutes=0)
+    resampler = Resampler('1m', ['1h'], limit=10_000)
+    resampler.ingest('X', rows[250:280])
+    assert not resampler.seeded('X', '1h')
+    # An exchange's 1h history includes the current bucket so far, latest candle included
+    resampler.seed('X', '1h', resample_ohlcv(rows[:280], timeframe_ms('1h')))
+    assert resampler.seeded('X', '1h')
+    np.testing.assert_allclose(_derived(resampler, '1h'), resample_ohlcv(rows[:280], timeframe_ms('1h')))
+    for end in range(281, len(rows) + 1):
+        resampler.ingest('X', rows[end - 3:end])
+    np.testing.assert_allclose(_derived(resampler, '1h'), resample_ohlcv(rows, timeframe_ms('1h')))
+
+
+def test_gap_in_base_candles_requires_reseeding(caplog):
+    rows = _rows(200, offset_minutes=0)
+    resampler = Resampler('1m', ['5m'])
+    resampler.ingest('X', rows[:50])
+    resampler.seed('X', '5m', resample_ohlcv(rows[:50], 5 * MINUTE))
+    version = resampler.version('X', '5m')
+    resampler.ingest('X', rows[50:60])
+    assert resampler.seeded('X', '5m') and resampler.version('X', '5m') > version
+    resampler.ingest('X', rows[70:80])
+    assert not resampler.seeded('X', '5m')
+    assert 'missing' in caplog.text
+
+
+def test_weekly_buckets_open_on_monday():
+    days = _rows(60, offset_minutes=0, timeframe_ms=timeframe_ms('1d'))
+    weeks = resample_ohlcv(days, timeframe_ms('1w'))
+    opens = pd.to_datetime(weeks[:, 0].astype(np.int64), unit='ms')
+    assert (opens.dayofweek == 0).all() and (opens == opens.normalize()).all()
+    resampler = Resampler('1d', ['1w'], limit=100)
+    for end in range(1, len(days) + 1):
+        resampler.ingest('X', days[max(end - 2, 0):end])
+    np.testing.assert_allclose(_derived(resampler, '1w'), _expected(days, '1w'))
+    with pytest.raises(ValueError):
+        Resampler('1h', ['90m'])
@@ -0,0 +1,70 @@
+import asyncio
+import math
+import os
+import numpy as np
+import pytest
+from backend.config import Config
+from backend.replay import ReplayExchange
+from backend.risk import RiskEngine
+from backend.scheduler import RateLimiter, TradingScheduler
+from backend.strategy import Strategy
+from benchmarks.synthetic import synthetic_frames
+
+
+@pytest.fixture
+def config(tmp_path):
+    config = Config(os.path.join(tmp_path, "config.yaml"))
+    config.data.cache_enabled = False
+    return config
+
+
+def _feed(risk, returns):
+    price = 100.0
+    risk.update('BTC/USDT', price)
+    for r in returns:
+        price *= math.exp(r)
+        risk.update('BTC/USDT', price)
+
+
+def test_volatility_is_scaled_to_the_horizon(config):
+    returns = np.random.default_rng(0).normal(0, 0.001, 200)
+    minute = RiskEngine(config, 10_000.0, timeframe='1m')
+    hour = RiskEngine(config, 10_000.0, timeframe='1h')
+    _feed(minute, returns)
+    _feed(hour, returns)
+    # Same per-candle moves are sqrt(60) times more volatile per day on 1m candles
+    assert minute.volatility('BTC/USDT') == pytest.approx(hour.volatility('BTC/USDT') * math.sqrt(60))
+    # 0.1% per minute is ~3.8% a day: inside the default 0.5-5% band
+    assert 0.5 < minute.volatility('BTC/USDT') < 5.0
+    assert minute.allow('BTC/USDT', 'buy', 1.0, 100.0) == (True, None)
+    _feed(minute, returns * 10)
+    assert minute.allow('BTC/USDT', 'buy', 1.0, 100.0) == (False, 'volatility')
+
+
+class _Executor:
+    paper_balance = 10_000.0
+    ledger = None
+
+
+async def _fund(config, replay):
+    config.trading.paper_trading = False
+    scheduler = TradingScheduler(config, Strategy(config), _Executor(), exchange=replay.async_view(),
+                                 symbols=['SYM0/USDT'], clock=replay.clock)
+    exchange = scheduler.exchange
+    await exchange.load_markets()
+    scheduler.limiter = RateLimiter.for_exchange(exchange, clock=replay.clock)
+    await scheduler._fund_risk_engine(['SYM0/USDT'])
+    return scheduler.risk
+
+
+def test_live_equity_comes_from_exchange_balance(config):
+    replay = ReplayExchange(synthetic_frames(1, 300), balance={'USDT': 2500.0})
+    risk = asyncio.run(_fund(config, replay))
+    assert risk.equity() == 2500.0
+    assert risk.position_size('SYM0/USDT', 100.0) > 0
+
+
+def test_live_trading_refuses_to_start_without_balance(config):
+    replay = ReplayExchange(synthetic_frames(1, 300), balance={'BTC': 1.0})
+    with pytest.raises(RuntimeError, match='USDT'):
+        asyncio.run(_fund(config, replay))
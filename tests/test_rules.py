@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backend.rules import Col, Const, Param, Rule, RuleSet, bind
+
+
+@pytest.fixture
+def fields():
+    rng = np.random.default_rng(0)
+    return {'rsi': rng.uniform(0, 100, 500), 'close': 100 + rng.normal(0, 1, 500).cumsum()}
+
+
+def _crossing(rsi: np.ndarray, level: float) -> np.ndarray:
+    s = pd.Series(rsi)
+    up = (s > level) & (s.shift(1) <= level)
+    down = (s < level) & (s.shift(1) >= level)
+    return np.where(down, -1, np.where(up, 1, 0))
+
+
+def test_crosses_against_constant(fields):
+    rules = RuleSet([Rule('x', Col('rsi').crosses_above(30), Col('rsi').crosses_below(30))])
+    signal = rules.evaluate(fields)['x']
+    np.testing.assert_array_equal(signal, _crossing(fields['rsi'], 30))
+    assert rules.lookback == 1
+    assert rules.evaluate_latest(fields)['x'] == signal[-1]
+
+
+def test_variant_group_matches_individual_rules(fields):
+    template = Rule('t', Col('rsi').crosses_above(Param('level')), Col('rsi').crosses_below(Param('level')))
+    levels = [20, 30, 40, 50]
+    variants = [Rule(f"v{level}", bind(template.buy, {'level': level}), bind(template.sell, {'level': level}))
+                for level in levels]
+    together = RuleSet(variants).evaluate(fields)
+    for rule, level in zip(variants, levels):
+        np.testing.assert_array_equal(together[rule.name], RuleSet([rule]).evaluate(fields)[rule.name])
+        np.testing.assert_array_equal(together[rule.name], _crossing(fields['rsi'], level))
+
+
+def test_shifted_condition_is_false_before_start(fields):
+    rule = Rule('x', (Col('rsi') > -1).shift(2) | (Col('rsi') < -1), Col('rsi') > 1000)
+    signal = RuleSet([rule]).evaluate(fields)['x']
+    assert list(signal[:2]) == [0, 0]
+    assert (signal[2:] == 1).all()
+
+
+def test_matrix_fields_shift_along_time(fields):
+    matrix = {k: np.column_stack([v, v[::-1]]) for k, v in fields.items()}
+    rules = RuleSet([Rule('x', Col('rsi').crosses_above(30), Col('rsi').crosses_below(30))])
+    signal = rules.evaluate(matrix)['x']
+    np.testing.assert_array_equal(signal[:, 0], _crossing(fields['rsi'], 30))
+    np.testing.assert_array_equal(signal[:, 1], _crossing(fields['rsi'][::-1], 30))
+
+
+def test_unbound_param_is_rejected():
+    with pytest.raises(ValueError):
+        RuleSet([Rule('x', Col('rsi') < Param('rsi_oversold'), Col('rsi') > Const(70))])
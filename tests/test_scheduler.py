@@ -0,0 +1,73 @@
+import asyncio
+import os
+import numpy as np
+import pytest
+from backend.config import Config
+from backend.scheduler import TradingScheduler
+from backend.strategy import Strategy
+from benchmarks.synthetic import synthetic_ohlcv
+
+
+class _Predictor:
+    """Predicts a close far above any price, so the AI confirmation always holds."""
+    has_lstm = False
+
+    def update(self, symbol, df):
+        return True
+
+    def predict_batch(self, symbols):
+        return {s: {'lstm': 1e9} for s in symbols}
+
+
+class _Executor:
+    paper_balance = 10_000.0
+    ledger = None
+
+    def __init__(self):
+        self.trades = []
+
+    def execute_trade(self, symbol, signal, amount):
+        self.trades.append((symbol, signal))
+        return {'side': 'buy' if signal == 1 else 'sell'}
+
+
+@pytest.fixture
+def config(tmp_path):
+    config = Config(os.path.join(tmp_path, "config.yaml"))
+    config.data.cache_enabled = False
+    config.risk.enabled = False
+    # Loose thresholds so the synthetic walk produces plenty of buys
+    config.strategy.rsi_oversold = 60
+    return config
+
+
+def test_ai_confirmed_signals_see_previous_candle(config):
+    strategy = Strategy(config)
+    scheduler = TradingScheduler(config, strategy, _Executor(), predictor=_Predictor())
+    seen = []
+    latest = strategy.latest_signal
+
+    def spy(df, *predictions):
+        signal = latest(df, *predictions)
+        seen.append(signal)
+        return signal
+    strategy.latest_signal = spy
+
+    candles = synthetic_ohlcv(600, volatility=0.01, seed=3)
+    rows = [[int(t.value // 10**6), o, h, l, c, v] for t, o, h, l, c, v in candles.itertuples(index=False)]
+
+    async def run():
+        await scheduler.process('BTC/USDT', rows[:100], 0)
+        for row in rows[100:]:
+            await scheduler.process('BTC/USDT', [row], 0)
+    asyncio.run(run())
+
+    expected = _signals(config, candles)[-len(seen):]
+    assert seen == list(expected)
+    assert 1 in seen
+
+
+def _signals(config, candles):
+    from backend.data_engine import DataEngine
+    df = DataEngine(config).add_technical_indicators(candles)
+    return Strategy(config).generate_signals(df, np.full(len(df), 1e9))['signal'].to_numpy()
@@ -0,0 +1,130 @@
+import logging
+import os
+import numpy as np
+import pytest
+from backend.config import Config
+from benchmarks.synthetic import synthetic_ohlcv
+
+torch = pytest.importorskip('torch')
+
+from backend.trainer import ModelTrainer  # noqa: E402
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def config(tmp_path):
+    config = Config(os.path.join(tmp_path, "config.yaml"))
+    config.model.lstm_lookback = 8
+    config.model.epochs = 6
+    config.model.batch_size = 32
+    config.model.early_stopping_patience = 2
+    config.model.checkpoint_dir = str(tmp_path / "checkpoints")
+    return config
+
+
+def _scripted_losses(monkeypatch, losses):
+    """Make each epoch's validation loss the next of `losses`; raise Interrupted when they run out."""
+    losses = iter(losses)
+    calls = []
+
+    def evaluate(self, model, dataset, criterion):
+        calls.append(len(dataset))
+        try:
+            return next(losses)
+        except StopIteration:
+            raise Interrupted() from None
+
+    monkeypatch.setattr(ModelTrainer, '_evaluate', evaluate)
+    return calls
+
+
+def test_stops_after_patience(config, monkeypatch):
+    _scripted_losses(monkeypatch, [1.0, 0.5, 0.7, 0.6, 0.1, 0.1])
+    trainer = ModelTrainer(config)
+    trainer.train_lstm(synthetic_ohlcv(100, seed=1), feature_cols=['close', 'volume'])
+    assert trainer.epochs_trained == 4
+    assert trainer.best_loss == 0.5
+
+
+def test_resumes_from_checkpoint_at_next_epoch(config, monkeypatch, caplog):
+    df = synthetic_ohlcv(100, seed=1)
+    checkpoint = os.path.join(config.model.checkpoint_dir, "lstm-X.pt")
+    _scripted_losses(monkeypatch, [1.0, 0.9])
+    with pytest.raises(Interrupted):
+        ModelTrainer(config).train_lstm(df, feature_cols=['close', 'volume'], checkpoint=checkpoint)
+    assert torch.load(checkpoint, weights_only=False)['state']['epoch'] == 2
+
+    calls = _scripted_losses(monkeypatch, [0.8 - 0.1 * i for i in range(8)])
+    trainer = ModelTrainer(config)
+    with caplog.at_level(logging.INFO, logger='backend.trainer'):
+        trainer.train_lstm(df, feature_cols=['close', 'volume'], checkpoint=checkpoint)
+    assert "after epoch 2" in caplog.text
+    assert len(calls) == config.model.epochs - 2
+    assert trainer.epochs_trained == config.model.epochs and trainer.best_loss == pytest.approx(0.5)
+    assert not os.path.exists(checkpoint)
+
+
+def test_ignores_checkpoint_from_other_data(config, monkeypatch, caplog):
+    checkpoint = os.path.join(config.model.checkpoint_dir, "lstm-X.pt")
+    _scripted_losses(monkeypatch, [1.0, 0.9])
+    with pytest.raises(Interrupted):
+        ModelTrainer(config).train_lstm(synthetic_ohlcv(100, seed=1), feature_cols=['close', 'volume'],
+                                        checkpoint=checkpoint)
+
+    calls = _scripted_losses(monkeypatch, [0.8 - 0.1 * i for i in range(8)])
+    trainer = ModelTrainer(config)
+    trainer.train_lstm(synthetic_ohlcv(100, seed=2), feature_cols=['close', 'volume'], checkpoint=checkpoint)
+    assert "Ignoring checkpoint" in caplog.text
+    assert len(calls) == trainer.epochs_trained == config.model.epochs
+
+
+def test_train_many_returns_per_symbol_results(config, tmp_path):
+    from backend.registry import ModelRegistry, lstm_model_name
+    config.model.epochs = 2
+    frames = {'A/USDT': synthetic_ohlcv(80, seed=1), 'B/USDT': synthetic_ohlcv(80, seed=2)}
+    registry = ModelRegistry(str(tmp_path / "models"))
+    results = ModelTrainer(config).train_many(frames, feature_cols=['close', 'volume'], workers=1, threads=1,
+                                              registry=registry)
+    assert set(results) == set(frames)
+    for symbol, result in results.items():
+        assert result['epochs'] == 2 and result['feature_cols'] == ['close', 'volume']
+        assert result['trained_until'] == int(frames[symbol]['timestamp'].iloc[-1].value // 1_000_000)
+        assert registry.versions(lstm_model_name(symbol))[0]['version'] == 1
+    assert not os.listdir(config.model.checkpoint_dir)
+
+
+def _loop_windows(values, target_idx, seq_length):
+    """The per-window loop prepare_data used before SlidingWindowDataset."""
+    X, y = [], []
+    for i in range(len(values) - seq_length):
+        X.append(values[i:i + seq_length])
+        y.append(values[i + seq_length, target_idx:target_idx + 1])
+    return np.array(X), np.array(y)
+
+
+@pytest.mark.parametrize('feature_cols', [None, ['volume', 'close', 'high']])
+def test_windows_match_loop_implementation(config, feature_cols):
+    df = synthetic_ohlcv(120, seed=3)
+    trainer = ModelTrainer(config)
+    dataset = trainer.prepare_data(df, feature_cols=feature_cols, seq_length=60)
+    values = (df[trainer.feature_cols].to_numpy() - trainer.mean) / trainer.std
+    X, y = _loop_windows(values, trainer.feature_cols.index('close'), 60)
+    assert dataset.windows.shape == X.shape and dataset.targets.shape == y.shape
+    np.testing.assert_allclose(dataset.windows.numpy(), X, rtol=1e-5, atol=1e-5)
+    np.testing.assert_allclose(dataset.targets.numpy(), y, rtol=1e-5, atol=1e-5)
+    batch_X, batch_y = dataset[[0, 7, 59]]
+    np.testing.assert_allclose(batch_X.numpy(), X[[0, 7, 59]], rtol=1e-5, atol=1e-5)
+
+    train, val = dataset.split(0.25)
+    np.testing.assert_array_equal(torch.cat([train.windows, val.windows]).numpy(), dataset.windows.numpy())
+    np.testing.assert_array_equal(torch.cat([train.targets, val.targets]).numpy(), dataset.targets.numpy())
+
+
+def test_too_few_rows_for_a_window(config):
+    trainer = ModelTrainer(config)
+    with pytest.raises(ValueError, match='seq_length=60'):
+        trainer.prepare_data(synthetic_ohlcv(60, seed=3), seq_length=60)
+    assert len(trainer.prepare_data(synthetic_ohlcv(61, seed=3), seq_length=60)) == 1